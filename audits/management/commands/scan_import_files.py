@@ -0,0 +1,59 @@
+"""Keep the FileScanIndex up to date with the files in the importer spec"""
+
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from audits.models import FileScanIndex
+from utils.spec import SPEC_FILE, parse_importer_spec
+
+
+class Command(BaseCommand):
+    help = (
+        "Scan the files found via the importer spec, hashing any that are new or "
+        "have changed, so that the file dashboards don't have to"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-I",
+            "--importer-spec",
+            default=SPEC_FILE,
+            help="The path to an 'importer specification' file",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            nargs="?",
+            const=settings.FILE_SCAN_INTERVAL,
+            help="If given, rescan forever, waiting this many seconds between scans "
+            f"(default: {settings.FILE_SCAN_INTERVAL})",
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        while not self.stopping:
+            close_old_connections()
+            start = time.perf_counter()
+            counts = FileScanIndex.objects.rescan(
+                parse_importer_spec(options["importer_spec"]),
+                progress=options["verbosity"] > 1,
+            )
+            self.stdout.write(
+                ", ".join(f"{count} {status}" for status, count in counts.items())
+                + f" ({time.perf_counter() - start:.1f}s)"
+            )
+            if options["interval"] is None:
+                break
+            time.sleep(options["interval"])
+
+    def stop(self, signum, frame):
+        # Finish the current scan (if any) before exiting
+        self.stdout.write("Stopping once the current scan (if any) is finished")
+        self.stopping = True
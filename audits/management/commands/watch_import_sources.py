@@ -0,0 +1,228 @@
+"""Watch the importer spec's directories, keeping the FileScanIndex up to date"""
+
+import logging
+import os
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Max
+
+from django_import_data.models import FileImporter
+
+from audits.models import FileEvent, FileScanIndex
+from jobs.models import Job
+from utils.inotify import Inotify, RescanNeeded
+from utils.spec import SPEC_FILE, parse_importer_spec
+
+logger = logging.getLogger(__name__)
+
+# How long (in seconds) to wait for a burst of changes to settle before scanning
+DEFAULT_DEBOUNCE = 2.0
+# The longest (in seconds) to wait for changes to settle, if they keep on coming
+DEFAULT_MAX_DELAY = 30.0
+# The longest (in seconds) to block for; this bounds how long stopping takes
+MAX_WAIT = 1.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Watch the directories of the importer spec (via inotify, or by polling), "
+        "keeping the FileScanIndex and the FileEvents up to date, and marking "
+        "FileImporters whose files have changed. Optionally, changed files are "
+        "re-imported (via Jobs)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-I",
+            "--importer-spec",
+            default=SPEC_FILE,
+            help="The path to an 'importer specification' file",
+        )
+        parser.add_argument(
+            "--poll",
+            action="store_true",
+            help="Poll for changes instead of using inotify. Required for network "
+            "mounts (NFS, CIFS), since inotify doesn't see changes made by other hosts",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.FILE_SCAN_INTERVAL,
+            help="The number of seconds between rescans, when polling",
+        )
+        parser.add_argument(
+            "--rescan-interval",
+            type=float,
+            default=settings.FILE_WATCH_RESCAN_INTERVAL,
+            help="The number of seconds between full rescans, when using inotify "
+            "(to catch anything that it misses)",
+        )
+        parser.add_argument(
+            "--debounce",
+            type=float,
+            default=DEFAULT_DEBOUNCE,
+            help="The number of seconds to wait for changes to settle before "
+            "scanning the changed files",
+        )
+        parser.add_argument(
+            "--max-delay",
+            type=float,
+            default=DEFAULT_MAX_DELAY,
+            help="The maximum number of seconds to wait for changes to settle; "
+            "after this, the changed files are scanned even if changes are still "
+            "being made",
+        )
+        parser.add_argument(
+            "--reimport",
+            action="store_true",
+            help="Enqueue a Job to re-import the files of any FileImporters whose "
+            "files have changed since they were last imported",
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        self.importer_specs = parse_importer_spec(options["importer_spec"])
+        self.reimport = options["reimport"]
+        # Events from before this point have already been handled (or, if this is
+        # the first run, are about files that haven't changed since)
+        self.last_event_id = FileEvent.objects.aggregate(Max("id"))["id__max"] or 0
+        # Whatever changed while nothing was watching
+        self.rescan()
+
+        inotify = None
+        if not options["poll"]:
+            try:
+                inotify = Inotify()
+            except OSError as error:
+                logger.warning(f"{error}; polling instead")
+
+        if inotify:
+            with inotify:
+                self.watch(
+                    inotify,
+                    options["rescan_interval"],
+                    options["debounce"],
+                    options["max_delay"],
+                )
+        else:
+            self.poll(options["poll_interval"])
+
+    def stop(self, signum, frame):
+        # Finish the current scan (if any) before exiting
+        self.stdout.write("Stopping once the current scan (if any) is finished")
+        self.stopping = True
+
+    def get_watch_paths(self):
+        """Return the directories that need watching to see every file in the spec"""
+        watch_paths = set()
+        for importer_spec in self.importer_specs.values():
+            for path in importer_spec["paths"]:
+                if os.path.isdir(path):
+                    watch_paths.add(path)
+                elif os.path.isfile(path):
+                    watch_paths.add(os.path.dirname(path))
+                else:
+                    logger.warning(f"{path} does not exist; not watching it")
+        return watch_paths
+
+    def watch(self, inotify, rescan_interval, debounce, max_delay):
+        for path in self.get_watch_paths():
+            inotify.watch_tree(path)
+        self.stdout.write(f"Watching {len(inotify.paths)} directories")
+
+        next_rescan = time.monotonic() + rescan_interval
+        pending = set()
+        # When the oldest of the pending changes was seen
+        pending_since = None
+        while not self.stopping:
+            try:
+                changed = inotify.read(timeout=debounce if pending else MAX_WAIT)
+            except RescanNeeded:
+                self.rescan()
+                pending.clear()
+                next_rescan = time.monotonic() + rescan_interval
+                continue
+
+            if changed:
+                if not pending:
+                    pending_since = time.monotonic()
+                pending.update(changed)
+
+            # Wait for the changes to settle (e.g. a large file being copied), but
+            # not indefinitely, in case they never do
+            if pending and (
+                not changed or time.monotonic() - pending_since >= max_delay
+            ):
+                self.rescan(pending)
+                pending.clear()
+            if time.monotonic() >= next_rescan:
+                self.rescan()
+                next_rescan = time.monotonic() + rescan_interval
+
+    def poll(self, poll_interval):
+        self.stdout.write(f"Polling for changes every {poll_interval}s")
+        next_rescan = time.monotonic() + poll_interval
+        while not self.stopping:
+            time.sleep(min(MAX_WAIT, max(0, next_rescan - time.monotonic())))
+            if time.monotonic() >= next_rescan:
+                self.rescan()
+                next_rescan = time.monotonic() + poll_interval
+
+    def rescan(self, paths=None):
+        close_old_connections()
+        if paths is None:
+            counts = FileScanIndex.objects.rescan(self.importer_specs)
+        else:
+            counts = FileScanIndex.objects.rescan_paths(paths, self.importer_specs)
+        if any(counts[status] for status in ("created", "updated", "deleted")):
+            self.stdout.write(
+                ", ".join(f"{count} {status}" for status, count in counts.items())
+            )
+        self.handle_events()
+
+    def handle_events(self):
+        events = list(
+            FileEvent.objects.filter(id__gt=self.last_event_id).order_by("id")
+        )
+        if not events:
+            return
+        self.last_event_id = events[-1].id
+        for event in events:
+            self.stdout.write(str(event))
+
+        to_reimport = self.mark_file_importers_stale({event.path for event in events})
+        if to_reimport and self.reimport:
+            job = Job.objects.enqueue(
+                "audits.import_files",
+                description=f"Re-import {len(to_reimport)} changed files",
+                to_import=[
+                    (file_importer.file_path, file_importer.importer_name)
+                    for file_importer in to_reimport
+                ],
+            )
+            self.stdout.write(f"{job} has been queued")
+
+    def mark_file_importers_stale(self, paths):
+        """Refresh the on-disk state of the FileImporters of the given paths
+
+        This is what marks them as changed (or missing) since they were imported.
+        Returns the FileImporters whose files have changed since their latest
+        import, and so should be re-imported
+        """
+        to_reimport = []
+        for file_importer in FileImporter.objects.filter(file_path__in=paths):
+            file_importer.refresh_from_filesystem()
+            latest_fia = file_importer.latest_file_import_attempt
+            if file_importer.hash_on_disk and (
+                latest_fia is None
+                or latest_fia.hash_when_imported != file_importer.hash_on_disk
+            ):
+                to_reimport.append(file_importer)
+        return to_reimport
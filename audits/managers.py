@@ -0,0 +1,171 @@
+from datetime import timedelta
+import os
+import re
+
+from tqdm import tqdm
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Manager
+from django.utils.timezone import now
+
+from django_import_data.utils import determine_files_to_process, hash_file
+
+from utils.spec import SPEC_FILE, parse_importer_spec
+
+
+class FileScanIndexManager(Manager):
+    def _find_files(self, importer_specs):
+        """Map each path found via the given importer specs to its importer"""
+        paths = {}
+        for importer, importer_spec in importer_specs.items():
+            for path in determine_files_to_process(
+                importer_spec["paths"], importer_spec.get("pattern", None)
+            ):
+                # If a file matches more than one importer, the first wins
+                paths.setdefault(path, importer)
+        return paths
+
+    def _get_importer(self, path, importer_specs):
+        """Return the importer whose spec `path` would be found via (if any)"""
+        for importer, importer_spec in importer_specs.items():
+            pattern = importer_spec.get("pattern", None)
+            for spec_path in importer_spec["paths"]:
+                if path == spec_path or (
+                    path.startswith(os.path.join(spec_path, ""))
+                    and (not pattern or re.match(pattern, path))
+                ):
+                    return importer
+        return None
+
+    def rescan(self, importer_specs=None, progress=False):
+        """Bring the index up to date with the files found via the importer spec
+
+        Files that are new, or whose size or modification time has changed, are
+        (re-)hashed. Files that are no longer on disk are removed from the index.
+        Returns a dict of counts of the files that were created, updated,
+        unchanged, and deleted
+        """
+        if importer_specs is None:
+            importer_specs = parse_importer_spec(SPEC_FILE)
+        return self._sync(self._find_files(importer_specs), self.all(), progress)
+
+    def rescan_paths(self, paths, importer_specs=None):
+        """Like rescan(), but only for the given paths (e.g. those known to have
+        changed), so that the spec's directories don't need to be walked"""
+        if importer_specs is None:
+            importer_specs = parse_importer_spec(SPEC_FILE)
+        importers_by_path = {}
+        for path in paths:
+            importer = self._get_importer(path, importer_specs)
+            if importer:
+                importers_by_path[path] = importer
+        return self._sync(importers_by_path, self.filter(path__in=paths))
+
+    def refresh_file_importer(self, file_importer, ttl=None):
+        """refresh_from_filesystem(), but only if the file has changed
+
+        The file's index entry is rescanned (which only re-hashes the file if its
+        size or modification time has changed) unless it was scanned within the
+        last `ttl` seconds (FILE_REFRESH_TTL by default). The FileImporter is then
+        only refreshed if its hash differs from the index's. Files that aren't in
+        the index (i.e. aren't in the importer spec) are always refreshed.
+        Returns the status from refresh_from_filesystem(), or None if it wasn't
+        called
+        """
+        if ttl is None:
+            ttl = settings.FILE_REFRESH_TTL
+        path = file_importer.file_path
+        entry = self.filter(path=path).first()
+        if entry is None:
+            return file_importer.refresh_from_filesystem()
+
+        if now() - entry.scanned_on >= timedelta(seconds=ttl):
+            self._sync({path: entry.importer_name}, self.filter(path=path))
+            entry = self.filter(path=path).first()
+        if (entry.hash if entry else None) != file_importer.hash_on_disk:
+            return file_importer.refresh_from_filesystem()
+        return None
+
+    def _sync(self, importers_by_path, queryset, progress=False):
+        """Sync the entries in `queryset` with the files in `importers_by_path`
+
+        Entries in `queryset` whose files aren't in `importers_by_path` (or are no
+        longer on disk) are deleted. A FileEvent is recorded for each file that was
+        created, modified (i.e. its hash changed), or deleted
+        """
+        FileEvent = apps.get_model("audits", "FileEvent")
+        scanned_on = now()
+        existing = {entry.path: entry for entry in queryset}
+        found = set()
+        to_create = []
+        to_update = []
+        events = []
+        for path, importer_name in tqdm(
+            importers_by_path.items(), unit="files", disable=not progress
+        ):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Deleted since it was found
+                continue
+            found.add(path)
+
+            entry = existing.get(path)
+            if entry is None:
+                entry = self.model(path=path, scanned_on=scanned_on)
+                to_create.append(entry)
+            elif (entry.size, entry.mtime, entry.importer_name) == (
+                stat.st_size,
+                stat.st_mtime,
+                importer_name,
+            ):
+                continue
+            else:
+                to_update.append(entry)
+
+            entry.importer_name = importer_name
+            if (entry.size, entry.mtime) != (stat.st_size, stat.st_mtime):
+                old_hash = entry.hash
+                entry.size = stat.st_size
+                entry.mtime = stat.st_mtime
+                entry.hash = hash_file(path)
+                entry.hashed_on = scanned_on
+                if entry.hash != old_hash:
+                    events.append(
+                        FileEvent(
+                            path=path,
+                            importer_name=importer_name,
+                            event=FileEvent.MODIFIED if entry.id else FileEvent.CREATED,
+                            hash=entry.hash,
+                        )
+                    )
+
+        stale = [entry for path, entry in existing.items() if path not in found]
+        events.extend(
+            FileEvent(
+                path=entry.path,
+                importer_name=entry.importer_name,
+                event=FileEvent.DELETED,
+            )
+            for entry in stale
+        )
+        with transaction.atomic():
+            # Conflicts are from a concurrent rescan, which will have hashed it too
+            self.bulk_create(to_create, batch_size=1000, ignore_conflicts=True)
+            self.bulk_update(
+                to_update,
+                ["importer_name", "size", "mtime", "hash", "hashed_on"],
+                batch_size=1000,
+            )
+            num_deleted, __ = self.filter(id__in=[entry.id for entry in stale]).delete()
+            queryset.update(scanned_on=scanned_on)
+            FileEvent.objects.bulk_create(events, batch_size=1000)
+
+        return {
+            "created": len(to_create),
+            "updated": len(to_update),
+            "unchanged": len(found) - len(to_create) - len(to_update),
+            "deleted": num_deleted,
+        }
@@ -0,0 +1,60 @@
+# Generated by Django 2.2.24 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="FileScanIndex",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("path", models.CharField(max_length=1024, unique=True)),
+                (
+                    "importer_name",
+                    models.CharField(
+                        help_text="The importer whose spec the file was found via",
+                        max_length=256,
+                    ),
+                ),
+                (
+                    "size",
+                    models.BigIntegerField(help_text="Size of the file, in bytes"),
+                ),
+                (
+                    "mtime",
+                    models.FloatField(
+                        help_text="Modification time of the file, as a UNIX timestamp"
+                    ),
+                ),
+                ("hash", models.CharField(db_index=True, max_length=128)),
+                (
+                    "hashed_on",
+                    models.DateTimeField(help_text="When the hash was last calculated"),
+                ),
+                (
+                    "scanned_on",
+                    models.DateTimeField(
+                        help_text="When the file was last seen on disk"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "File Scan Index",
+                "get_latest_by": "scanned_on",
+            },
+        ),
+    ]
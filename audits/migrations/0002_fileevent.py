@@ -0,0 +1,52 @@
+# Generated by Django 2.2.24 on 2026-10-17 19:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("audits", "0001_initial")]
+
+    operations = [
+        migrations.CreateModel(
+            name="FileEvent",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("path", models.CharField(db_index=True, max_length=1024)),
+                ("importer_name", models.CharField(max_length=256)),
+                (
+                    "event",
+                    models.CharField(
+                        choices=[
+                            ("created", "Created"),
+                            ("modified", "Modified"),
+                            ("deleted", "Deleted"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                (
+                    "hash",
+                    models.CharField(
+                        blank=True,
+                        help_text="The hash after the event",
+                        max_length=128,
+                        null=True,
+                    ),
+                ),
+                (
+                    "detected_on",
+                    models.DateTimeField(auto_now_add=True, db_index=True),
+                ),
+            ],
+            options={"get_latest_by": "detected_on"},
+        ),
+    ]
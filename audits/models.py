@@ -0,0 +1,63 @@
+"""Audit models"""
+
+from django.db.models import (
+    BigIntegerField,
+    CharField,
+    DateTimeField,
+    FloatField,
+    Model,
+)
+
+from .managers import FileScanIndexManager
+
+
+class FileScanIndex(Model):
+    """The size, modification time, and hash of a file that could be imported
+
+    Rows are kept up to date (see FileScanIndexManager.rescan) for every file
+    found via the importer spec, so that the file dashboards can query for them
+    rather than walk the file system. Files are only re-hashed if their size or
+    modification time has changed since they were last scanned
+    """
+
+    path = CharField(max_length=1024, unique=True)
+    importer_name = CharField(
+        max_length=256, help_text="The importer whose spec the file was found via"
+    )
+    size = BigIntegerField(help_text="Size of the file, in bytes")
+    mtime = FloatField(help_text="Modification time of the file, as a UNIX timestamp")
+    hash = CharField(max_length=128, db_index=True)
+    hashed_on = DateTimeField(help_text="When the hash was last calculated")
+    scanned_on = DateTimeField(help_text="When the file was last seen on disk")
+
+    objects = FileScanIndexManager()
+
+    class Meta:
+        verbose_name_plural = "File Scan Index"
+        get_latest_by = "scanned_on"
+
+    def __str__(self):
+        return self.path
+
+
+class FileEvent(Model):
+    """A change to a file in the FileScanIndex, as noticed by a (re)scan"""
+
+    CREATED = "created"
+    MODIFIED = "modified"
+    DELETED = "deleted"
+    EVENT_CHOICES = ((CREATED, "Created"), (MODIFIED, "Modified"), (DELETED, "Deleted"))
+
+    path = CharField(max_length=1024, db_index=True)
+    importer_name = CharField(max_length=256)
+    event = CharField(max_length=16, choices=EVENT_CHOICES)
+    hash = CharField(
+        max_length=128, null=True, blank=True, help_text="The hash after the event"
+    )
+    detected_on = DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        get_latest_by = "detected_on"
+
+    def __str__(self):
+        return f"{self.path} {self.event}"
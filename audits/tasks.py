@@ -0,0 +1,94 @@
+"""Tasks for imports that are too large to do within a request (see the jobs app)"""
+
+import logging
+
+from django.core.management import call_command
+from django.db import transaction
+
+from django_import_data.models import FileImporter, FileImporterBatch
+
+from jobs.registry import register
+from .models import FileScanIndex
+
+logger = logging.getLogger(__name__)
+
+
+def import_file(importer_name, path, file_importer_batch=None):
+    """Import the file at the given path using the given importer
+
+    Any errors are propagated, and the caller is responsible for the
+    transaction. Returns the (new or existing) FileImporter of the path
+    """
+    call_command(importer_name, path, overwrite=True, durable=True, propagate=True)
+    file_importer = FileImporter.objects.get(
+        importer_name=importer_name, file_path=path
+    )
+    if file_importer_batch:
+        file_importer.file_importer_batch = file_importer_batch
+        file_importer.save()
+    return file_importer
+
+
+@register("audits.import_files")
+def import_files(job, to_import):
+    """Import each of the given (path, importer name) pairs, into a single batch
+
+    Each file is imported in its own transaction, so a failure only rolls back
+    that file; the others are still imported
+    """
+    if len(to_import) > 1:
+        file_importer_batch = FileImporterBatch.objects.create(
+            command="Meta", args=[], kwargs=[]
+        )
+        job.result_url = file_importer_batch.get_absolute_url()
+    else:
+        file_importer_batch = None
+
+    errors = []
+    for num_imported, (file_path, importer_name) in enumerate(to_import):
+        job.set_progress(
+            num_imported, total=len(to_import), message=f"Importing {file_path}"
+        )
+        try:
+            with transaction.atomic():
+                file_importer = import_file(
+                    importer_name, file_path, file_importer_batch=file_importer_batch
+                )
+        except Exception as error:
+            message = f"FATAL ERROR in {file_path}: {error.__class__.__name__}: {error}"
+            logger.error(message)
+            errors.append(message)
+        else:
+            if not file_importer_batch:
+                job.result_url = (
+                    file_importer.latest_file_import_attempt.get_absolute_url()
+                )
+
+    job.set_progress(
+        len(to_import), message=f"Imported {len(to_import) - len(errors)} files"
+    )
+    if errors:
+        raise ValueError(
+            f"{len(errors)} of {len(to_import)} files failed to import:\n"
+            + "\n".join(errors)
+        )
+
+
+@register("audits.acknowledge_file_importers")
+def acknowledge_file_importers(job, file_importer_ids):
+    file_importers = FileImporter.objects.filter(id__in=file_importer_ids)
+    job.set_progress(0, total=len(file_importer_ids))
+    for num_acknowledged, file_importer in enumerate(file_importers.iterator(), 1):
+        with transaction.atomic():
+            file_importer.acknowledge()
+        job.set_progress(num_acknowledged)
+
+
+@register("audits.scan_import_files")
+def scan_import_files(job):
+    """Bring the FileScanIndex up to date; see the scan_import_files command"""
+    job.set_progress(0, total=1, message="Scanning files")
+    counts = FileScanIndex.objects.rescan()
+    job.set_progress(
+        1, message=", ".join(f"{count} {status}" for status, count in counts.items())
+    )
@@ -1,2 +1,151 @@
+from datetime import timedelta
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils.timezone import now
+
+from audits import managers
+from audits.management.commands.watch_import_sources import Command as WatchCommand
+from audits.models import FileEvent, FileScanIndex
+from jobs.models import Job
+
+
+class FileScanIndexTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.specs = {"import_foo": {"paths": [self.dir.name], "pattern": r".*\.csv$"}}
+
+    def write(self, name, contents):
+        path = os.path.join(self.dir.name, name)
+        with open(path, "w") as file:
+            file.write(contents)
+        return path
+
+    def rescan(self):
+        with mock.patch.object(
+            managers, "hash_file", wraps=managers.hash_file
+        ) as hash_file:
+            counts = FileScanIndex.objects.rescan(self.specs)
+        return counts, hash_file.call_count
+
+    def test_rescan(self):
+        a = self.write("a.csv", "a")
+        b = self.write("b.csv", "b")
+        self.write("c.txt", "c")
+        self.assertEqual(
+            self.rescan(),
+            ({"created": 2, "updated": 0, "unchanged": 0, "deleted": 0}, 2),
+        )
+        self.assertEqual(
+            set(FileScanIndex.objects.values_list("path", "importer_name")),
+            {(a, "import_foo"), (b, "import_foo")},
+        )
+
+        # Nothing changed, so nothing is re-hashed
+        self.assertEqual(
+            self.rescan(),
+            ({"created": 0, "updated": 0, "unchanged": 2, "deleted": 0}, 0),
+        )
+
+        old_hash = FileScanIndex.objects.get(path=a).hash
+        self.write("a.csv", "changed")
+        os.remove(b)
+        self.assertEqual(
+            self.rescan(),
+            ({"created": 0, "updated": 1, "unchanged": 0, "deleted": 1}, 1),
+        )
+        self.assertNotEqual(FileScanIndex.objects.get(path=a).hash, old_hash)
+        self.assertFalse(FileScanIndex.objects.filter(path=b).exists())
+
+    def test_rescan_paths(self):
+        a = self.write("a.csv", "a")
+        b = self.write("b.csv", "b")
+        self.rescan()
+        self.assertEqual(
+            list(FileEvent.objects.order_by("path").values_list("path", "event")),
+            [(a, FileEvent.CREATED), (b, FileEvent.CREATED)],
+        )
+
+        self.write("a.csv", "changed")
+        os.remove(b)
+        c = self.write("c.csv", "c")
+        ignored = self.write("d.txt", "d")
+        FileEvent.objects.all().delete()
+        self.assertEqual(
+            FileScanIndex.objects.rescan_paths([a, b, c, ignored], self.specs),
+            {"created": 1, "updated": 1, "unchanged": 0, "deleted": 1},
+        )
+        self.assertEqual(
+            list(FileEvent.objects.order_by("path").values_list("path", "event")),
+            [(a, FileEvent.MODIFIED), (b, FileEvent.DELETED), (c, FileEvent.CREATED)],
+        )
+        self.assertFalse(FileScanIndex.objects.filter(path=ignored).exists())
+
+
+class FileScanIndexViewTest(TestCase):
+    def test_empty_index_queues_scan(self):
+        self.client.force_login(User.objects.create_user("user"))
+        with mock.patch.object(FileScanIndex.objects, "rescan") as rescan:
+            for __ in range(2):
+                response = self.client.get(reverse("unimported_files_dashboard"))
+                self.assertEqual(response.status_code, 200)
+        # The index isn't scanned within the request, and the scan is only queued
+        # once (until it has run)
+        rescan.assert_not_called()
+        self.assertEqual(
+            Job.objects.filter(
+                name="audits.scan_import_files", status=Job.STATUS_PENDING
+            ).count(),
+            1,
+        )
+
+    def test_stale_index_warns(self):
+        self.client.force_login(User.objects.create_user("user"))
+        entry = FileScanIndex.objects.create(
+            path="/foo.csv",
+            importer_name="import_foo",
+            size=1,
+            mtime=0,
+            hash="abc",
+            hashed_on=now(),
+            scanned_on=now(),
+        )
+        response = self.client.get(reverse("unimported_files_dashboard"))
+        self.assertNotContains(response, "may be out of date")
+
+        FileScanIndex.objects.filter(id=entry.id).update(
+            scanned_on=now() - timedelta(days=1)
+        )
+        response = self.client.get(reverse("unimported_files_dashboard"))
+        self.assertContains(response, "may be out of date")
+
+
+class WatchImportSourcesTest(SimpleTestCase):
+    def test_constant_changes_dont_starve_scans(self):
+        command = WatchCommand()
+        command.stopping = False
+        command.get_watch_paths = lambda: []
+        scanned = []
+        command.rescan = lambda paths=None: scanned.append(
+            None if paths is None else set(paths)
+        )
+        changes = iter([{"/a.csv"}, {"/b.csv"}])
+
+        class Inotify:
+            paths = []
+
+            def read(self, timeout):
+                change = next(changes)
+                if change == {"/b.csv"}:
+                    command.stopping = True
+                return change
+
+        # Every read returns a change, so the changes never settle; they (and the
+        # full rescans) must be scanned anyway
+        command.watch(Inotify(), rescan_interval=0, debounce=1, max_delay=0)
+        self.assertEqual(scanned, [{"/a.csv"}, None, {"/b.csv"}, None])
@@ -3,18 +3,18 @@ import os
 
 from django.contrib import messages
 from django.conf import settings
-from django.core.management import call_command
 from django.db import transaction
+from django.db.models import Exists, Max, OuterRef
 from django.db.utils import IntegrityError
 from django.http import HttpResponseRedirect
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils.timezone import now
 from django.views.generic import CreateView
 from django.views.generic.base import RedirectView
 from django.views.generic.base import TemplateView
 from django.views.generic.detail import DetailView
 from django.views.generic.edit import ProcessFormView
-from django.utils.safestring import mark_safe
 
 from django_tables2.views import SingleTableMixin, MultiTableMixin
 from django_import_data.views import CreateFromImportAttemptView
@@ -26,10 +26,10 @@ from django_import_data.models import (
     ModelImporter,
     RowData,
 )
-from django_import_data.utils import determine_files_to_process, hash_file
 
 
 from cases.views import FilterTableView
+from jobs.models import Job
 from .filters import (
     FileImportAttemptFilter,
     FileImporterBatchFilter,
@@ -54,6 +54,8 @@ from .tables import (
     ModelImportAttemptFailureTable,
 )
 from .forms import FileImporterForm
+from .models import FileScanIndex
+from .tasks import import_file
 from cases.models import Case, Facility, Person, PreliminaryCase, PreliminaryFacility
 from cases.forms import (
     CaseForm,
@@ -62,7 +64,6 @@ from cases.forms import (
     PreliminaryCaseForm,
     PreliminaryFacilityForm,
 )
-from utils.spec import parse_importer_spec, SPEC_FILE
 
 import logging
 
@@ -176,8 +177,8 @@ class FileImporterDetailView(MultiTableMixin, DetailView):
 
     def get_object(self, *args, **kwargs):
         instance = super().get_object(*args, **kwargs)
-        # Refresh the file info from disk
-        instance.refresh_from_filesystem()
+        # Refresh the file info from disk (if it has changed)
+        FileScanIndex.objects.refresh_file_importer(instance)
         return instance
 
 
@@ -304,8 +305,8 @@ class FileImportAttemptDetailView(MultiTableMixin, DetailView):
 
     def get_object(self, *args, **kwargs):
         instance = super().get_object(*args, **kwargs)
-        # Refresh the latest file hash from disk. Or, if not found
-        instance.file_importer.refresh_from_filesystem()
+        # Refresh the latest file hash from disk (if it has changed). Or, if not found
+        FileScanIndex.objects.refresh_file_importer(instance.file_importer)
         instance.refresh_from_db()
         return instance
 
@@ -317,7 +318,9 @@ def _import_file(
     if on_error is None:
         on_error = reverse("fileimporter_create")
     try:
-        call_command(importer_name, path, overwrite=True, durable=True, propagate=True)
+        file_importer = import_file(
+            importer_name, path, file_importer_batch=file_importer_batch
+        )
     except Exception as error:
         messages.error(
             request, f"FATAL ERROR in {path}: {error.__class__.__name__}: {error}"
@@ -327,13 +330,6 @@ def _import_file(
         transaction.set_rollback(True)
         return HttpResponseRedirect(on_error)
 
-    file_importer = get_object_or_404(
-        FileImporter, importer_name=importer_name, file_path=path
-    )
-    if file_importer_batch:
-        file_importer.file_importer_batch = file_importer_batch
-        file_importer.save()
-
     file_import_attempt = file_importer.latest_file_import_attempt
     if not quiet:
         # file_import_attempt.save()
@@ -445,7 +441,8 @@ def reimport_file(request, pk):
 
 def recheck_file(request, pk):
     file_importer = get_object_or_404(FileImporter, id=pk)
-    file_importer.refresh_from_filesystem()
+    # An explicit recheck, so the file is rescanned regardless of when it last was
+    FileScanIndex.objects.refresh_file_importer(file_importer, ttl=0)
     return HttpResponseRedirect(file_importer.get_absolute_url())
 
 
@@ -629,6 +626,19 @@ class FileImporterDashboard(SingleTableMixin, TemplateView, ProcessFormView):
 
             # Get count here, since QS will be empty soon
             num_file_importers = file_importers.count()
+            if num_file_importers > settings.JOBS_ACKNOWLEDGE_THRESHOLD:
+                # Too many to acknowledge within a request; do it via a Job
+                job = Job.objects.enqueue(
+                    "audits.acknowledge_file_importers",
+                    created_by=request.user,
+                    description=f"Acknowledge {num_file_importers} File Importers",
+                    file_importer_ids=list(
+                        file_importers.values_list("id", flat=True)
+                    ),
+                )
+                messages.info(request, f"{job} has been queued")
+                return HttpResponseRedirect(job.get_absolute_url())
+
             # Convert to string here, since this QS will be empty soon. We rely
             # on Django to concatenate the values list string to a reasonable length,
             # so we don't have to worry about doing it ourselves
@@ -649,45 +659,105 @@ class FileImporterDashboard(SingleTableMixin, TemplateView, ProcessFormView):
         return super().dispatch(request, *args, **kwargs)
 
 
-class UnimportedFilesDashboard(SingleTableMixin, TemplateView):
+# How many scan intervals can pass without a scan of every file before the views
+# that use the FileScanIndex warn that it is out of date
+STALE_FILE_SCAN_INTERVALS = 3
+
+
+class FileScanIndexMixin:
+    """For views that query the FileScanIndex rather than walk the file system
+
+    The index is kept up to date by the scan_import_files command (or by
+    watch_import_sources). If it has never been populated (e.g. on a fresh
+    install), a Job is queued to populate it (since scanning and hashing every
+    file takes far longer than a request should), and the empty index is shown in
+    the meantime. If it hasn't been fully scanned for a while, a warning is shown
+    """
+
+    def get(self, request, *args, **kwargs):
+        self.files_scanned_on = FileScanIndex.objects.aggregate(
+            scanned_on=Max("scanned_on")
+        )["scanned_on"]
+        if self.files_scanned_on is None:
+            job = Job.objects.filter(
+                name="audits.scan_import_files",
+                status__in=[Job.STATUS_PENDING, Job.STATUS_RUNNING],
+            ).first()
+            if job is None:
+                job = Job.objects.enqueue(
+                    "audits.scan_import_files",
+                    created_by=request.user,
+                    description="Scan import files",
+                )
+            messages.info(
+                request,
+                "Files on disk haven't been scanned yet, so none are shown. A scan "
+                f"has been queued (Job {job.id}); reload this page once it is done. "
+                "To scan them now instead, run the scan_import_files command",
+            )
+        else:
+            # watch_import_sources only does a full scan every
+            # FILE_WATCH_RESCAN_INTERVAL (otherwise, only changed files are scanned)
+            scan_interval = max(
+                settings.FILE_SCAN_INTERVAL, settings.FILE_WATCH_RESCAN_INTERVAL
+            )
+            since_scan = (now() - self.files_scanned_on).total_seconds()
+            if since_scan > STALE_FILE_SCAN_INTERVALS * scan_interval:
+                messages.warning(
+                    request,
+                    f"Files on disk were last scanned {since_scan / 60:.0f} minutes "
+                    "ago, so what is shown here may be out of date. Check that "
+                    "scan_import_files --interval (or watch_import_sources) is running",
+                )
+        return super().get(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["files_scanned_on"] = self.files_scanned_on
+        return context
+
+
+class UnimportedFilesDashboard(FileScanIndexMixin, SingleTableMixin, TemplateView):
     table_class = UnimportedFilesDashboardTable
     template_name = "audits/unimported_files_dashboard.html"
     # table_pagination = {"per_page": 10}
 
     def get_table_data(self):
-        # Get a set of all unique, known paths. That is, all paths that have either been imported
-        # before (FIAs), or are "owned" by an FI (even if they haven't actually been imported)
-        known_paths = set(
-            (
-                path
-                for paths in FileImportAttempt.objects.values_list(
-                    "imported_from", "file_importer__file_path"
-                )
-                for path in paths
+        # The files on disk are found (and hashed) by the scan_import_files command,
+        # so only the index needs to be queried here
+        # Exclude all known paths. That is, all paths that have either been imported
+        # before (FIAs), or are "owned" by an FI (even if they haven't actually been
+        # imported). Also exclude any files whose contents (hash) have been imported
+        # before, under whatever path
+        unimported_files = (
+            FileScanIndex.objects.annotate(
+                imported_from_path=Exists(
+                    FileImportAttempt.objects.filter(imported_from=OuterRef("path"))
+                ),
+                owned_by_file_importer=Exists(
+                    FileImportAttempt.objects.filter(
+                        file_importer__file_path=OuterRef("path")
+                    )
+                ),
+                imported_from_hash=Exists(
+                    FileImportAttempt.objects.filter(
+                        hash_when_imported=OuterRef("hash")
+                    )
+                ),
             )
-        )
-        known_hashes = set(
-            FileImportAttempt.objects.values_list("hash_when_imported", flat=True)
+            .filter(
+                imported_from_path=False,
+                owned_by_file_importer=False,
+                imported_from_hash=False,
+            )
+            .order_by("hash", "path")
+            .values_list("hash", "importer_name", "path")
         )
 
-        importer_specs = parse_importer_spec(SPEC_FILE)
-
-        unimported_file_data = []
         # A dict mapping file has to all the paths/importers with that path
         hash_to_file_data_map = defaultdict(list)
-        for importer, importer_spec in importer_specs.items():
-            paths_for_importer = determine_files_to_process(
-                importer_spec["paths"], importer_spec.get("pattern", None)
-            )
-            for path in paths_for_importer:
-                if path not in known_paths:
-                    # Only calculate the file_hash if we have to! We only care about the hash
-                    # if the path is not in known_paths (if it is in there, we aren't going
-                    # to add it to the table, regardless of the hash)
-                    file_hash = hash_file(path)
-                    if file_hash not in known_hashes:
-                        # If the hash isn't known either, then append!
-                        hash_to_file_data_map[file_hash].append((importer, path))
+        for file_hash, importer, path in unimported_files:
+            hash_to_file_data_map[file_hash].append((importer, path))
 
         # Now we unpack the dictionary into table data
         unimported_file_data = [
@@ -727,72 +797,52 @@ class UnimportedFilesDashboard(SingleTableMixin, TemplateView):
                 for file_hash in hashes_to_import
             ]
 
-        if len(to_import) > 1:
-            file_importer_batch = FileImporterBatch.objects.create(
-                command="Meta", args=[], kwargs=[]
-            )
-            print(f"Created FIB {file_importer_batch}")
-        else:
-            file_importer_batch = None
+        if not to_import:
+            messages.warning(request, "No files selected for import")
+            return HttpResponseRedirect(reverse("unimported_files_dashboard"))
 
-        for file_path, importer_name in to_import:
-            print(f"Importing {file_path} using importer  {importer_name}")
-            fia_redirect = _import_file(
-                request,
-                importer_name,
-                file_path,
-                file_importer_batch=file_importer_batch,
-                quiet=True,
-            )
-        if len(to_import) == 1:
-            redirect_to = fia_redirect
-        else:
-            redirect_to = HttpResponseRedirect(file_importer_batch.get_absolute_url())
-
-        if file_importer_batch:
-            messages.success(
-                request,
-                mark_safe(
-                    f"Successfully created <a href={file_importer_batch.get_absolute_url()}>File Import Batch {file_importer_batch.id}</a>"
-                ),
+        if len(to_import) > 1:
+            # Importing many files would time out the request, so do it via a Job
+            job = Job.objects.enqueue(
+                "audits.import_files",
+                created_by=request.user,
+                description=f"Import {len(to_import)} files",
+                to_import=to_import,
             )
+            messages.info(request, f"{job} has been queued")
+            return HttpResponseRedirect(job.get_absolute_url())
 
-        return redirect_to
+        file_path, importer_name = to_import[0]
+        logger.info(f"Importing {file_path} using importer {importer_name}")
+        return _import_file(request, importer_name, file_path, quiet=True)
 
 
-class OrphanedFilesDashboard(SingleTableMixin, TemplateView):
+class OrphanedFilesDashboard(FileScanIndexMixin, SingleTableMixin, TemplateView):
     table_class = OrphanedFilesDashboardTable
     template_name = "audits/orphaned_files_dashboard.html"
     table_pagination = {"per_page": 10}
 
     def get_table_data(self):
-        known_fi_paths = set(FileImporter.objects.values_list("file_path", flat=True))
-        known_fia_paths = set(
-            FileImportAttempt.objects.values_list("imported_from", flat=True)
-        )
-
-        importer_specs = parse_importer_spec(SPEC_FILE)
-        file_paths_on_disk = set(
-            file_path
-            for importer, importer_spec in importer_specs.items()
-            for file_path in set(
-                determine_files_to_process(
-                    importer_spec["paths"], importer_spec.get("pattern", None)
-                )
-            )
-        )
-        the_fias = FileImportAttempt.objects.filter(
-            imported_from__in=file_paths_on_disk.union(known_fia_paths).difference(
-                known_fi_paths
+        # All FIAs whose path isn't "owned" by an FI, along with whether their paths
+        # (and their FIs' paths) are on disk, per the FileScanIndex
+        the_fias = (
+            FileImportAttempt.objects.annotate(
+                owned_by_file_importer=Exists(
+                    FileImporter.objects.filter(file_path=OuterRef("imported_from"))
+                ),
+                fia_path_exists_on_disk=Exists(
+                    FileScanIndex.objects.filter(path=OuterRef("imported_from"))
+                ),
+                fi_path_exists_on_disk=Exists(
+                    FileScanIndex.objects.filter(
+                        path=OuterRef("file_importer__file_path")
+                    )
+                ),
             )
+            .filter(owned_by_file_importer=False)
+            .select_related("file_importer")
         )
 
-        for fia in the_fias:
-            fia.fia_path_exists_on_disk = fia.imported_from in file_paths_on_disk
-            fia.fi_path_exists_on_disk = (
-                fia.file_importer.file_path in file_paths_on_disk
-            )
-
         return the_fias
 
     def post(self, request, *args, **kwargs):
@@ -7,6 +7,9 @@ class CasesConfig(AppConfig):
     name = "cases"
 
     def ready(self):
+        # Connect signal handlers
+        from . import signals
+
         watson.register(self.get_model("Case"), exclude="data_type")
         watson.register(self.get_model("Facility"), exclude="data_type")
         watson.register(self.get_model("Person"), exclude="data_type")
@@ -1,4 +1,5 @@
 """Custom djang_tables2.Column sub-classes for cases app"""
+
 import os
 import re
 
@@ -76,9 +77,11 @@ title="{path}"
 
 
 class AttachmentFileColumn(UnboundFileColumn):
-    def render(self, value, bound_column, record):
-        record.refresh_from_filesystem()
-        return super().render(value, bound_column, record)
+    """A link to an Attachment's file
+
+    Files aren't checked for changes as each cell is rendered; see
+    cases.tables.AttachmentRefreshMixin
+    """
 
 
 class RemappedUnboundFileColumn(UnboundFileColumn):
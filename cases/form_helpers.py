@@ -69,10 +69,10 @@ class PreliminaryFacilityFilterFormHelper(FormHelper):
         extra_buttons=[
             Submit(
                 "_export",
-                "Export as .xls",
+                "Export as .xlsx",
                 title=(
                     "Download the locations of all currently-filtered "
-                    "PFacilities as a .xls file"
+                    "PFacilities as a .xlsx file"
                 ),
             )
         ],
@@ -128,10 +128,10 @@ class FacilityFilterFormHelper(FormHelper):
             ),
             Submit(
                 "_export",
-                "Export as .xls",
+                "Export as .xlsx",
                 title=(
                     "Download the locations of all currently-filtered "
-                    "Facilities as a .xls file"
+                    "Facilities as a .xlsx file"
                 ),
             ),
         ],
@@ -165,10 +165,10 @@ class PreliminaryCaseFilterFormHelper(FormHelper):
         extra_buttons=[
             Submit(
                 "_export",
-                "Export as .xls",
+                "Export as .xlsx",
                 title=(
                     "Download the locations of all currently-filtered "
-                    "PCases as a .xls file"
+                    "PCases as a .xlsx file"
                 ),
             )
         ],
@@ -212,10 +212,10 @@ class CaseFilterFormHelper(FormHelper):
             ),
             Submit(
                 "_export",
-                "Export as .xls",
+                "Export as .xlsx",
                 title=(
                     "Download the locations of all currently-filtered "
-                    "Facilities as a .xls file"
+                    "Facilities as a .xlsx file"
                 ),
             ),
         ],
@@ -236,10 +236,10 @@ class PersonFilterFormHelper(FormHelper):
         extra_buttons=[
             Submit(
                 "_export",
-                "Export as .xls",
+                "Export as .xlsx",
                 title=(
                     "Download the locations of all currently-filtered "
-                    "Facilities as a .xls file"
+                    "Facilities as a .xlsx file"
                 ),
             )
         ],
@@ -276,10 +276,10 @@ class StructureFilterFormHelper(FormHelper):
         extra_buttons=[
             Submit(
                 "_export",
-                "Export as .xls",
+                "Export as .xlsx",
                 title=(
                     "Download the locations of all currently-filtered "
-                    "Facilities as a .xls file"
+                    "Facilities as a .xlsx file"
                 ),
             )
         ],
@@ -4,11 +4,19 @@
 """docstring"""
 
 
+from itertools import groupby
+from xml.sax.saxutils import escape
+
 import django
 
 from pykml.factory import KML_ElementMaker as KML
 from lxml import etree
 
+KML_NAMESPACE = "http://www.opengis.net/kml/2.2"
+KML_CONTENT_TYPE = "application/vnd.google-earth.kml+xml"
+# The number of Placemarks to buffer before yielding a chunk of streamed KML
+KML_STREAM_CHUNK_SIZE = 500
+
 
 def facility_as_kml(facility):
     """Generate a Placemark from a single facility"""
@@ -45,6 +53,75 @@ def write_kml(kml, output=None):
         file.write(kml_to_string(kml))
 
 
+def placemark_kml_fragment(name, location):
+    """Generate a Placemark, as a string, from the given name and location
+
+    location is either a Point or the KML text of a geometry, as generated by
+    the database via LocationQuerySet.annotate_kml(). The latter is used verbatim,
+    which avoids needing to construct a Point at all.
+
+    This is equivalent to kml_to_string(facility_as_kml(...)), minus the
+    namespace declaration, but without building an element tree
+    """
+    name = "" if name is None else escape(str(name))
+    if isinstance(location, str):
+        geometry = location
+    else:
+        geometry = (
+            f"<Point><coordinates>{location.x},{location.y}</coordinates></Point>"
+        )
+    return f"<Placemark><name>{name}</name>{geometry}</Placemark>"
+
+
+def _chunked(fragments, chunk_size=KML_STREAM_CHUNK_SIZE):
+    chunk = []
+    for fragment in fragments:
+        chunk.append(fragment)
+        if len(chunk) >= chunk_size:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def _stream_facilities_as_kml(facility_rows):
+    yield f'<Folder xmlns="{KML_NAMESPACE}">'
+    for nrqz_id, location in facility_rows:
+        yield placemark_kml_fragment(nrqz_id, location)
+    yield "</Folder>"
+
+
+def stream_facilities_as_kml(facility_rows):
+    """Stream the equivalent of facilities_as_kml, in chunks of KML text
+
+    facility_rows is an iterable of (nrqz_id, location) tuples, e.g. from
+    values_list(...).iterator(), so no model instances or elements are created.
+    See placemark_kml_fragment for the accepted types of location
+    """
+    return _chunked(_stream_facilities_as_kml(facility_rows))
+
+
+def _stream_cases_as_kml(facility_rows):
+    yield f'<Folder xmlns="{KML_NAMESPACE}"><name>cases</name>'
+    for case_num, case_facility_rows in groupby(facility_rows, key=lambda row: row[0]):
+        yield f"<Folder><name>{escape(str(case_num))}</name>"
+        for __, nrqz_id, location in case_facility_rows:
+            yield placemark_kml_fragment(nrqz_id, location)
+        yield "</Folder>"
+    yield "</Folder>"
+
+
+def stream_cases_as_kml(facility_rows):
+    """Stream the equivalent of cases_as_kml, in chunks of KML text
+
+    facility_rows is an iterable of (case_num, nrqz_id, location) tuples, which
+    MUST be ordered by case_num. Each case becomes a Folder of its facilities'
+    Placemarks. This allows an entire export to be done via a single query over
+    Facility, with constant memory usage
+    """
+    return _chunked(_stream_cases_as_kml(facility_rows))
+
+
 def main():
     # args = parse_args()
     # kml = create_facility_placemarks(Facility.objects.all())
@@ -0,0 +1,116 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+from tqdm import tqdm
+
+from django.core.management import call_command
+from django.db import connections, transaction
+
+from importers.batch import import_batch
+from importers.converters import converter_cache
+from importers.lookups import forget_on_rollback, import_cache
+
+# The options that are passed through to the import commands that are run (per
+# file) by other commands
+SUBCOMMAND_OPTIONS = (
+    "limit",
+    "rows",
+    "overwrite",
+    "skip",
+    "dry_run",
+    "no_transaction",
+    "start_index",
+    "end_index",
+    "verbosity",
+)
+
+
+class ImportCacheMixin:
+    """Cache converted values and looked up instances for the duration of each import
+
+    Rows of the same file tend to repeat the same raw values (e.g. every sector of
+    a site has the same coordinates and frequencies), so they only need to be
+    converted once per import. Likewise, the same Cases, Attachments, etc. are
+    looked up by many rows, so each is only queried for once per import; the
+    hit/miss statistics of these lookups are reported once the import is done.
+
+    Instances created by records that fail are forgotten again, so long as
+    handle_record is decorated with forget_on_rollback(). So are those of an import
+    that fails or is a dry run, in case its lookups are shared with an enclosing one,
+    and the uncommitted ones of each file once the next file starts (see
+    import_cache())
+
+    If BATCH_WRITES is set, the writes given to importers.batch.update()/add_m2m()
+    are collected and done in bulk at the end of the import. They must be done in
+    the same transaction as the rest of it, so (unless --no-transaction is given)
+    that transaction is opened here, rather than by BaseImportCommand
+    """
+
+    BATCH_WRITES = False
+
+    def handle(self, *args, **options):
+        with converter_cache(), import_cache() as lookups:
+            with forget_on_rollback(rolled_back=options.get("dry_run", False)):
+                if self.BATCH_WRITES:
+                    result = self.handle_batched(*args, **options)
+                else:
+                    result = super().handle(*args, **options)
+            if lookups and options.get("verbosity", 1) > 0:
+                tqdm.write("Import cache:")
+                for lookup in lookups.values():
+                    tqdm.write(f"  {lookup.stats()}")
+            return result
+
+    def handle_batched(self, *args, **options):
+        if options["no_transaction"]:
+            with import_batch():
+                return super().handle(*args, **options)
+
+        # As in import_all, the transaction is opened here, so the command must be
+        # told not to open one (and so won't roll back a dry run itself)
+        with transaction.atomic():
+            with import_batch():
+                result = super().handle(*args, **{**options, "no_transaction": True})
+            if options["dry_run"]:
+                transaction.set_rollback(True)
+        return result
+
+
+def _import_files(command, paths, sub_options):
+    # Run in a worker process, which has its own database connection
+    call_command(command, *paths, **sub_options)
+
+
+def import_files_concurrently(to_import, jobs, desc="Progress"):
+    """Import each (command, paths, sub_options) of `to_import` in a pool of processes
+
+    Each group of paths is imported by a single call of the command, and so in its
+    own transaction (unless sub_options says otherwise), since separate processes
+    can't share one. Files that depend on each other (e.g. that get or create the
+    same Case) must be in the same group. Returns the paths that failed to import
+    """
+    # The worker processes are forked from this one, and must not share its
+    # database connection, so close it first. Each worker opens its own
+    connections.close_all()
+    failed = []
+    with ProcessPoolExecutor(
+        max_workers=jobs, mp_context=get_context("fork")
+    ) as executor:
+        futures = {
+            executor.submit(_import_files, command, paths, sub_options): paths
+            for command, paths, sub_options in to_import
+        }
+        for future in tqdm(
+            as_completed(futures), total=len(futures), unit="groups", desc=desc
+        ):
+            try:
+                future.result()
+            except Exception as error:
+                paths = futures[future]
+                tqdm.write(
+                    f"FATAL ERROR in {', '.join(paths)}: "
+                    f"{error.__class__.__name__}: {error}"
+                )
+                failed.extend(paths)
+
+    return failed
@@ -0,0 +1,57 @@
+"""Group related Cases and PreliminaryCases together into CaseGroups"""
+
+from tqdm import tqdm
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from cases.models import CaseGroup
+
+
+class Command(BaseCommand):
+    help = (
+        "Build CaseGroups from the references in Case/PCase comments and imported "
+        "RowData. By default only what has changed since the last build is "
+        "considered"
+    )
+
+    def add_arguments(self, parser):
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument(
+            "--full",
+            action="store_true",
+            help="Consider every Case, PCase, and RowData, not just what has changed",
+        )
+        group.add_argument(
+            "--rebuild",
+            action="store_true",
+            help=(
+                "Rebuild every CaseGroup's memberships from scratch. Unlike --full, "
+                "this also removes Cases/PCases that are no longer referenced"
+            ),
+        )
+        group.add_argument(
+            "--legacy",
+            action="store_true",
+            help=(
+                "Use the original (slow) builder, which repeatedly processes "
+                "everything until the number of CaseGroups stabilizes"
+            ),
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        if options["legacy"]:
+            CaseGroup.objects.build_all_case_groups()
+            return
+
+        if options["rebuild"]:
+            build = CaseGroup.objects.rebuild_case_groups()
+        else:
+            build = CaseGroup.objects.build_case_groups_incrementally(
+                full=options["full"]
+            )
+        tqdm.write(
+            f"{build}: created {build.num_case_groups_created} CaseGroups and "
+            f"removed {build.num_case_groups_merged}"
+        )
@@ -0,0 +1,48 @@
+"""Check (and optionally rebuild) the denormalized Case status summaries"""
+
+from tqdm import tqdm
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from cases.models import CaseStatusSummary
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare every CaseStatusSummary against the live rollup of its Case's "
+        "Facilities, and report any that are missing or out of date"
+    )
+
+    def add_arguments(self, parser):
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument(
+            "--fix",
+            action="store_true",
+            help="Refresh the summaries of any inconsistent Cases",
+        )
+        group.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Refresh the summaries of ALL Cases, without checking them first",
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            CaseStatusSummary.objects.refresh()
+            tqdm.write("Rebuilt all Case status summaries")
+            return
+
+        inconsistent = CaseStatusSummary.objects.find_inconsistent()
+        if not inconsistent:
+            tqdm.write("All Case status summaries are consistent")
+            return
+
+        tqdm.write(
+            f"Found {len(inconsistent)} Cases with missing or out of date status "
+            f"summaries: {inconsistent}"
+        )
+        if options["fix"]:
+            CaseStatusSummary.objects.refresh(inconsistent)
+            tqdm.write(f"Refreshed {len(inconsistent)} Case status summaries")
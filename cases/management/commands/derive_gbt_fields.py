@@ -0,0 +1,41 @@
+"""Derive the stored GBT distance/azimuth and NRQZ membership of all facilities"""
+
+from tqdm import tqdm
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from cases.models import Facility, PreliminaryFacility
+
+
+class Command(BaseCommand):
+    help = (
+        "Derive distance_to_gbt, azimuth_to_gbt, and in_nrqz for every Facility "
+        "and Preliminary Facility. These are backfilled by the migration that adds "
+        "them, and kept up to date automatically after that, so this is only needed "
+        "if they are suspected to be wrong"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Do everything as normal, but roll back all database changes at the end.",
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        for model in (Facility, PreliminaryFacility):
+            verbose_name_plural = model._meta.verbose_name_plural
+            num_updated = model.objects.derive_gbt_fields()
+            tqdm.write(
+                f"Derived GBT distance/azimuth for {num_updated} {verbose_name_plural}"
+            )
+            num_updated = model.objects.derive_in_nrqz()
+            tqdm.write(
+                f"Derived NRQZ membership for {num_updated} {verbose_name_plural}"
+            )
+
+        if options["dry_run"]:
+            tqdm.write("DRY RUN; rolling back changes")
+            transaction.set_rollback(True)
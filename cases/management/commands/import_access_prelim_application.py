@@ -5,7 +5,10 @@
 
 from django_import_data import BaseImportCommand
 
+from ._base_import import ImportCacheMixin
+
 from importers.handlers import handle_case, handle_attachments
+from importers.lookups import forget_on_rollback
 from importers.access_prelim_application.formmaps import (
     APPLICANT_FORM_MAP,
     CONTACT_FORM_MAP,
@@ -17,7 +20,7 @@ from importers.access_prelim_application.formmaps import (
 
 
 
-class Command(BaseImportCommand):
+class Command(ImportCacheMixin, BaseImportCommand):
     help = "Import Access Preliminary Application Data"
 
     PROGRESS_TYPE = BaseImportCommand.PROGRESS_TYPES.ROW
@@ -30,6 +33,7 @@ class Command(BaseImportCommand):
     ]
     IGNORED_HEADERS = IGNORED_HEADERS
 
+    @forget_on_rollback()
     def handle_record(self, row_data, durable=True):
         applicant, applicant_audit = APPLICANT_FORM_MAP.save_with_audit(
             row_data, imported_by=self.__module__
@@ -1,4 +1,5 @@
 from importers.handlers import get_or_create_attachment, handle_case
+from importers.lookups import forget_on_rollback
 from importers.access_prelim_technical.formmaps import (
     APPLICANT_FORM_MAP,
     PCASE_FORM_MAP,
@@ -8,8 +9,10 @@ from importers.access_prelim_technical.formmaps import (
 )
 from django_import_data import BaseImportCommand
 
+from ._base_import import ImportCacheMixin
 
-class Command(BaseImportCommand):
+
+class Command(ImportCacheMixin, BaseImportCommand):
     help = "Import Access Preliminary Technical Data"
 
     PROGRESS_TYPE = BaseImportCommand.PROGRESS_TYPES.ROW
@@ -23,6 +26,7 @@ class Command(BaseImportCommand):
     ]
     IGNORED_HEADERS = IGNORED_HEADERS
 
+    @forget_on_rollback()
     def handle_record(self, row_data, durable=True):
         applicant, applicant_audit = APPLICANT_FORM_MAP.save_with_audit(
             row_data, imported_by=self.__module__
@@ -47,7 +51,8 @@ class Command(BaseImportCommand):
             propagation_study, created = get_or_create_attachment(
                 row_data, PROPAGATION_STUDY_FORM_MAP, imported_by=self.__module__
             )
-            pfacility.propagation_study = propagation_study
-            pfacility.save()
+            # The Facility was just created, so it has no propagation study yet
             if propagation_study:
+                pfacility.propagation_study = propagation_study
+                pfacility.save(update_fields=["propagation_study"])
                 pfacility.attachments.add(propagation_study)
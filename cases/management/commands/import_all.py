@@ -10,9 +10,11 @@ from django.db import transaction
 from django_import_data.models import ModelImporter
 
 from cases.models import CaseGroup
+from ._base_import import SUBCOMMAND_OPTIONS
 from ._base_meta_import import BaseMetaImportCommand
 from utils.merge_people import handle_cross_references
 
+
 class Command(BaseMetaImportCommand):
     help = "Import all NRQZ data"
 
@@ -26,33 +28,26 @@ class Command(BaseMetaImportCommand):
             help="Don't execute any commands, just show what commands WILL executed",
         )
 
+    def get_sub_options(self, command_args, options):
+        return {
+            **command_args,
+            # TODO: Would be nice to fix this; duplicated
+            # **options
+            **{
+                option: options[option]
+                for option in SUBCOMMAND_OPTIONS
+                if option in options
+            },
+            "no_post_import_actions": True,
+        }
+
     def handle_subcommands(self, command_info, preview, **options):
         for command, command_args in tqdm(
             command_info.items(), unit="importers", desc="Overall Progress"
         ):
             tqdm.write(f"--- {command} ---")
             paths = command_args.pop("paths")
-            sub_options = {
-                **command_args,
-                # TODO: Would be nice to fix this; duplicated
-                # **options
-                **{
-                    option: options[option]
-                    for option in [
-                        "limit",
-                        "rows",
-                        "overwrite",
-                        "skip",
-                        "dry_run",
-                        "no_transaction",
-                        "start_index",
-                        "end_index",
-                        "verbosity",
-                    ]
-                    if option in options
-                },
-                "no_post_import_actions": True,
-            }
+            sub_options = self.get_sub_options(command_args, options)
             if preview:
                 tqdm.write(f"call_command({command!r}, *{paths!r}, **{sub_options!r})")
             else:
@@ -95,12 +90,14 @@ class Command(BaseMetaImportCommand):
         tqdm.write(f"--- DONE ---")
 
     def post_import_actions(self):
-        # Build case groups
-        CaseGroup.objects.build_all_case_groups()
+        # Build case groups from whatever this import changed
+        CaseGroup.objects.build_case_groups_incrementally()
         # Derive appropriate statuses for all MIs. This will also
         # propagate to all FIAs, FIs, and FIBs
         tqdm.write("Deriving status values for Model Importers")
         ModelImporter.objects.all().derive_values()
 
-        tqdm.write("Handling applicant/contact cross references (e.g. Cases where contact references applicant by string instead of key)")
-        handle_cross_references()
\ No newline at end of file
+        tqdm.write(
+            "Handling applicant/contact cross references (e.g. Cases where contact references applicant by string instead of key)"
+        )
+        handle_cross_references()
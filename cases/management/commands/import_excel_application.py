@@ -1,31 +1,40 @@
 """Import Excel Technical Data"""
 
 import os
-from urllib.parse import unquote
 
 import openpyxl
+from openpyxl.utils.cell import get_column_letter
 from tqdm import tqdm
 
 from django_import_data import BaseImportCommand
 
 
-from cases.models import Case, Facility
+from cases.models import Attachment, Case, Facility
+from importers.excel.converters import convert_excel_path
 from importers.excel.formmaps import (
+    ATTACHMENT_HEADERS,
     CASE_FORM_MAP,
     FACILITY_FORM_MAP,
     IGNORED_HEADERS,
     ATTACHMENT_FORM_MAPS,
+    NRQZ_ID_HEADERS,
     TAP_FILE_FORM_MAP,
 )
 from utils.constants import EXCEL
+from importers import batch
+from importers.converters import convert_nrqz_id_to_case_num
 from importers.handlers import handle_attachments, get_or_create_attachment
+from importers.lookups import forget_on_rollback, lookup
+from importers.excel.hyperlinks import read_hyperlinks
 from importers.excel.strip_excel_non_data import row_is_invalid
 
+from ._base_import import ImportCacheMixin
+
 DEFAULT_THRESHOLD = 0.7
 DEFAULT_PREPROCESS = False
 
 
-class Command(BaseImportCommand):
+class Command(ImportCacheMixin, BaseImportCommand):
     help = "Import Excel Technical Data"
 
     PROGRESS_TYPE = BaseImportCommand.PROGRESS_TYPES.FILE
@@ -40,6 +49,10 @@ class Command(BaseImportCommand):
 
     MODELS_TO_REIMPORT = [Facility]
 
+    # Each Facility's propagation study and Attachments are set in bulk, once every
+    # row has been handled
+    BATCH_WRITES = True
+
     def add_arguments(self, parser):
         super().add_arguments(parser)
         parser.add_argument(
@@ -71,38 +84,72 @@ class Command(BaseImportCommand):
         if not os.path.isfile(path):
             raise FileNotFoundError(f"{path} does not exist!")
         try:
-            # This sheet is used for "values" -- the last-calculated values in each cell
-            book_with_values = openpyxl.load_workbook(
-                path, read_only=True, data_only=True
-            )
-            # This workbook is used for hyperlinks only (because they don't appear when doing a "data only" export)
-            # We can't get values from this workbook; it stores formulas instead
-            book_with_formulas = openpyxl.load_workbook(path)
+            # The last-calculated values in each cell are streamed from the sheet
+            # (without loading it into memory)
+            book = openpyxl.load_workbook(path, read_only=True, data_only=True)
         except openpyxl.utils.exceptions.InvalidFileException as error:
             raise ValueError(f"{path} must be manually converted to .xls!")
         # TODO: this is a file-level error!
         try:
-            sheet_with_values = book_with_values[primary_sheet]
-            sheet_with_formulas = book_with_formulas[primary_sheet]
+            sheet = book[primary_sheet]
+            # Hyperlinks don't appear in a read-only workbook, so they are read
+            # directly from the file instead
+            hyperlinks = read_hyperlinks(path, primary_sheet)
         except KeyError:
+            book.close()
             raise ValueError(f"'{path}' is missing sheet '{primary_sheet}'")
 
+        try:
+            rows = self._load_rows_from_sheet(sheet, hyperlinks)
+        finally:
+            # Read-only workbooks keep the file open until closed
+            book.close()
+
+        self.prefetch(rows)
+        return rows
+
+    def prefetch(self, rows):
+        """Look up the Cases and Attachments of every row, in one query each
+
+        Otherwise, each would be looked up separately for every row (and every
+        sector of a site has the same Case, and often the same Attachments). The
+        values are read from the rows and converted directly, since rendering the
+        form maps (as handle_record does) would double the work of the import
+        """
+        case_nums = []
+        paths = []
+        for row in rows:
+            for header in NRQZ_ID_HEADERS:
+                try:
+                    case_nums.append(
+                        convert_nrqz_id_to_case_num(row[header])["case_num"]
+                    )
+                except (KeyError, ValueError):
+                    pass
+            for header in ATTACHMENT_HEADERS:
+                try:
+                    paths.append(convert_excel_path(row[header]))
+                except (KeyError, ValueError):
+                    pass
+
+        lookup(Case, "case_num").prefetch(case_nums)
+        lookup(Attachment, "file_path").prefetch(paths)
+
+    def _load_rows_from_sheet(self, sheet_with_values, hyperlinks):
         # TODO: Re-enable preprocessing
         # if self.preprocess:
         #     tqdm.write("Pre-processing sheet")
         #     strip_excel_sheet(sheet, threshold=self.threshold)
         rows_with_values = sheet_with_values.rows
-        rows_with_formulas = sheet_with_formulas.rows
 
         headers_from_rows_with_values = next(rows_with_values)
-        headers_from_rows_with_formulas = next(rows_with_formulas)
-        assert len(headers_from_rows_with_values) == len(
-            headers_from_rows_with_formulas
-        )
         headers = [
             c.value if c.value is not None else ""
             for c in headers_from_rows_with_values
         ]
+        # Read-only rows always start at column A (empty cells are padded), so a
+        # cell's coordinate is determined by its position in its row
+        columns = [get_column_letter(col) for col in range(1, len(headers) + 1)]
 
         # assert len(headers) == len(rows_with_values) == len(rows_with_formulas)
         # num_rows = len(rows_with_values)
@@ -119,9 +166,7 @@ class Command(BaseImportCommand):
 
         row_number = 1
         sheet = []
-        for row_with_values, row_with_formulas in zip(
-            rows_with_values, rows_with_formulas
-        ):
+        for row_with_values in rows_with_values:
             if invalid_row_run > 100:
                 tqdm.write(
                     f"More than 100 empty rows in a row! Exiting on row {row_number}!"
@@ -133,12 +178,13 @@ class Command(BaseImportCommand):
             else:
                 invalid_row_run = 0
                 row_dict = {}
-                for header, cell_with_values, cell_with_formulas in zip(
-                    headers, row_with_values, row_with_formulas
+                for header, column, cell_with_values in zip(
+                    headers, columns, row_with_values
                 ):
-                    hyperlink = getattr(cell_with_formulas, "hyperlink", None)
+                    # The header is row 1
+                    hyperlink = hyperlinks.get(f"{column}{row_number + 1}")
                     if hyperlink:
-                        value = unquote(hyperlink.target)
+                        value = hyperlink
                     else:
                         value = cell_with_values.value
                     if header in row_dict:
@@ -166,9 +212,9 @@ class Command(BaseImportCommand):
                 raise ValueError(error_str)
 
         case_num = case_form["case_num"].value()
-        try:
-            case = Case.objects.get(case_num=case_num)
-        except Case.DoesNotExist:
+        cases = lookup(Case, "case_num")
+        case = cases.get(case_num)
+        if not case:
             case, case_audit = CASE_FORM_MAP.save_with_audit(
                 row_data=row_data,
                 form=case_form,
@@ -176,6 +222,7 @@ class Command(BaseImportCommand):
                 allow_unknown=True,
                 imported_by=self.__module__,
             )
+            cases.remember(case_num, case)
             case_created = True
         else:
             # if not self.durable:
@@ -219,6 +266,7 @@ class Command(BaseImportCommand):
                     unmapped_headers.append(header)
         return unmapped_headers
 
+    @forget_on_rollback()
     def handle_record(self, row_data, durable=True):
         case, case_created = self._handle_case(row_data)
         if case_created:
@@ -232,18 +280,19 @@ class Command(BaseImportCommand):
         facility, facility_created = self._handle_facility(row_data, case)
 
         if facility:
-            attachments = handle_attachments(
-                row_data=row_data,
-                model=facility,
-                form_maps=ATTACHMENT_FORM_MAPS,
-                imported_by=self.__module__,
-            )
             propagation_study, attachment_created = get_or_create_attachment(
                 row_data=row_data,
                 form_map=TAP_FILE_FORM_MAP,
                 imported_by=self.__module__,
             )
-            facility.propagation_study = propagation_study
-            facility.save()
+            # The Facility was just created, so it has no propagation study yet
             if propagation_study:
-                facility.attachments.add(propagation_study)
+                facility.propagation_study = propagation_study
+                batch.update(facility, ["propagation_study"])
+            attachments = handle_attachments(
+                row_data=row_data,
+                model=facility,
+                form_maps=ATTACHMENT_FORM_MAPS,
+                imported_by=self.__module__,
+                extra_attachments=[propagation_study],
+            )
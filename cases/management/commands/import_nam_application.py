@@ -1,20 +1,47 @@
 """Import NRQZ Analyzer Data"""
 
-import re
+from django.core.management.base import CommandError
 
 from django_import_data import BaseImportCommand
+from django_import_data.utils import determine_files_to_process
 
+from ._base_import import (
+    SUBCOMMAND_OPTIONS,
+    ImportCacheMixin,
+    import_files_concurrently,
+)
+
+from importers.converters import convert_nrqz_id_to_case_num
 from importers.handlers import handle_case
+from importers.lookups import forget_on_rollback
 from importers.nrqz_analyzer.formmaps import (
     CASE_FORM_MAP,
     FACILITY_FORM_MAP,
     IGNORED_HEADERS,
 )
+from importers.nrqz_analyzer.parser import parse_nam_file, read_nrqz_id
+
 
-COMMENT_REGEX = re.compile(r"\d{2}\s*[a-zA-Z]{3,6}\s*\d{2,4}")
+def group_files_by_case(paths):
+    """Group the given NAM files by the case number of their nrqzID
 
+    The files of a Case must be imported in the same transaction, since otherwise
+    each would try to create the Case (which has a unique case_num) concurrently.
+    Files whose case number can't be determined are each put in a group of their
+    own; importing them will report why
+    """
+    groups = {}
+    for path in paths:
+        try:
+            nrqz_id = read_nrqz_id(path)
+            key = convert_nrqz_id_to_case_num(nrqz_id)["case_num"] if nrqz_id else path
+        except (OSError, ValueError):
+            key = path
+        groups.setdefault(key, []).append(path)
+    return list(groups.values())
 
-class Command(BaseImportCommand):
+
+class Command(ImportCacheMixin, BaseImportCommand):
     help = "Import NRQZ Application Maker Data"
 
     PROGRESS_TYPE = BaseImportCommand.PROGRESS_TYPES.FILE
@@ -24,124 +51,75 @@ class Command(BaseImportCommand):
 
     MODELS_TO_REIMPORT = ["facility"]
 
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            default=1,
+            help="The number of files to import concurrently. The files of each Case "
+            "are imported together, in their own process and transaction. Since "
+            "these are committed separately, a failure can't roll back the files "
+            "already imported, so this requires --allow-partial (unless --dry-run, "
+            "which rolls back every file)",
+        )
+        parser.add_argument(
+            "--allow-partial",
+            action="store_true",
+            help="Allow --jobs, accepting that if any file fails to import, the "
+            "other files remain committed",
+        )
+
+    def handle(self, *args, **options):
+        jobs = options.pop("jobs")
+        allow_partial = options.pop("allow_partial")
+        if jobs == 1:
+            return super().handle(*args, **options)
+
+        # Each NAM file is a single row, and only depends on the other files of the
+        # same Case. So the files are grouped by Case, and each group is imported
+        # in its own transaction. A dry run (which rolls back each of them) is
+        # fine, but otherwise a failure leaves the other groups committed
+        if not options["dry_run"] and not allow_partial:
+            raise CommandError(
+                "With --jobs, files are committed as they are imported, so a failure "
+                "leaves a partial import; give --allow-partial to accept that (or "
+                "leave out --jobs to import in a single transaction)"
+            )
+        sub_options = {
+            option: options[option]
+            for option in SUBCOMMAND_OPTIONS
+            if option in options
+        }
+        paths = determine_files_to_process(
+            options["paths"], options.get("pattern", None)
+        )
+        to_import = [
+            (self.__module__.split(".")[-1], group, sub_options)
+            for group in group_files_by_case(paths)
+        ]
+        failed = import_files_concurrently(to_import, jobs)
+        if failed:
+            raise CommandError(
+                f"{len(failed)} files failed to import. Failed files: {failed}"
+            )
+
     def load_rows(self, path):
-        with open(path, newline="", encoding="latin1") as file:
-            lines = file.readlines()
-
-        return [lines]
-
-    def deconstruct_data(self, data, facility_dict_terminator):
-        # Strip off the version line
-        lines = data[1:]
-        # lines = row.split("\n")
-        # The "main" dict holds all of the non-facility info
-        main_dict = {}
-        # The Facility dicts holds a facility dict for each facility in
-        # the facility table
-        facility_dicts = []
-        facility_dict = None
-        errors = {}
-        for line in lines:
-            stripped = line.strip()
-            if stripped:
-                parts = [part for part in stripped.split(":") if part]
-                key = parts[0]
-                value = ":".join(parts[1:])
-
-                if ":" not in stripped:
-                    errors.setdefault("non_key_value_rows", [])
-                    errors["non_key_value_rows"].append(stripped)
-                    main_dict.setdefault("comments", "")
-                    main_dict["comments"] += line
-
-                # If we are "in" a Facility dict...
-                if facility_dict:
-                    # ...put the current key/value pair into it
-                    if key not in facility_dict:
-                        if value:
-                            facility_dict[key] = value
-                        # ga2gbt marks the end of a "facility run". So, once we reach
-                        # that we add the facility dict to our list thereof and
-                        # null out the facility_dict so the cycle can continue
-                        if key == facility_dict_terminator:
-                            if facility_dict:
-                                facility_dicts.append(facility_dict)
-                            facility_dict = None
-                    # Unless it is already there, which should never happen
-                    else:
-                        raise ValueError(
-                            f"Key {key} found more than once in a single Facility dict!"
-                        )
-
-                # If we are NOT in a Facility dict...
-                else:
-                    # type marks the beginning of a "facility run"
-                    if key == "type":
-                        # So, we start a new dict to hold its info. Note that we
-                        # add both the "type" here, AND the nrqzID. This is so
-                        # that each Facility knows what its nrqzID and case number are
-                        facility_dict = {
-                            key: value
-                            for key, value in main_dict.items()
-                            if key in ["nrqzID", "lat", "lon"]
-                        }
-                        if value:
-                            if value not in facility_dict:
-                                facility_dict["type"] = value
-                            else:
-                                raise ValueError("fajsdfsad")
-                    # For all other keys, simply add them to the main dict
-                    else:
-                        if value:
-                            # Last value wins...
-                            main_dict[key] = value
-                            # if key not in main_dict:
-                            #     main_dict[key] = value
-                            # else:
-                            #     raise ValueError(
-                            #         f"Key {key} found more than once in the 'main' dict!"
-                            #     )
-
-                            m = COMMENT_REGEX.match(line)
-                            if m:
-                                main_dict.setdefault("comments", "")
-                                main_dict["comments"] += line
-        return main_dict, facility_dicts, errors
-
-    def handle_v1_format(self, data):
-        return self.deconstruct_data(data, facility_dict_terminator="ga2gbt")
-
-    def handle_v2_format(self, data):
-        return self.deconstruct_data(data, facility_dict_terminator="PanRng")
-
-    def derive_keys(self, data):
-        keys = set()
-        for line in data:
-            stripped = line.strip()
-            if stripped:
-                parts = [part for part in stripped.split(":") if part]
-                key = parts[0]
-                keys.add(key)
-
-        return sorted(keys)
+        # The file is parsed as it is read, so that its lines never need to be
+        # held in memory, or revisited
+        return [parse_nam_file(path)]
 
+    @forget_on_rollback()
     def handle_record(self, row_data, durable=True):
-        version = row_data.data[0].strip()
-        if version == "nrqzApp v1":
-            main_dict, facility_dicts, errors = self.handle_v1_format(row_data.data)
-        elif version == "nrqzApp v2":
-            main_dict, facility_dicts, errors = self.handle_v2_format(row_data.data)
-        else:
-            raise ValueError(f"Unknown version: {version}")
-
-        if errors:
-            row_data.file_import_attempt.errors.update(errors)
+        parsed = row_data.data
+        main_dict = parsed["main_dict"]
+        facility_dicts = parsed["facility_dicts"]
+        if parsed["errors"]:
+            row_data.file_import_attempt.errors.update(parsed["errors"])
             row_data.file_import_attempt.save()
 
-        original_headers = self.derive_keys(row_data.data)
-        row_data.headers = original_headers
-        fixed_row_data = {"main_dict": main_dict, "facility_dicts": facility_dicts}
-        row_data.data = fixed_row_data
+        row_data.headers = parsed["headers"]
+        row_data.data = {"main_dict": main_dict, "facility_dicts": facility_dicts}
         row_data.save()
         case, case_created = handle_case(
             row_data, CASE_FORM_MAP, data=main_dict, imported_by=self.__module__
@@ -10,7 +10,8 @@ from django.db import transaction
 from django_import_data import BaseImportCommand
 
 from cases.models import Person
-from utils.merge_people import find_similar_people, merge_people
+from utils.dedup import find_duplicate_groups
+from utils.merge_people import merge_people
 
 THRESHOLD_DEFAULT = 0.9
 
@@ -150,28 +151,13 @@ class Command(BaseImportCommand):
         if limit is not None:
             num_people = people.count() * limit
             people = Person.objects.filter(id__lt=num_people)
+        # Load every name and email once, and find similar people in memory,
+        # rather than querying the table once per Person
+        people = list(people.values_list("id", "name", "email"))
         tqdm.write(f"Processing {len(people)}/{Person.objects.count()} people")
 
         # A list of lists of the IDs of Person objects that need to be merged together
-        people_ids_to_merge = []
-        processed = set()
-        for person in tqdm(people, unit="people"):
-            unprocessed_people = people.exclude(id__in=processed)
-            similar_people = find_similar_people(
-                person, threshold=threshold, people=unprocessed_people
-            )
-            # We must exclude any people that have already been processed, because
-            # this means they are already in people_ids_to_merge. If we didn't
-            # exclude them here, we would get duplicates in people_ids_to_merge
-            num_similar_people = similar_people.count()
-            if num_similar_people > 1:
-                tqdm.write(
-                    f"Found {num_similar_people} names >{threshold} similar to "
-                    f"name {person.name!r} and email {person.email!r}"
-                )
-                ids = list(similar_people.values_list("id", flat=True))
-                people_ids_to_merge.append(ids)
-                processed.update(ids)
+        people_ids_to_merge = find_duplicate_groups(people, threshold=threshold)
 
         # "Inflate" the merge groups and count how many people are in each,
         # to get a total number of people that are going to merged
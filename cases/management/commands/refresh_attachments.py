@@ -0,0 +1,65 @@
+"""Refresh the file info (hash, etc.) of Attachments from disk"""
+
+from tqdm import tqdm
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from cases.models import Attachment
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the file info of Attachments from disk, re-hashing only the files "
+        "that have changed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ids",
+            type=int,
+            nargs="+",
+            help="The IDs of the Attachments to refresh (default: all of them)",
+        )
+        parser.add_argument(
+            "-j",
+            "--workers",
+            type=int,
+            default=settings.ATTACHMENT_REFRESH_WORKERS,
+            help="The number of files to check concurrently",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=settings.ATTACHMENT_REFRESH_CHUNK_SIZE,
+            help="The number of Attachments to save at a time",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Re-hash every file, even those whose size and modification time "
+            "haven't changed",
+        )
+
+    def handle(self, *args, **options):
+        attachments = Attachment.objects.all()
+        if options["ids"]:
+            attachments = attachments.filter(id__in=options["ids"])
+
+        with tqdm(unit="files", disable=options["verbosity"] < 1) as progress_bar:
+
+            def progress(done, total=None, message=None):
+                if total is not None:
+                    progress_bar.total = total
+                progress_bar.update(done - progress_bar.n)
+
+            counts = Attachment.objects.refresh_attachments(
+                attachments,
+                workers=options["workers"],
+                chunk_size=options["chunk_size"],
+                force=options["force"],
+                progress=progress,
+            )
+        self.stdout.write(
+            ", ".join(f"{count} {status}" for status, count in counts.items())
+        )
@@ -1,13 +1,21 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import chain
+import logging
 import os
 import re
 
 from tqdm import tqdm
 
 from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
 from django.contrib.gis.db.models.functions import AsKML, Azimuth, Distance
 from django.db.models import (
     BooleanField,
     Case as CASE,
+    CharField,
     F,
     Func,
     Q,
@@ -18,11 +26,17 @@ from django.db.models import (
     Count,
     Max,
 )
-from django.utils.functional import cached_property
+from django.db.models.functions import Cast
+from django.utils.timezone import now, utc
 
 from django_import_data.querysets import TrackedFileQueryset
+from django_import_data.utils import hash_file
 
 from importers.converters import coerce_none
+from .reference import get_gbt_location, get_nrqz_bounds
+from utils.union_find import UnionFind
+
+logger = logging.getLogger(__name__)
 
 # https://regex101.com/r/g6NM6e/5
 CASE_REGEX = re.compile(r"(?<=(?:NRQZ|CASE))\D*(\d{3,7}.*)", re.IGNORECASE)
@@ -69,36 +83,58 @@ def derive_related_case_nums_from_comments(comments):
     return case_nums
 
 
+def derive_related_nums_from_row_data(prev_cases, nrqz_links):
+    """Given the PrevCases and nrqzLinks of a RowData, derive related case nums
+
+    Returns a tuple of (case nums, pcase nums)
+    """
+    related_case_nums = set()
+    related_pcase_nums = set()
+    for text in (coerce_none(prev_cases), coerce_none(nrqz_links)):
+        if text:
+            related_case_nums.update(derive_nums_from_text(text, NAM_CASE_REGEX))
+            related_pcase_nums.update(derive_nums_from_text(text, PCASE_REGEX))
+
+    return related_case_nums, related_pcase_nums
+
+
 class LocationQuerySet(QuerySet):
-    @cached_property
+    # These are cached across querysets (and processes); see cases.reference
+    @property
     def GBT(self):
-        return apps.get_model("cases", "Location").objects.get(name="GBT").location
+        return get_gbt_location()
 
-    @cached_property
+    @property
     def NRQZ(self):
-        return apps.get_model("cases", "Boundaries").objects.get(name="NRQZ").bounds
-
-    def annotate_distance_to_gbt(self):
-        return self.annotate(distance_to_gbt=Distance(F("location"), self.GBT))
+        """The NRQZ bounds Polygon, or None if not defined"""
+        return get_nrqz_bounds()
 
-    def annotate_azimuth_to_gbt(self):
-        """Add an "azimuth_to_gbt" annotation that indicates the azimuth bearing to the GBT (in degrees)"""
-        return self.annotate(
-            azimuth_radians_to_gbt=Azimuth(F("location"), self.GBT),
-            azimuth_to_gbt=Func(F("azimuth_radians_to_gbt"), function="DEGREES"),
+    def derive_gbt_fields(self):
+        """Update the stored distance_to_gbt and azimuth_to_gbt of every object (in bulk)"""
+        return self.update(
+            distance_to_gbt=Distance(F("location"), self.GBT),
+            azimuth_to_gbt=Func(Azimuth(F("location"), self.GBT), function="DEGREES"),
         )
 
-    def annotate_in_nrqz(self):
-        """Add an "in_nrqz" annotation that indicates whether each Facility is inside or outside the NRQZ"""
-        return self.annotate(
-            in_nrqz=CASE(
-                When(location__intersects=self.NRQZ, then=Value(True)),
-                default=Value(False),
-                output_field=BooleanField(),
-            )
+    def derive_in_nrqz(self):
+        """Update the stored in_nrqz of every object (in bulk)
+
+        As in AbstractBaseFacility.get_in_nrqz, nothing is in an undefined NRQZ
+        """
+        nrqz = self.NRQZ
+        if nrqz is None:
+            whens = [When(location__isnull=True, then=Value(None))]
+        else:
+            whens = [
+                When(location__isnull=True, then=Value(None)),
+                When(location__intersects=nrqz, then=Value(True)),
+            ]
+        return self.update(
+            in_nrqz=CASE(*whens, default=Value(False), output_field=BooleanField())
         )
 
     def annotate_kml(self):
+        """Add a "kml" annotation containing the KML of each location, generated by PostGIS"""
         return self.annotate(kml=AsKML("location"))
 
 
@@ -106,6 +142,14 @@ LocationManager = lambda: LocationQuerySet.as_manager()
 
 
 class CaseManager(Manager):
+    def build_case_groups(self):
+        """Rebuild all CaseGroups; see CaseGroupManager.rebuild_case_groups
+
+        Note that this considers both Cases and PreliminaryCases, regardless of
+        which this is called on
+        """
+        return apps.get_model("cases", "CaseGroup").objects.rebuild_case_groups()
+
     def audit_case_groups(self):
         """Return Cases not in a Case Group, but with comments containing numbers"""
         return self.annotate(
@@ -114,38 +158,71 @@ class CaseManager(Manager):
             num_related=F("num_related_pcases") + F("num_related_cases"),
         ).filter(comments__regex=r"\d", num_related=0)
 
-    def annotate_stuff(self, queryset=None):
+    # The fields added by annotate_rollup
+    ROLLUP_FIELDS = (
+        "num_facilities",
+        "meets_erpd_limit",
+        "sgrs_approval",
+        "si_done",
+        "si_pending",
+    )
+
+    def annotate_rollup(self, queryset=None):
+        """Annotate the rollup of each Case's Facilities' approval statuses
+
+        Everything is computed via a single GROUP BY over one join to Facility.
+        The following are added (see ROLLUP_FIELDS):
+
+        num_facilities: The number of Facilities
+        meets_erpd_limit: None if there are no Facilities, or if any are pending;
+            otherwise True if all meet the ERPd limit, else False
+        sgrs_approval: As above, but for SGRS approval
+        si_done: The date of the latest site inspection
+        si_pending: The number of Facilities that have not yet been inspected
+        """
         if queryset is None:
             queryset = self.all()
-        queryset = queryset.annotate(
-            num_facilities=Count("facilities"),
-            sgrs_pending=Count("id", filter=Q(facilities__sgrs_approval=None)),
-            sgrs_approvals=Count("id", filter=Q(facilities__sgrs_approval=True)),
-        )
-        queryset = queryset.annotate(
-            sgrs_approval=CASE(
-                When(sgrs_pending__gt=0, then=Value(None)),
-                When(sgrs_approvals=F("num_facilities"), then=Value(True)),
+
+        def _rollup(pending, passed):
+            return CASE(
+                When(num_facilities=0, then=Value(None)),
+                When(**{f"{pending}__gt": 0}, then=Value(None)),
+                When(**{passed: F("num_facilities")}, then=Value(True)),
                 default=Value(False),
                 output_field=BooleanField(),
             )
-        )
+
         queryset = queryset.annotate(
             num_facilities=Count("facilities"),
-            erpd_limit_pending=Count("id", filter=Q(facilities__meets_erpd_limit=None)),
-            erpd_limit_pass=Count("id", filter=Q(facilities__meets_erpd_limit=True)),
+            erpd_limit_pending=Count(
+                "facilities", filter=Q(facilities__meets_erpd_limit=None)
+            ),
+            erpd_limit_pass=Count(
+                "facilities", filter=Q(facilities__meets_erpd_limit=True)
+            ),
+            sgrs_pending=Count("facilities", filter=Q(facilities__sgrs_approval=None)),
+            sgrs_approvals=Count(
+                "facilities", filter=Q(facilities__sgrs_approval=True)
+            ),
+            si_pending=Count("facilities", filter=Q(facilities__si_done=None)),
+            si_done=Max("facilities__si_done"),
         )
-        queryset = queryset.annotate(
-            meets_erpd_limit=CASE(
-                When(erpd_limit_pending__gt=0, then=Value(None)),
-                When(erpd_limit_pass=F("num_facilities"), then=Value(True)),
-                default=Value(False),
-                output_field=BooleanField(),
-            )
+        return queryset.annotate(
+            meets_erpd_limit=_rollup("erpd_limit_pending", "erpd_limit_pass"),
+            sgrs_approval=_rollup("sgrs_pending", "sgrs_approvals"),
+        )
+
+    def annotate_status_summary(self, queryset=None):
+        """Annotate the same fields as annotate_rollup, but from CaseStatusSummary
+
+        This is a join to a single row per Case, instead of an aggregation
+        over all of its Facilities
+        """
+        if queryset is None:
+            queryset = self.all()
+        return queryset.annotate(
+            **{field: F(f"status_summary__{field}") for field in self.ROLLUP_FIELDS}
         )
-        queryset = queryset.annotate(num_facilities=Count("facilities"))
-        queryset = queryset.annotate(si_done=Max("facilities__si_done"))
-        return queryset
 
 
 class CaseGroupManager(Manager):
@@ -283,38 +360,23 @@ class CaseGroupManager(Manager):
         ):
             self._build_case_groups(comments, case_num, PreliminaryCase)
 
-    def _build_case_groups_from_row_data(self):
+    def _get_row_data_with_possible_links(self):
         RowData = apps.get_model("django_import_data", "RowData")
-        row_data_with_possible_links = RowData.objects.filter(
-            data__main_dict__has_any_keys=["nrqz_links", "PrevCases"]
+        return RowData.objects.filter(
+            data__main_dict__has_any_keys=["nrqz_links", "nrqzLinks", "PrevCases"]
         )
+
+    def _build_case_groups_from_row_data(self):
         for prev_cases, nrqz_links in tqdm(
-            row_data_with_possible_links.values_list(
+            self._get_row_data_with_possible_links().values_list(
                 "data__main_dict__PrevCases", "data__main_dict__nrqzLinks"
             ),
             unit="RowData",
         ):
-            prev_cases = coerce_none(prev_cases)
-            nrqz_links = coerce_none(nrqz_links)
             tqdm.write(f"prev_cases: {prev_cases!r}, nrqz_links: {nrqz_links!r}")
-            related_case_nums = set()
-            related_pcase_nums = set()
-            if prev_cases:
-                related_case_nums.update(
-                    derive_nums_from_text(prev_cases, NAM_CASE_REGEX)
-                )
-                related_pcase_nums.update(
-                    derive_nums_from_text(prev_cases, PCASE_REGEX)
-                )
-
-            if nrqz_links:
-                related_case_nums.update(
-                    derive_nums_from_text(nrqz_links, NAM_CASE_REGEX)
-                )
-                related_pcase_nums.update(
-                    derive_nums_from_text(nrqz_links, PCASE_REGEX)
-                )
-
+            related_case_nums, related_pcase_nums = derive_related_nums_from_row_data(
+                prev_cases, nrqz_links
+            )
             tqdm.write(
                 f"related_case_nums: {related_case_nums}, related_pcase_nums: {related_pcase_nums}"
             )
@@ -341,6 +403,506 @@ class CaseGroupManager(Manager):
 
         print(f"Number of CaseGroups stabilized at {num_case_groups}")
 
+    def _get_links(self, cases, pcases, row_data):
+        """Yield a set of ("case", case_num)/("pcase", case_num) nodes per link
+
+        Every node in a link belongs in the same CaseGroup. Each Case/PCase links
+        at least to itself, so that it gets a CaseGroup even if it doesn't
+        reference anything. Case nums are strings (since Case.case_num is), so that
+        they compare equal to those from the database
+        """
+        for kind, queryset in (("case", cases), ("pcase", pcases)):
+            for comments, case_num in tqdm(
+                queryset.values_list("comments", "case_num").iterator(), unit=kind
+            ):
+                yield {
+                    (kind, str(case_num)),
+                    *(
+                        ("case", str(num))
+                        for num in derive_related_case_nums_from_comments(comments)
+                    ),
+                    *(
+                        ("pcase", str(num))
+                        for num in derive_nums_from_text(comments, PCASE_REGEX)
+                    ),
+                }
+
+        for prev_cases, nrqz_links in tqdm(
+            row_data.values_list(
+                "data__main_dict__PrevCases", "data__main_dict__nrqzLinks"
+            ).iterator(),
+            unit="RowData",
+        ):
+            case_nums, pcase_nums = derive_related_nums_from_row_data(
+                prev_cases, nrqz_links
+            )
+            yield {
+                *(("case", str(num)) for num in case_nums),
+                *(("pcase", str(num)) for num in pcase_nums),
+            }
+
+    def _link_ids(self, links):
+        """Return a UnionFind of the IDs of the Cases/PCases in the given links
+
+        Nodes are ("case", Case ID) or ("pcase", PCase ID). Only Cases and PCases
+        that actually exist can be grouped; references to anything else are recorded
+        as CaseGroupPendingReferences, so that they can be re-applied once they do
+        (see _get_resolved_links)
+        """
+        CaseGroupPendingReference = apps.get_model("cases", "CaseGroupPendingReference")
+        Case = apps.get_model("cases", "Case")
+        PreliminaryCase = apps.get_model("cases", "PreliminaryCase")
+
+        case_nums = {num for link in links for kind, num in link if kind == "case"}
+        pcase_nums = {num for link in links for kind, num in link if kind == "pcase"}
+        ids_by_node = {
+            **{
+                ("case", str(case_num)): ("case", id_)
+                for case_num, id_ in Case.objects.filter(
+                    case_num__in=case_nums
+                ).values_list("case_num", "id")
+            },
+            **{
+                ("pcase", str(case_num)): ("pcase", id_)
+                for case_num, id_ in PreliminaryCase.objects.filter(
+                    case_num__in=pcase_nums
+                ).values_list("case_num", "id")
+            },
+        }
+
+        union_find = UnionFind()
+        pending_references = []
+        for link in links:
+            nodes = [ids_by_node[node] for node in link if node in ids_by_node]
+            for node in nodes:
+                union_find.union(nodes[0], node)
+            # A link to nothing but its own source has nothing left to resolve
+            if len(link) > 1:
+                pending_references.extend(
+                    CaseGroupPendingReference(
+                        kind=kind,
+                        case_num=num,
+                        link=sorted([kind_, num_] for kind_, num_ in link),
+                    )
+                    for kind, num in link
+                    if (kind, num) not in ids_by_node
+                )
+
+        CaseGroupPendingReference.objects.bulk_create(
+            pending_references, batch_size=1000, ignore_conflicts=True
+        )
+        return union_find
+
+    def _get_resolved_links(self):
+        """Yield the links of the pending references that now exist, and delete them
+
+        These are links from Cases/PCases/RowData that referenced a case num before
+        it was created. Since their sources won't necessarily ever change again,
+        they would otherwise never be grouped with it. Any of their nodes that are
+        still missing are recorded again by _link_ids
+        """
+        Case = apps.get_model("cases", "Case")
+        PreliminaryCase = apps.get_model("cases", "PreliminaryCase")
+        CaseGroupPendingReference = apps.get_model("cases", "CaseGroupPendingReference")
+
+        resolved = CaseGroupPendingReference.objects.filter(
+            Q(kind="case", case_num__in=Case.objects.values("case_num"))
+            | Q(
+                kind="pcase",
+                case_num__in=PreliminaryCase.objects.annotate(
+                    num=Cast("case_num", CharField())
+                ).values("num"),
+            )
+        )
+        links = {
+            frozenset(tuple(node) for node in link)
+            for link in resolved.values_list("link", flat=True)
+        }
+        resolved.delete()
+        tqdm.write(f"Resolved {len(links)} pending references")
+        yield from links
+
+    def _apply_links(self, links):
+        """Merge the given links into the existing CaseGroups
+
+        This is the same fixed point that build_all_case_groups iterates towards,
+        but computed in a single pass: links, and the memberships of every existing
+        CaseGroup that they touch, are merged into connected components in memory,
+        and then only the memberships that have changed are written (in bulk).
+
+        Returns a tuple of (# CaseGroups created, # CaseGroups merged away)
+        """
+        CaseGroupCase = self.model.cases.through
+        CaseGroupPCase = self.model.pcases.through
+
+        links = list(links)
+        # Nodes are ("case", Case ID), ("pcase", PCase ID), and ("group", CaseGroup
+        # ID); the latter link every member of an existing CaseGroup together
+        union_find = self._link_ids(links)
+
+        case_ids = [id_ for kind, id_ in union_find if kind == "case"]
+        pcase_ids = [id_ for kind, id_ in union_find if kind == "pcase"]
+        group_ids = set(
+            CaseGroupCase.objects.filter(case_id__in=case_ids).values_list(
+                "casegroup_id", flat=True
+            )
+        ) | set(
+            CaseGroupPCase.objects.filter(preliminarycase_id__in=pcase_ids).values_list(
+                "casegroup_id", flat=True
+            )
+        )
+        existing_memberships = set()
+        for group_id, case_id in CaseGroupCase.objects.filter(
+            casegroup_id__in=group_ids
+        ).values_list("casegroup_id", "case_id"):
+            existing_memberships.add((group_id, ("case", case_id)))
+            union_find.union(("group", group_id), ("case", case_id))
+        for group_id, pcase_id in CaseGroupPCase.objects.filter(
+            casegroup_id__in=group_ids
+        ).values_list("casegroup_id", "preliminarycase_id"):
+            existing_memberships.add((group_id, ("pcase", pcase_id)))
+            union_find.union(("group", group_id), ("pcase", pcase_id))
+
+        components = list(union_find.groups().values())
+        # Components without an existing CaseGroup each need a new one
+        new_groups = self.bulk_create(
+            [
+                self.model()
+                for component in components
+                if not any(kind == "group" for kind, __ in component)
+            ]
+        )
+        new_group_ids = iter(case_group.id for case_group in new_groups)
+        groups_to_delete = []
+        new_memberships = []
+        for component in components:
+            component_group_ids = sorted(
+                id_ for kind, id_ in component if kind == "group"
+            )
+            if component_group_ids:
+                # Keep the oldest CaseGroup (so that its name and comments are
+                # kept); the others are merged into it
+                group_id, *merged_group_ids = component_group_ids
+                groups_to_delete.extend(merged_group_ids)
+            else:
+                group_id = next(new_group_ids)
+            new_memberships.extend(
+                (group_id, node)
+                for node in component
+                if node[0] != "group" and (group_id, node) not in existing_memberships
+            )
+
+        CaseGroupCase.objects.bulk_create(
+            [
+                CaseGroupCase(casegroup_id=group_id, case_id=id_)
+                for group_id, (kind, id_) in new_memberships
+                if kind == "case"
+            ],
+            batch_size=1000,
+        )
+        CaseGroupPCase.objects.bulk_create(
+            [
+                CaseGroupPCase(casegroup_id=group_id, preliminarycase_id=id_)
+                for group_id, (kind, id_) in new_memberships
+                if kind == "pcase"
+            ],
+            batch_size=1000,
+        )
+        # This also deletes their memberships (which have been copied above)
+        self.filter(id__in=groups_to_delete).delete()
+        tqdm.write(
+            f"Considered {len(links)} links; created {len(new_groups)} CaseGroups, "
+            f"merged away {len(groups_to_delete)}, and added {len(new_memberships)} "
+            "memberships"
+        )
+        return len(new_groups), len(groups_to_delete)
+
+    def build_case_groups_incrementally(self, full=False):
+        """Build CaseGroups from only what has changed since the last build
+
+        That is: Cases and PCases modified since the last build started, RowData
+        created since then, and the links of any CaseGroupPendingReferences whose
+        Case/PCase has since been created. If there has never been a build, or
+        `full` is given, everything is considered (which is equivalent to, but much
+        faster than, build_all_case_groups).
+
+        Note that comment changes made via QuerySet.update() are caught too: the
+        database bumps modified_on whenever comments change (see migration 0032).
+
+        Note that CaseGroups are only ever created and merged, never split, so
+        removing a reference from a Case's comments won't remove it from its
+        CaseGroup; same as build_all_case_groups.
+
+        Returns the CaseGroupBuild recording this run
+        """
+        CaseGroupBuild = apps.get_model("cases", "CaseGroupBuild")
+        CaseGroupPendingReference = apps.get_model("cases", "CaseGroupPendingReference")
+
+        last_build = None
+        if not full:
+            try:
+                last_build = CaseGroupBuild.objects.latest()
+            except CaseGroupBuild.DoesNotExist:
+                tqdm.write("No previous CaseGroup build; considering everything")
+
+        with transaction.atomic():
+            started_on = now()
+            cases, pcases, row_data, row_data_watermark = self._get_sources(last_build)
+            if last_build:
+                links = chain(
+                    self._get_resolved_links(),
+                    self._get_links(cases, pcases, row_data),
+                )
+            else:
+                # Everything is being considered, so every pending reference will
+                # be recorded again if it's still pending
+                CaseGroupPendingReference.objects.all().delete()
+                links = self._get_links(cases, pcases, row_data)
+            num_created, num_merged = self._apply_links(links)
+            return CaseGroupBuild.objects.create(
+                started_on=started_on,
+                row_data_watermark=row_data_watermark,
+                full=last_build is None,
+                num_case_groups_created=num_created,
+                num_case_groups_merged=num_merged,
+            )
+
+    def _get_sources(self, last_build=None):
+        """Return the Cases, PCases, and RowData to derive links from
+
+        If `last_build` is given, only those that have changed since it are
+        returned. Also returns the RowData watermark for the next build
+        """
+        Case = apps.get_model("cases", "Case")
+        PreliminaryCase = apps.get_model("cases", "PreliminaryCase")
+
+        row_data = self._get_row_data_with_possible_links()
+        row_data_watermark = (
+            row_data.model.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+        )
+        row_data = row_data.filter(id__lte=row_data_watermark)
+        cases = Case.objects.all()
+        pcases = PreliminaryCase.objects.all()
+        if last_build:
+            cases = cases.filter(modified_on__gte=last_build.started_on)
+            pcases = pcases.filter(modified_on__gte=last_build.started_on)
+            row_data = row_data.filter(id__gt=last_build.row_data_watermark)
+
+        return cases, pcases, row_data, row_data_watermark
+
+    def rebuild_case_groups(self):
+        """Rebuild the memberships of every CaseGroup from scratch
+
+        Every Case/PCase comment and RowData is read once, the connected components
+        of their links are computed in memory, and then the CaseGroup memberships
+        are made to match them exactly via bulk writes to the M2M through tables,
+        all in a single transaction.
+
+        Unlike build_case_groups_incrementally, this also removes memberships that
+        are no longer supported by any link (e.g. if a reference was removed from a
+        Case's comments), splitting CaseGroups where necessary. Existing CaseGroups
+        are reused where possible (the oldest one overlapping each component), so
+        that their names and comments are kept. Those left without any members
+        are deleted.
+
+        Returns the CaseGroupBuild recording this run
+        """
+        CaseGroupBuild = apps.get_model("cases", "CaseGroupBuild")
+        CaseGroupPendingReference = apps.get_model("cases", "CaseGroupPendingReference")
+        CaseGroupCase = self.model.cases.through
+        CaseGroupPCase = self.model.pcases.through
+
+        with transaction.atomic():
+            started_on = now()
+            cases, pcases, row_data, row_data_watermark = self._get_sources()
+            CaseGroupPendingReference.objects.all().delete()
+            union_find = self._link_ids(list(self._get_links(cases, pcases, row_data)))
+            # Sorted so that CaseGroups are assigned in a stable order (by their
+            # lowest Case ID, then their lowest PCase ID)
+            components = sorted(
+                sorted(component) for component in union_find.groups().values()
+            )
+
+            # Map each existing membership (group ID, node) to its through row ID
+            existing_memberships = {
+                (group_id, ("case", case_id)): id_
+                for id_, group_id, case_id in CaseGroupCase.objects.values_list(
+                    "id", "casegroup_id", "case_id"
+                )
+            }
+            existing_memberships.update(
+                {
+                    (group_id, ("pcase", pcase_id)): id_
+                    for id_, group_id, pcase_id in CaseGroupPCase.objects.values_list(
+                        "id", "casegroup_id", "preliminarycase_id"
+                    )
+                }
+            )
+            group_ids_by_node = defaultdict(set)
+            for group_id, node in existing_memberships:
+                group_ids_by_node[node].add(group_id)
+
+            group_ids = []
+            claimed_group_ids = set()
+            for component in components:
+                candidates = (
+                    set().union(*(group_ids_by_node[node] for node in component))
+                    - claimed_group_ids
+                )
+                group_id = min(candidates) if candidates else None
+                if group_id is not None:
+                    claimed_group_ids.add(group_id)
+                group_ids.append(group_id)
+
+            new_group_ids = iter(
+                case_group.id
+                for case_group in self.bulk_create(
+                    [self.model() for group_id in group_ids if group_id is None]
+                )
+            )
+            num_created = group_ids.count(None)
+            desired_memberships = {
+                (group_id or next(new_group_ids), node)
+                for group_id, component in zip(group_ids, components)
+                for node in component
+            }
+
+            stale_memberships = existing_memberships.keys() - desired_memberships
+            CaseGroupCase.objects.filter(
+                id__in=[
+                    existing_memberships[membership]
+                    for membership in stale_memberships
+                    if membership[1][0] == "case"
+                ]
+            ).delete()
+            CaseGroupPCase.objects.filter(
+                id__in=[
+                    existing_memberships[membership]
+                    for membership in stale_memberships
+                    if membership[1][0] == "pcase"
+                ]
+            ).delete()
+            new_memberships = desired_memberships - existing_memberships.keys()
+            CaseGroupCase.objects.bulk_create(
+                [
+                    CaseGroupCase(casegroup_id=group_id, case_id=id_)
+                    for group_id, (kind, id_) in new_memberships
+                    if kind == "case"
+                ],
+                batch_size=1000,
+            )
+            CaseGroupPCase.objects.bulk_create(
+                [
+                    CaseGroupPCase(casegroup_id=group_id, preliminarycase_id=id_)
+                    for group_id, (kind, id_) in new_memberships
+                    if kind == "pcase"
+                ],
+                batch_size=1000,
+            )
+            # Only CaseGroups that previously had members are deleted; any that
+            # were created (empty) by hand are left alone
+            __, deletions = self.filter(
+                id__in={group_id for group_id, __ in existing_memberships}
+                - claimed_group_ids
+            ).delete()
+            num_deleted = deletions.get(self.model._meta.label, 0)
+            tqdm.write(
+                f"Rebuilt {len(components)} CaseGroups: created {num_created}, "
+                f"deleted {num_deleted}, added {len(new_memberships)} memberships "
+                f"and removed {len(stale_memberships)}"
+            )
+            return CaseGroupBuild.objects.create(
+                started_on=started_on,
+                row_data_watermark=row_data_watermark,
+                full=True,
+                num_case_groups_created=num_created,
+                num_case_groups_merged=num_deleted,
+            )
+
+
+class CaseStatusSummaryManager(Manager):
+    def flush_pending(self):
+        """Refresh the summaries of the Cases changed by the current transaction now
+
+        The triggers only queue these, to be refreshed (once per Case) when the
+        transaction commits (see migration 0031), so this is only needed in order
+        to read up-to-date summaries before then
+        """
+        with connection.cursor() as cursor:
+            # Setting the trigger to IMMEDIATE fires its queued events
+            cursor.execute(
+                "SET CONSTRAINTS cases_casestatussummary_pending_flush IMMEDIATE"
+            )
+            cursor.execute(
+                "SET CONSTRAINTS cases_casestatussummary_pending_flush DEFERRED"
+            )
+
+    def refresh(self, case_ids=None):
+        """Recompute the summaries of the given Cases (or all Cases, if None)
+
+        This uses the same database function as the triggers that normally
+        maintain these, so it should only be needed to repair drift
+        """
+        with connection.cursor() as cursor:
+            if case_ids is None:
+                cursor.execute(
+                    "SELECT cases_refresh_case_status_summary("
+                    "ARRAY(SELECT id FROM cases_case))"
+                )
+            else:
+                cursor.execute(
+                    "SELECT cases_refresh_case_status_summary(%s::integer[])",
+                    [list(case_ids)],
+                )
+
+    def find_inconsistent(self):
+        """Return the IDs of all Cases whose summary is missing or out of date
+
+        Summaries are compared against the live rollup from
+        CaseManager.annotate_rollup. Those queued by the current transaction are
+        refreshed first, since they aren't out of date, just not yet refreshed
+        """
+        self.flush_pending()
+        Case = apps.get_model("cases", "Case")
+        fields = Case.objects.ROLLUP_FIELDS
+        summaries = {
+            summary["case_id"]: summary
+            for summary in self.values("case_id", *fields).iterator()
+        }
+        inconsistent = []
+        for rollup in Case.objects.annotate_rollup().values("id", *fields).iterator():
+            summary = summaries.get(rollup["id"])
+            if summary is None or any(
+                summary[field] != rollup[field] for field in fields
+            ):
+                inconsistent.append(rollup["id"])
+        return inconsistent
+
+
+def _check_file(path, size, mtime, hash_on_disk, force=False):
+    """Return (stat, hash, whether it was hashed, error) of the file at `path`
+
+    The file is only hashed if its size or modification time differ from the given
+    ones (or if `force`); otherwise `hash_on_disk` is returned as its hash. If the
+    file is missing, its stat and hash are None. Any other OSError (e.g. a
+    permission error, or an unreachable file share) is returned as `error`, since
+    the file can't be said to be missing. This is run in worker threads, so it must
+    not touch the database
+    """
+    try:
+        stat = os.stat(path)
+        if (
+            not force
+            and hash_on_disk
+            and (size, mtime) == (stat.st_size, stat.st_mtime)
+        ):
+            return stat, hash_on_disk, False, None
+        return stat, hash_file(path), True, None
+    except (FileNotFoundError, NotADirectoryError):
+        return None, None, False, None
+    except OSError as error:
+        return None, None, False, error
+
 
 class AttachmentManager(Manager):
     # def derive_is_active(self):
@@ -352,3 +914,138 @@ class AttachmentManager(Manager):
 
     def get_queryset(self):
         return TrackedFileQueryset(self.model, using=self._db)
+
+    def enqueue_refresh(self, attachments, created_by=None):
+        """Enqueue a Job to check the given Attachments' files for changes
+
+        They are marked as checked immediately, so that they aren't enqueued again
+        (e.g. by every subsequent page view) while the Job is pending. Returns the
+        Job, or None if there was nothing to check
+        """
+        attachment_ids = [attachment.id for attachment in attachments]
+        if not attachment_ids:
+            return None
+        self.filter(id__in=attachment_ids).update(stat_checked_on=now())
+        return apps.get_model("jobs", "Job").objects.enqueue(
+            "cases.refresh_attachments",
+            created_by=created_by,
+            description=f"Check {len(attachment_ids)} Attachments for changes",
+            attachment_ids=attachment_ids,
+        )
+
+    def refresh_attachments(
+        self,
+        attachments=None,
+        workers=None,
+        chunk_size=None,
+        force=False,
+        progress=None,
+    ):
+        """Refresh the file info of the given Attachments (or all of them) from disk
+
+        Files are checked `chunk_size` at a time by a pool of `workers` threads
+        (ATTACHMENT_REFRESH_WORKERS and ATTACHMENT_REFRESH_CHUNK_SIZE by default),
+        since most of the time is spent waiting on (network) file systems. A file
+        is only re-hashed if its size or modification time has changed since it was
+        last hashed (unless `force`). Each chunk is saved via a single bulk_update.
+        `progress` is called as progress(done, total=None, message=None) (e.g.
+        Job.set_progress). Returns a dict of the number of files that were
+        unchanged, changed, missing, and that failed: either because they couldn't
+        be checked (in which case the Attachment is left as it was), or because
+        they couldn't be saved (e.g. because another Attachment has the same hash)
+        """
+        if attachments is None:
+            attachments = self.all()
+        if workers is None:
+            workers = settings.ATTACHMENT_REFRESH_WORKERS
+        if chunk_size is None:
+            chunk_size = settings.ATTACHMENT_REFRESH_CHUNK_SIZE
+        fields = [
+            "hash_on_disk",
+            "hash_checked_on",
+            "file_modified_on",
+            "file_size",
+            "file_mtime",
+            "stat_checked_on",
+        ]
+
+        # Fetched up front (and then a chunk at a time), so that no cursor is held
+        # open while chunks are saved
+        attachment_ids = list(attachments.order_by("id").values_list("id", flat=True))
+        if progress:
+            progress(0, total=len(attachment_ids), message="Checking Attachments")
+        counts = {"unchanged": 0, "changed": 0, "missing": 0, "failed": 0}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for start in range(0, len(attachment_ids), chunk_size):
+                chunk = list(
+                    self.filter(id__in=attachment_ids[start : start + chunk_size])
+                )
+                results = executor.map(
+                    lambda attachment: _check_file(
+                        attachment.file_path,
+                        attachment.file_size,
+                        attachment.file_mtime,
+                        attachment.hash_on_disk,
+                        force=force,
+                    ),
+                    chunk,
+                )
+                checked_on = now()
+                checked = []
+                for attachment, (stat, hash_on_disk, hashed, error) in zip(
+                    chunk, results
+                ):
+                    if error:
+                        logger.warning(f"Failed to check {attachment}: {error}")
+                        counts["failed"] += 1
+                        continue
+                    if stat is None:
+                        status = "missing"
+                    elif hash_on_disk == attachment.hash_on_disk:
+                        status = "unchanged"
+                    else:
+                        status = "changed"
+
+                    if hashed:
+                        attachment.hash_checked_on = checked_on
+                    attachment.hash_on_disk = hash_on_disk
+                    attachment.file_size = stat.st_size if stat else None
+                    attachment.file_mtime = stat.st_mtime if stat else None
+                    attachment.file_modified_on = (
+                        datetime.fromtimestamp(stat.st_mtime, tz=utc) if stat else None
+                    )
+                    attachment.stat_checked_on = checked_on
+                    checked.append((attachment, status))
+
+                # Statuses are only counted once their Attachments have been saved
+                try:
+                    with transaction.atomic():
+                        self.bulk_update(
+                            [attachment for attachment, __ in checked], fields
+                        )
+                except IntegrityError:
+                    # Some file's hash clashes with another Attachment's, so save
+                    # them individually to find out which
+                    for attachment, status in checked:
+                        try:
+                            with transaction.atomic():
+                                attachment.save(update_fields=fields)
+                        except IntegrityError as error:
+                            logger.warning(f"Failed to refresh {attachment}: {error}")
+                            counts["failed"] += 1
+                        else:
+                            counts[status] += 1
+                else:
+                    for __, status in checked:
+                        counts[status] += 1
+                if progress:
+                    progress(start + len(chunk))
+
+        if progress:
+            progress(
+                len(attachment_ids),
+                message=", ".join(
+                    f"{count} {status}" for status, count in counts.items()
+                ),
+            )
+        return counts
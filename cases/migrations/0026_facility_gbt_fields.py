@@ -0,0 +1,132 @@
+# Generated by Django 2.2.24 on 2026-10-17 10:12
+
+from django.contrib.gis.db.models.functions import Azimuth, Distance
+from django.db import migrations, models
+from django.db.models import Case, F, Func, Value, When
+
+FACILITY_MODELS = ("Facility", "PreliminaryFacility")
+
+
+def derive_gbt_fields(apps, schema_editor):
+    """Backfill the new fields; see LocationQuerySet.derive_gbt_fields/derive_in_nrqz
+
+    The historical models don't have the custom QuerySet methods, so their updates
+    are repeated here
+    """
+    db_alias = schema_editor.connection.alias
+    Location = apps.get_model("cases", "Location")
+    Boundaries = apps.get_model("cases", "Boundaries")
+    gbt = (
+        Location.objects.using(db_alias)
+        .filter(name="GBT")
+        .values_list("location", flat=True)
+        .first()
+    )
+    nrqz = (
+        Boundaries.objects.using(db_alias)
+        .filter(name="NRQZ")
+        .values_list("bounds", flat=True)
+        .first()
+    )
+
+    whens = [When(location__isnull=True, then=Value(None))]
+    # As in AbstractBaseFacility.get_in_nrqz, nothing is in an undefined NRQZ
+    if nrqz is not None:
+        whens.append(When(location__intersects=nrqz, then=Value(True)))
+    for model_name in FACILITY_MODELS:
+        facilities = apps.get_model("cases", model_name).objects.using(db_alias)
+        # If the GBT isn't defined (e.g. a new, empty database), the distances
+        # and azimuths stay NULL until it is (see cases.signals)
+        if gbt is not None:
+            facilities.update(
+                distance_to_gbt=Distance(F("location"), gbt),
+                azimuth_to_gbt=Func(Azimuth(F("location"), gbt), function="DEGREES"),
+            )
+        facilities.update(
+            in_nrqz=Case(
+                *whens, default=Value(False), output_field=models.BooleanField()
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cases", "0025_case_num_to_str"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="facility",
+            name="distance_to_gbt",
+            field=models.FloatField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="The distance between the Facility and the GBT, in meters",
+                null=True,
+                verbose_name="Distance to GBT (m)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="facility",
+            name="azimuth_to_gbt",
+            field=models.FloatField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="The azimuth bearing from the Facility to the GBT, in degrees",
+                null=True,
+                verbose_name="Azimuth Bearing to GBT (°)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="facility",
+            name="in_nrqz",
+            field=models.BooleanField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="Indicates whether the Facility is inside the boundaries of the NRQZ",
+                null=True,
+                verbose_name="In NRQZ",
+            ),
+        ),
+        migrations.AddField(
+            model_name="preliminaryfacility",
+            name="distance_to_gbt",
+            field=models.FloatField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="The distance between the Facility and the GBT, in meters",
+                null=True,
+                verbose_name="Distance to GBT (m)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="preliminaryfacility",
+            name="azimuth_to_gbt",
+            field=models.FloatField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="The azimuth bearing from the Facility to the GBT, in degrees",
+                null=True,
+                verbose_name="Azimuth Bearing to GBT (°)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="preliminaryfacility",
+            name="in_nrqz",
+            field=models.BooleanField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="Indicates whether the Facility is inside the boundaries of the NRQZ",
+                null=True,
+                verbose_name="In NRQZ",
+            ),
+        ),
+        migrations.RunPython(derive_gbt_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,163 @@
+# Generated by Django 2.2.24 on 2026-10-17 11:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Recompute (upsert) the CaseStatusSummary of each of the given Cases. This must stay
+# consistent with CaseManager.annotate_rollup
+#
+# The Case rows are locked first so that concurrent transactions modifying Facilities
+# of the same Case are serialized; since this is a VOLATILE function, the aggregation
+# then runs against a fresh snapshot that includes the other transaction's changes
+CREATE_REFRESH_FUNCTION = """
+CREATE OR REPLACE FUNCTION cases_refresh_case_status_summary(case_ids integer[])
+RETURNS void AS $$
+BEGIN
+    PERFORM 1 FROM cases_case
+    WHERE id = ANY(case_ids)
+    ORDER BY id
+    FOR NO KEY UPDATE;
+
+    INSERT INTO cases_casestatussummary (
+        case_id, num_facilities, meets_erpd_limit, sgrs_approval, si_done, si_pending
+    )
+    SELECT
+        c.id,
+        COUNT(f.id),
+        CASE
+            WHEN COUNT(f.id) = 0 THEN NULL
+            WHEN COUNT(f.id) FILTER (WHERE f.meets_erpd_limit IS NULL) > 0 THEN NULL
+            ELSE COUNT(f.id) FILTER (WHERE f.meets_erpd_limit) = COUNT(f.id)
+        END,
+        CASE
+            WHEN COUNT(f.id) = 0 THEN NULL
+            WHEN COUNT(f.id) FILTER (WHERE f.sgrs_approval IS NULL) > 0 THEN NULL
+            ELSE COUNT(f.id) FILTER (WHERE f.sgrs_approval) = COUNT(f.id)
+        END,
+        MAX(f.si_done),
+        COUNT(f.id) FILTER (WHERE f.si_done IS NULL)
+    FROM cases_case c
+    LEFT JOIN cases_facility f ON f.case_id = c.id
+    WHERE c.id = ANY(case_ids)
+    GROUP BY c.id
+    ON CONFLICT (case_id) DO UPDATE SET
+        num_facilities = EXCLUDED.num_facilities,
+        meets_erpd_limit = EXCLUDED.meets_erpd_limit,
+        sgrs_approval = EXCLUDED.sgrs_approval,
+        si_done = EXCLUDED.si_done,
+        si_pending = EXCLUDED.si_pending;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+"""
+
+CREATE_TRIGGERS = """
+CREATE OR REPLACE FUNCTION cases_facility_refresh_case_status_summary()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM cases_refresh_case_status_summary(ARRAY[NEW.case_id]);
+    END IF;
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.case_id <> NEW.case_id) THEN
+        PERFORM cases_refresh_case_status_summary(ARRAY[OLD.case_id]);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER cases_facility_case_status_summary_insert_delete
+AFTER INSERT OR DELETE ON cases_facility
+FOR EACH ROW EXECUTE PROCEDURE cases_facility_refresh_case_status_summary();
+
+-- Only fire on updates that could affect the summary
+CREATE TRIGGER cases_facility_case_status_summary_update
+AFTER UPDATE ON cases_facility
+FOR EACH ROW
+WHEN (
+    OLD.case_id IS DISTINCT FROM NEW.case_id
+    OR OLD.meets_erpd_limit IS DISTINCT FROM NEW.meets_erpd_limit
+    OR OLD.sgrs_approval IS DISTINCT FROM NEW.sgrs_approval
+    OR OLD.si_done IS DISTINCT FROM NEW.si_done
+)
+EXECUTE PROCEDURE cases_facility_refresh_case_status_summary();
+
+-- Every Case gets a summary as soon as it is created
+CREATE OR REPLACE FUNCTION cases_case_create_case_status_summary()
+RETURNS trigger AS $$
+BEGIN
+    PERFORM cases_refresh_case_status_summary(ARRAY[NEW.id]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER cases_case_case_status_summary_insert
+AFTER INSERT ON cases_case
+FOR EACH ROW EXECUTE PROCEDURE cases_case_create_case_status_summary();
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS cases_case_case_status_summary_insert ON cases_case;
+DROP TRIGGER IF EXISTS cases_facility_case_status_summary_update ON cases_facility;
+DROP TRIGGER IF EXISTS cases_facility_case_status_summary_insert_delete ON cases_facility;
+DROP FUNCTION IF EXISTS cases_case_create_case_status_summary();
+DROP FUNCTION IF EXISTS cases_facility_refresh_case_status_summary();
+"""
+
+DROP_REFRESH_FUNCTION = """
+DROP FUNCTION IF EXISTS cases_refresh_case_status_summary(integer[]);
+"""
+
+BACKFILL = """
+SELECT cases_refresh_case_status_summary(ARRAY(SELECT id FROM cases_case));
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cases", "0026_facility_gbt_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CaseStatusSummary",
+            fields=[
+                (
+                    "case",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="status_summary",
+                        serialize=False,
+                        to="cases.Case",
+                    ),
+                ),
+                (
+                    "num_facilities",
+                    models.PositiveIntegerField(
+                        db_index=True,
+                        default=0,
+                        verbose_name="# Facilities Evaluated",
+                    ),
+                ),
+                ("meets_erpd_limit", models.BooleanField(db_index=True, null=True)),
+                (
+                    "sgrs_approval",
+                    models.BooleanField(
+                        db_index=True, null=True, verbose_name="SGRS Approval"
+                    ),
+                ),
+                (
+                    "si_done",
+                    models.DateField(db_index=True, null=True, verbose_name="SI Done"),
+                ),
+                ("si_pending", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Case Status Summary",
+                "verbose_name_plural": "Case Status Summaries",
+            },
+        ),
+        migrations.RunSQL(CREATE_REFRESH_FUNCTION, DROP_REFRESH_FUNCTION),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+        migrations.RunSQL(BACKFILL, migrations.RunSQL.noop),
+    ]
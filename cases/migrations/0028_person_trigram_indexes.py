@@ -0,0 +1,34 @@
+# Generated by Django 2.2.24 on 2026-10-17 15:02
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cases", "0027_casestatussummary"),
+    ]
+
+    operations = [
+        # This already exists on any database that has been used to find similar
+        # people, in which case this is a no-op
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="person",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["name"],
+                name="cases_person_name_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="person",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["email"],
+                name="cases_person_email_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
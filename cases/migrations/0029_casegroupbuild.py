@@ -0,0 +1,43 @@
+# Generated by Django 2.2.24 on 2026-10-17 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cases", "0028_person_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CaseGroupBuild",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("started_on", models.DateTimeField(db_index=True)),
+                (
+                    "row_data_watermark",
+                    models.PositiveIntegerField(
+                        help_text="The highest RowData ID that was considered"
+                    ),
+                ),
+                (
+                    "full",
+                    models.BooleanField(
+                        help_text="Whether every Case, PCase, and RowData was considered"
+                    ),
+                ),
+                ("num_case_groups_created", models.PositiveIntegerField(default=0)),
+                ("num_case_groups_merged", models.PositiveIntegerField(default=0)),
+            ],
+            options={"get_latest_by": "started_on"},
+        ),
+    ]
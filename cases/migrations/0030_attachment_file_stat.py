@@ -0,0 +1,40 @@
+# Generated by Django 2.2.24 on 2026-10-17 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cases", "0029_casegroupbuild"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="attachment",
+            name="file_size",
+            field=models.BigIntegerField(
+                blank=True,
+                help_text="Size of the file (in bytes) when its hash was last calculated",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="attachment",
+            name="file_mtime",
+            field=models.FloatField(
+                blank=True,
+                help_text="Modification time of the file (as a UNIX timestamp) when its hash was last calculated",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="attachment",
+            name="stat_checked_on",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When the file was last checked for changes",
+                null=True,
+            ),
+        ),
+    ]
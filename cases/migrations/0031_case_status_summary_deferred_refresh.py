@@ -0,0 +1,121 @@
+# Generated by Django 2.2.24 on 2026-10-17 19:20
+
+from importlib import import_module
+
+from django.db import migrations
+
+initial = import_module("cases.migrations.0027_casestatussummary")
+
+# The row triggers of 0027 refreshed a Case's summary for every Facility written,
+# each re-aggregating all of its Facilities, so writing N Facilities of a Case was
+# O(N^2). Instead, the row triggers now only queue the affected Cases, once per
+# transaction (deduplicated by the primary key of cases_casestatussummary_pending),
+# and a deferred constraint trigger refreshes all of them in one go at commit.
+# Unlike statement triggers with transition tables, this works on PostgreSQL 9.6
+#
+# Within a transaction, summaries are therefore only up to date once it commits,
+# or after CaseStatusSummaryManager.flush_pending(). Rows queued in a savepoint that
+# is rolled back are discarded along with their deferred trigger events
+CREATE_TRIGGERS = """
+CREATE TABLE cases_casestatussummary_pending (
+    xid bigint NOT NULL DEFAULT txid_current(),
+    case_id integer NOT NULL,
+    PRIMARY KEY (xid, case_id)
+);
+
+CREATE OR REPLACE FUNCTION cases_facility_queue_case_status_summary()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.case_id IS NOT NULL THEN
+        INSERT INTO cases_casestatussummary_pending (case_id)
+        VALUES (NEW.case_id)
+        ON CONFLICT DO NOTHING;
+    END IF;
+    IF (
+        TG_OP = 'DELETE'
+        OR (TG_OP = 'UPDATE' AND OLD.case_id IS DISTINCT FROM NEW.case_id)
+    ) AND OLD.case_id IS NOT NULL THEN
+        INSERT INTO cases_casestatussummary_pending (case_id)
+        VALUES (OLD.case_id)
+        ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER cases_facility_case_status_summary_insert_delete
+AFTER INSERT OR DELETE ON cases_facility
+FOR EACH ROW EXECUTE PROCEDURE cases_facility_queue_case_status_summary();
+
+-- Only fire on updates that could affect the summary
+CREATE TRIGGER cases_facility_case_status_summary_update
+AFTER UPDATE ON cases_facility
+FOR EACH ROW
+WHEN (
+    OLD.case_id IS DISTINCT FROM NEW.case_id
+    OR OLD.meets_erpd_limit IS DISTINCT FROM NEW.meets_erpd_limit
+    OR OLD.sgrs_approval IS DISTINCT FROM NEW.sgrs_approval
+    OR OLD.si_done IS DISTINCT FROM NEW.si_done
+)
+EXECUTE PROCEDURE cases_facility_queue_case_status_summary();
+
+-- Fires once per queued Case, but the first firing refreshes (and dequeues) every
+-- Case queued by the transaction, so the rest find nothing left to do
+CREATE OR REPLACE FUNCTION cases_flush_case_status_summary()
+RETURNS trigger AS $$
+DECLARE
+    case_ids integer[];
+BEGIN
+    WITH flushed AS (
+        DELETE FROM cases_casestatussummary_pending
+        WHERE xid = NEW.xid
+        RETURNING case_id
+    )
+    SELECT array_agg(case_id) INTO case_ids FROM flushed;
+    IF case_ids IS NOT NULL THEN
+        PERFORM cases_refresh_case_status_summary(case_ids);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE CONSTRAINT TRIGGER cases_casestatussummary_pending_flush
+AFTER INSERT ON cases_casestatussummary_pending
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW EXECUTE PROCEDURE cases_flush_case_status_summary();
+
+-- Every Case gets a summary as soon as it is created (as in 0027)
+CREATE OR REPLACE FUNCTION cases_case_create_case_status_summary()
+RETURNS trigger AS $$
+BEGIN
+    PERFORM cases_refresh_case_status_summary(ARRAY[NEW.id]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER cases_case_case_status_summary_insert
+AFTER INSERT ON cases_case
+FOR EACH ROW EXECUTE PROCEDURE cases_case_create_case_status_summary();
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS cases_case_case_status_summary_insert ON cases_case;
+DROP TRIGGER IF EXISTS cases_facility_case_status_summary_update ON cases_facility;
+DROP TRIGGER IF EXISTS cases_facility_case_status_summary_insert_delete ON cases_facility;
+DROP TABLE IF EXISTS cases_casestatussummary_pending;
+DROP FUNCTION IF EXISTS cases_flush_case_status_summary();
+DROP FUNCTION IF EXISTS cases_case_create_case_status_summary();
+DROP FUNCTION IF EXISTS cases_facility_queue_case_status_summary();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cases", "0030_attachment_file_stat"),
+    ]
+
+    operations = [
+        migrations.RunSQL(initial.DROP_TRIGGERS, initial.CREATE_TRIGGERS),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 2.2.24 on 2026-10-17 21:05
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+
+# Incremental CaseGroup builds only reconsider Cases/PCases whose modified_on has
+# changed. That is set by Model.save() (auto_now), but not by QuerySet.update(), so
+# comment changes made that way would never be seen. Bump it in the database
+# instead, whenever comments change and modified_on wasn't also set explicitly
+CREATE_TRIGGERS = """
+CREATE OR REPLACE FUNCTION cases_touch_modified_on_on_comments_change()
+RETURNS trigger AS $$
+BEGIN
+    IF NEW.modified_on IS NOT DISTINCT FROM OLD.modified_on THEN
+        NEW.modified_on := clock_timestamp();
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER cases_case_touch_modified_on
+BEFORE UPDATE OF comments ON cases_case
+FOR EACH ROW
+WHEN (NEW.comments IS DISTINCT FROM OLD.comments)
+EXECUTE PROCEDURE cases_touch_modified_on_on_comments_change();
+
+CREATE TRIGGER cases_preliminarycase_touch_modified_on
+BEFORE UPDATE OF comments ON cases_preliminarycase
+FOR EACH ROW
+WHEN (NEW.comments IS DISTINCT FROM OLD.comments)
+EXECUTE PROCEDURE cases_touch_modified_on_on_comments_change();
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS cases_case_touch_modified_on ON cases_case;
+DROP TRIGGER IF EXISTS cases_preliminarycase_touch_modified_on
+    ON cases_preliminarycase;
+DROP FUNCTION IF EXISTS cases_touch_modified_on_on_comments_change();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cases", "0031_case_status_summary_deferred_refresh"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CaseGroupPendingReference",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("case", "Case"), ("pcase", "Preliminary Case")],
+                        max_length=8,
+                    ),
+                ),
+                ("case_num", models.CharField(db_index=True, max_length=256)),
+                (
+                    "link",
+                    django.contrib.postgres.fields.jsonb.JSONField(
+                        help_text="Every [kind, case num] node of the link"
+                    ),
+                ),
+            ],
+            options={"unique_together": {("kind", "case_num", "link")}},
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
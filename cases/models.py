@@ -1,21 +1,24 @@
 """Case models"""
 
-from datetime import date
-import math
+from datetime import date, timedelta
 import ntpath
 import os
 
 from django.conf import settings
 from django.contrib.gis.db.backends.postgis.models import PostGISSpatialRefSys
 from django.contrib.gis.db.models import PointField, PolygonField
-from django.contrib.gis.db.models.functions import Area, Azimuth, Distance
-from django.contrib.postgres.fields import ArrayField
+from django.contrib.gis.db.models.functions import Area
+from django.contrib.gis.measure import D
+from django.contrib.postgres.fields import ArrayField, JSONField
+from django.contrib.postgres.indexes import GinIndex
 from django.db.models import (
+    BigIntegerField,
     BooleanField,
     CASCADE,
     CharField,
     DateField,
     DateField,
+    DateTimeField,
     EmailField,
     F,
     FilePathField,
@@ -24,6 +27,7 @@ from django.db.models import (
     IntegerField,
     ManyToManyField,
     Model,
+    OneToOneField,
     PositiveIntegerField,
     PROTECT,
     SET_NULL,
@@ -34,6 +38,7 @@ from django.db.models import (
 from django.urls import reverse
 from django.utils.functional import cached_property
 from django.utils.safestring import mark_safe
+from django.utils.timezone import now
 
 from django_import_data.models import AbstractBaseAuditedModel
 from django_import_data.mixins import (
@@ -45,7 +50,13 @@ from django_import_data.mixins import (
 from django_super_deduper.models import MergeInfo
 
 from .kml import facility_as_kml, case_as_kml, kml_to_string
-from .managers import AttachmentManager, CaseManager, LocationManager, CaseGroupManager
+from .managers import (
+    AttachmentManager,
+    CaseManager,
+    CaseGroupManager,
+    CaseStatusSummaryManager,
+    LocationManager,
+)
 from .mixins import (
     AllFieldsModel,
     DataSourceModel,
@@ -54,7 +65,9 @@ from .mixins import (
     TrackedOriginalModel,
     CaseGroupModel,
 )
+from .reference import get_gbt_location, get_nrqz_rings
 from utils.constants import WGS84_SRID
+from utils.geodesy import point_in_polygon, vincenty_inverse
 from utils.numrange import get_str_from_nums
 from utils.misc import to_file_link
 
@@ -211,6 +224,33 @@ class AbstractBaseFacility(
         help_text="What you call it! Include MCN and eNB information.",
     )
     location = LOCATION_FIELD()
+    # These are derived from location, and are stored (rather than annotated on the
+    # fly) so that they can be filtered and sorted on via their indexes. They are
+    # kept up to date by save() and by the signal handlers in cases.signals
+    distance_to_gbt = FloatField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name="Distance to GBT (m)",
+        help_text="The distance between the Facility and the GBT, in meters",
+    )
+    azimuth_to_gbt = FloatField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name="Azimuth Bearing to GBT (°)",
+        help_text="The azimuth bearing from the Facility to the GBT, in degrees",
+    )
+    in_nrqz = BooleanField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name="In NRQZ",
+        help_text="Indicates whether the Facility is inside the boundaries of the NRQZ",
+    )
     location_description = SensibleCharField(
         blank=True,
         max_length=512,
@@ -288,35 +328,72 @@ class AbstractBaseFacility(
     class Meta:
         abstract = True
 
-    # @cached_property
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the location as it was loaded, so that save() can tell whether
+        # the derived GBT fields need to be re-derived
+        instance._loaded_location = instance.__dict__.get("location")
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields", None)
+        location_changed = "location" in self.__dict__ and self.location != getattr(
+            self, "_loaded_location", None
+        )
+        if location_changed and (update_fields is None or "location" in update_fields):
+            self.derive_gbt_fields()
+            if update_fields is not None:
+                kwargs["update_fields"] = {
+                    *update_fields,
+                    "distance_to_gbt",
+                    "azimuth_to_gbt",
+                    "in_nrqz",
+                }
+        super().save(*args, **kwargs)
+        self._loaded_location = self.location
+
+    def derive_gbt_fields(self):
+        """Set distance_to_gbt, azimuth_to_gbt, and in_nrqz from location
+
+        Note that this does NOT save the instance!
+        """
+        if self.location is None:
+            self.distance_to_gbt = None
+            self.azimuth_to_gbt = None
+            self.in_nrqz = None
+            return
+
+        try:
+            self.distance_to_gbt = self.get_distance_to_gbt().m
+            self.azimuth_to_gbt = self.get_azimuth_to_gbt()
+        except Location.DoesNotExist:
+            self.distance_to_gbt = None
+            self.azimuth_to_gbt = None
+        self.in_nrqz = self.get_in_nrqz()
+
     def get_distance_to_gbt(self):
         if self.location is None:
             return None
-        return (
-            Location.objects.filter(name="GBT")
-            .annotate(distance=Distance(F("location"), self.location))
-            .values("distance")
-            .last()["distance"]
-        )
+        gbt = get_gbt_location()
+        distance, __ = vincenty_inverse(*self.location.coords, *gbt.coords)
+        return D(m=distance)
 
-    # @cached_property
     def get_azimuth_to_gbt(self):
         if self.location is None:
             return None
-        return math.degrees(
-            Location.objects.filter(name="GBT")
-            .annotate(azimuth=Azimuth(self.location, F("location")))
-            .values("azimuth")
-            .last()["azimuth"]
-        )
+        gbt = get_gbt_location()
+        __, azimuth = vincenty_inverse(*self.location.coords, *gbt.coords)
+        return azimuth
 
-    # @cached_property
     def get_in_nrqz(self):
         if self.location is None:
             return None
-        return Boundaries.objects.filter(
-            name="NRQZ", bounds__covers=self.location
-        ).exists()
+        # Nothing is in an undefined NRQZ (as in LocationQuerySet.derive_in_nrqz)
+        nrqz_rings = get_nrqz_rings()
+        if nrqz_rings is None:
+            return False
+        return point_in_polygon(*self.location.coords, nrqz_rings)
 
     def get_prop_study_as_link(self, text=None):
         if not self.propagation_study:
@@ -560,6 +637,51 @@ class CaseGroup(TrackedModel, Model):
         return not self.cases.filter(completed=False).exists()
 
 
+class CaseGroupBuild(Model):
+    """A record of a run of CaseGroupManager.build_case_groups_incrementally
+
+    The most recent one is the watermark for the next incremental run: only Cases
+    and PreliminaryCases modified since it started, and RowData created since it
+    ran, need to be considered again
+    """
+
+    started_on = DateTimeField(db_index=True)
+    row_data_watermark = PositiveIntegerField(
+        help_text="The highest RowData ID that was considered"
+    )
+    full = BooleanField(
+        help_text="Whether every Case, PCase, and RowData was considered"
+    )
+    num_case_groups_created = PositiveIntegerField(default=0)
+    num_case_groups_merged = PositiveIntegerField(default=0)
+
+    class Meta:
+        get_latest_by = "started_on"
+
+    def __str__(self):
+        return f"{'Full' if self.full else 'Incremental'} build at {self.started_on}"
+
+
+class CaseGroupPendingReference(Model):
+    """A link that references a Case or PreliminaryCase that doesn't exist (yet)
+
+    One is recorded per missing node of each link, keyed by its case num. Once a
+    Case/PCase with that num is created, the next CaseGroup build re-applies the
+    link, even though none of its sources have changed since
+    """
+
+    KIND_CHOICES = (("case", "Case"), ("pcase", "Preliminary Case"))
+    kind = CharField(max_length=8, choices=KIND_CHOICES)
+    case_num = CharField(max_length=256, db_index=True)
+    link = JSONField(help_text="Every [kind, case num] node of the link")
+
+    class Meta:
+        unique_together = ("kind", "case_num", "link")
+
+    def __str__(self):
+        return f"Pending reference to {self.kind} {self.case_num}"
+
+
 class AbstractBaseCase(
     CaseGroupModel,
     AllFieldsModel,
@@ -729,14 +851,34 @@ class Case(AbstractBaseCase):
     def is_approved_by_sgrs(self):
         return self.get_sgrs_approval()
 
+    @cached_property
+    def rollup(self):
+        """The rollup of this Case's Facilities' statuses; see CaseManager.annotate_rollup
+
+        If this Case was fetched via annotate_rollup, its annotations are used
+        directly. Otherwise they are fetched via a single query
+        """
+        fields = Case.objects.ROLLUP_FIELDS
+        if all(field in self.__dict__ for field in fields):
+            return {field: self.__dict__[field] for field in fields}
+
+        return (
+            Case.objects.annotate_rollup(Case.objects.filter(id=self.id))
+            .values(*fields)
+            .get()
+        )
+
     def get_meets_erpd_limit(self):
-        approvals = self.facilities.values("meets_erpd_limit").distinct()
-        if not approvals.exists() or approvals.filter(meets_erpd_limit=None).exists():
-            return None
-        if approvals.filter(meets_erpd_limit=False).exists():
-            return False
+        """Return the overall NRAO approval status of this case
 
-        return True
+        If any Facilities have not yet been evaluated, return None,
+        indicating pending
+
+        If any do not meet the ERPd limit, return False, indicating denied
+
+        Otherwise return True. This indicates that all Facilities meet the
+        ERPd limit"""
+        return self.rollup["meets_erpd_limit"]
 
     def get_sgrs_approval(self):
         """Return the overall SGRS Approval status of this case
@@ -748,40 +890,64 @@ class Case(AbstractBaseCase):
 
         Otherwise return True. This indicates that all Facilities have been
         approved by SGRS"""
-
-        approvals = self.facilities.values("sgrs_approval").distinct()
-        if not approvals.exists() or approvals.filter(sgrs_approval=None).exists():
-            return None
-        if approvals.filter(sgrs_approval=False).exists():
-            return False
-
-        return True
+        return self.rollup["sgrs_approval"]
 
     def get_si_done(self):
-        """Return the overall SGRS Approval status of this case
-
-        If any Facilities have not yet been approved/denied, return None,
-        indicating pending
+        """Return the overall site inspection status of this case
 
-        If any have been denied, return False, indicating denied
+        If there are no Facilities, or any Facilities have not yet been
+        inspected, return None, indicating pending
 
         Otherwise return True. This indicates that all Facilities have been
-        approved by SGRS"""
-
-        site_inspection_dates = self.facilities.values("si_done").distinct()
-        if (
-            not site_inspection_dates.exists()
-            or site_inspection_dates.filter(si_done=None).exists()
-        ):
+        inspected"""
+        rollup = self.rollup
+        if not rollup["num_facilities"] or rollup["si_pending"]:
             return None
-        if site_inspection_dates.filter(si_done__isnull=True).exists():
-            return False
 
         return True
 
     @property
     def num_facilities_evaluated(self):
-        return self.facilities.count()
+        return self.rollup["num_facilities"]
+
+
+class CaseStatusSummary(Model):
+    """Denormalized rollup of a Case's Facility statuses
+
+    This is the stored equivalent of CaseManager.annotate_rollup, so that the
+    Case list can filter and sort on these without aggregating over Facility.
+
+    Rows are maintained by database triggers on the Case and Facility tables
+    (see migrations 0027 and 0031), so they stay current no matter how Facilities
+    are modified (save(), delete(), QuerySet.update(), mass edit, etc.). Changes to
+    Facilities are applied when their transaction commits (see
+    CaseStatusSummary.objects.flush_pending()).
+    Do not write to this table directly; use CaseStatusSummary.objects.refresh()
+    and the check_case_status_summaries command to repair any drift.
+    """
+
+    case = OneToOneField(
+        "Case",
+        primary_key=True,
+        on_delete=CASCADE,
+        related_name="status_summary",
+    )
+    num_facilities = PositiveIntegerField(
+        default=0, db_index=True, verbose_name="# Facilities Evaluated"
+    )
+    meets_erpd_limit = BooleanField(null=True, db_index=True)
+    sgrs_approval = BooleanField(null=True, db_index=True, verbose_name="SGRS Approval")
+    si_done = DateField(null=True, db_index=True, verbose_name="SI Done")
+    si_pending = PositiveIntegerField(default=0)
+
+    objects = CaseStatusSummaryManager()
+
+    class Meta:
+        verbose_name = "Case Status Summary"
+        verbose_name_plural = "Case Status Summaries"
+
+    def __str__(self):
+        return f"Status summary for {self.case}"
 
 
 class Person(
@@ -810,6 +976,19 @@ class Person(
     class Meta:
         verbose_name = "Person"
         verbose_name_plural = "People"
+        indexes = [
+            # For finding similar people (see utils.merge_people)
+            GinIndex(
+                fields=["name"],
+                name="cases_person_name_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+            GinIndex(
+                fields=["email"],
+                name="cases_person_email_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ]
 
 
 class Attachment(
@@ -824,6 +1003,20 @@ class Attachment(
 
     comments = SensibleTextField(blank=True)
     original_index = PositiveIntegerField(null=True, blank=True)
+    file_size = BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Size of the file (in bytes) when its hash was last calculated",
+    )
+    file_mtime = FloatField(
+        null=True,
+        blank=True,
+        help_text="Modification time of the file (as a UNIX timestamp) when its "
+        "hash was last calculated",
+    )
+    stat_checked_on = DateTimeField(
+        null=True, blank=True, help_text="When the file was last checked for changes"
+    )
 
     objects = AttachmentManager()
 
@@ -851,6 +1044,37 @@ class Attachment(
         link = f"<a href='{href}' " f"title={self.file_path}>" f"{path}</a>"
         return mark_safe(link)
 
+    def refresh_is_due(self, ttl=None):
+        """Determine whether the file is due to be checked for changes
+
+        That is, whether it hasn't been checked within the last `ttl` seconds
+        (ATTACHMENT_REFRESH_TTL by default). Doesn't touch the file system
+        """
+        if ttl is None:
+            ttl = settings.ATTACHMENT_REFRESH_TTL
+        return self.stat_checked_on is None or (
+            now() - self.stat_checked_on >= timedelta(seconds=ttl)
+        )
+
+    def file_has_changed(self):
+        """Determine (via os.stat) whether the file has changed since it was hashed
+
+        A file that is missing has changed only if it wasn't already missing. As in
+        AttachmentManager.refresh_attachments, a file that can't be checked for any
+        other reason (e.g. an unreachable file share) isn't considered missing, and
+        so isn't considered to have changed
+        """
+        try:
+            stat = os.stat(self.file_path)
+        except (FileNotFoundError, NotADirectoryError):
+            return self.hash_on_disk is not None
+        except OSError:
+            return False
+        return self.hash_on_disk is None or (self.file_size, self.file_mtime) != (
+            stat.st_size,
+            stat.st_mtime,
+        )
+
     def get_is_active(self):
         self.is_active = os.path.isfile(self.file_path)
         self.save()
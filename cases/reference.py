@@ -0,0 +1,135 @@
+"""Cache of the reference geometry (GBT location and NRQZ bounds)
+
+These rows essentially never change, but are needed in order to derive
+distance/azimuth to the GBT and NRQZ membership for every Facility, and by the
+LocationQuerySet bulk updates. Caching them lets those be calculated in-process
+(see utils.geodesy) instead of via a database query per Facility, or per request.
+
+There are two levels of cache:
+
+- The shared cache (settings.CACHES), so that the rows are only queried for once
+  across every process (web workers, job runners, import commands). Entries are
+  deleted by the signal handlers in cases.signals once a transaction that saves or
+  deletes the relevant rows commits. They also expire after REFERENCE_CACHE_TTL
+  seconds, since the rows can be changed without a signal (e.g. QuerySet.update,
+  or a data migration), and another process may cache a row it read just before
+  the commit
+- A per-process cache in front of that, so that deriving the fields of thousands
+  of Facilities doesn't mean thousands of round trips to the shared cache. Since
+  deleting the shared entries can't reach the other processes' copies, these
+  also expire after REFERENCE_CACHE_TTL seconds
+
+While a transaction that has changed the rows is open, the process that made the
+change bypasses the shared cache: the other processes can't see the change yet,
+and it may still be rolled back
+"""
+
+import time
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+
+from utils.geodesy import densify_ring
+
+REFERENCE_CACHE_TTL = 300
+CACHE_KEY_PREFIX = "cases.reference"
+REFERENCE_KEYS = ("gbt", "nrqz", "nrqz_rings")
+
+_cache = {}
+_MISSING = object()
+# Whether this process has changed the reference rows in a transaction that hasn't
+# been committed yet (see clear_reference_cache)
+_uncommitted_change = False
+
+
+def _get_cache_key(key):
+    return f"{CACHE_KEY_PREFIX}.{key}"
+
+
+def _has_uncommitted_change():
+    global _uncommitted_change
+    if _uncommitted_change and not transaction.get_connection().in_atomic_block:
+        # The transaction ended without committing (which would have reset this),
+        # so whatever was cached during it may have been rolled back
+        _uncommitted_change = False
+        _cache.clear()
+    return _uncommitted_change
+
+
+def _get_cached(key, loader):
+    uncommitted_change = _has_uncommitted_change()
+    try:
+        value, loaded_at = _cache[key]
+    except KeyError:
+        pass
+    else:
+        if time.monotonic() - loaded_at < REFERENCE_CACHE_TTL:
+            return value
+
+    if uncommitted_change:
+        value = loader()
+    else:
+        value = cache.get(_get_cache_key(key), _MISSING)
+        if value is _MISSING:
+            value = loader()
+            cache.set(_get_cache_key(key), value, timeout=REFERENCE_CACHE_TTL)
+    _cache[key] = (value, time.monotonic())
+    return value
+
+
+def get_gbt_location():
+    """Return the GBT location Point. Raises Location.DoesNotExist if not defined"""
+    return _get_cached(
+        "gbt",
+        lambda: apps.get_model("cases", "Location")
+        .objects.values_list("location", flat=True)
+        .get(name="GBT"),
+    )
+
+
+def get_nrqz_bounds():
+    """Return the NRQZ bounds Polygon, or None if not defined"""
+    return _get_cached(
+        "nrqz",
+        lambda: apps.get_model("cases", "Boundaries")
+        .objects.filter(name="NRQZ")
+        .values_list("bounds", flat=True)
+        .first(),
+    )
+
+
+def get_nrqz_rings():
+    """Return the rings of the NRQZ bounds, densified along great circles, or None
+    if not defined
+
+    These are what point_in_polygon needs in order to agree with PostGIS's geography
+    ST_Intersects (see utils.geodesy.densify_ring)
+    """
+
+    def load():
+        bounds = get_nrqz_bounds()
+        if bounds is None:
+            return None
+        return [densify_ring(ring) for ring in bounds.coords]
+
+    return _get_cached("nrqz_rings", load)
+
+
+def _clear_caches():
+    global _uncommitted_change
+    _uncommitted_change = False
+    _cache.clear()
+    cache.delete_many([_get_cache_key(key) for key in REFERENCE_KEYS])
+
+
+def clear_reference_cache():
+    """Clear the caches once the current transaction (if any) commits
+
+    Until then, this process re-queries the rows rather than sharing what it sees
+    """
+    global _uncommitted_change
+    _cache.clear()
+    if transaction.get_connection().in_atomic_block:
+        _uncommitted_change = True
+    transaction.on_commit(_clear_caches)
@@ -0,0 +1,37 @@
+"""Signal handlers for cases app"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Boundaries, Facility, Location, PreliminaryFacility
+from .reference import clear_reference_cache
+
+FACILITY_MODELS = (Facility, PreliminaryFacility)
+
+
+@receiver(post_delete, sender=Location)
+@receiver(post_delete, sender=Boundaries)
+def clear_reference_cache_on_delete(sender, instance, **kwargs):
+    clear_reference_cache()
+
+
+@receiver(post_save, sender=Location)
+def derive_gbt_fields_on_gbt_change(sender, instance, raw=False, **kwargs):
+    """Re-derive every facility's distance/azimuth to the GBT if the GBT has moved"""
+    clear_reference_cache()
+    if raw or instance.name != "GBT":
+        return
+
+    for model in FACILITY_MODELS:
+        model.objects.derive_gbt_fields()
+
+
+@receiver(post_save, sender=Boundaries)
+def derive_in_nrqz_on_nrqz_change(sender, instance, raw=False, **kwargs):
+    """Re-derive every facility's in_nrqz if the NRQZ boundaries have changed"""
+    clear_reference_cache()
+    if raw or instance.name != "NRQZ":
+        return
+
+    for model in FACILITY_MODELS:
+        model.objects.derive_in_nrqz()
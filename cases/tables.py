@@ -1,4 +1,5 @@
 """Custom django_tables2.Table sub-classes for cases app"""
+
 from django.utils.safestring import mark_safe
 from django.db.models import F
 
@@ -26,6 +27,24 @@ from .columns import (
 )
 
 
+class AttachmentRefreshMixin:
+    """Check the files of the Attachments on the current page for changes
+
+    Attachments that haven't been checked within ATTACHMENT_REFRESH_TTL are checked
+    (and re-hashed, if they've changed) by a background Job, so rendering never
+    waits on the file system
+    """
+
+    def before_render(self, request):
+        super().before_render(request)
+        page = getattr(self, "page", None)
+        if page is not None:
+            models.Attachment.objects.enqueue_refresh(
+                [row.record for row in page.object_list if row.record.refresh_is_due()],
+                created_by=request.user,
+            )
+
+
 class LetterCaseTable(tables.Table):
     is_approved_by_nrao = tables.Column(
         verbose_name="NRAO Approved", accessor="is_approved_by_nrao"
@@ -144,26 +163,17 @@ class BaseFacilityTable(tables.Table):
         return record.nrqz_id or record.case.case_num
 
     def render_in_nrqz(self, record):
-        in_nrqz = getattr(record, "in_nrqz", None)
-        if in_nrqz is None:
-            in_nrqz = record.get_in_nrqz()
-        return in_nrqz
+        return record.in_nrqz
 
     def render_distance_to_gbt(self, record):
-        distance_to_gbt = getattr(record, "distance_to_gbt", None)
-        if distance_to_gbt is None:
-            distance_to_gbt = record.get_distance_to_gbt()
-        if distance_to_gbt is None:
+        if record.distance_to_gbt is None:
             return "—"
-        return f"{distance_to_gbt.km:.2f} km"
+        return f"{record.distance_to_gbt / 1000:.2f} km"
 
     def render_azimuth_to_gbt(self, record):
-        azimuth_to_gbt = getattr(record, "azimuth_to_gbt", None)
-        if azimuth_to_gbt is None:
-            azimuth_to_gbt = record.get_azimuth_to_gbt()
-        if azimuth_to_gbt is None:
+        if record.azimuth_to_gbt is None:
             return "—"
-        return f"{azimuth_to_gbt:.3f}°"
+        return f"{record.azimuth_to_gbt:.3f}°"
 
 
 class PreliminaryFacilityTable(BaseFacilityTable):
@@ -314,7 +324,7 @@ class FacilityExportTable(tables.Table):
         return long_to_string(longitude=value.x, concise=True)
 
     def value_az_bearing_derived(self, record):
-        return record.get_azimuth_to_gbt()
+        return record.azimuth_to_gbt
 
 
 class FacilityTableWithConcur(FacilityTable):
@@ -442,7 +452,7 @@ class PersonTable(tables.Table):
         exclude = ("search",)
 
 
-class AttachmentTable(tables.Table):
+class AttachmentTable(AttachmentRefreshMixin, tables.Table):
     file_path = tables.Column(linkify=True, verbose_name="Attachment")
     file = RemappedUnboundFileColumn(accessor="file_path", verbose_name="Link")
     original_index = tables.Column(verbose_name="Letter #")
@@ -0,0 +1,63 @@
+"""Tasks that are too large to do within a request (see the jobs app)"""
+
+from django.contrib.auth.models import AnonymousUser
+from django.utils.module_loading import import_string
+
+from jobs.registry import register
+from .kml import KML_CONTENT_TYPE
+from .models import Attachment
+
+
+def _get_view(job, view, query):
+    view_class = import_string(view)
+    return view_class.from_query(query, user=job.created_by or AnonymousUser())
+
+
+@register("cases.export_table")
+def export_table(job, view, query, export_format):
+    """Export the table of the given FilterTableView, filtered by the given query"""
+    view = _get_view(job, view, query)
+    num_rows = view.object_list.count()
+    job.set_progress(0, total=num_rows, message="Exporting rows")
+
+    exporter = view.export_class(
+        export_format=export_format,
+        table=view.get_table(**view.get_table_kwargs()),
+        exclude_columns=view.exclude_columns,
+        progress=job.set_progress,
+    )
+    job.result_content_type = exporter.content_type()
+    path = job.get_result_path(view.get_export_filename(export_format))
+    with open(path, "wb") as file:
+        exporter.write(file)
+    job.set_progress(num_rows, message=f"Exported {num_rows} rows")
+
+
+@register("cases.export_kml")
+def export_kml(job, view, query):
+    """Export the Facilities of the given KmlExportMixin view as KML"""
+    view = _get_view(job, view, query)
+    facilities = view.get_kml_facilities()
+    num_facilities = facilities.count()
+    job.set_progress(0, total=num_facilities, message="Exporting Facilities")
+
+    job.result_content_type = KML_CONTENT_TYPE
+    path = job.get_result_path(view.kml_filename)
+    with open(path, "w", encoding="utf-8") as file:
+        for chunk in view.stream_kml(facilities):
+            file.write(chunk)
+    job.set_progress(num_facilities, message=f"Exported {num_facilities} Facilities")
+
+
+@register("cases.refresh_attachments")
+def refresh_attachments(job, attachment_ids=None, force=False):
+    """Refresh the given Attachments (or all of them) from disk, if they've changed
+
+    See AttachmentManager.refresh_attachments
+    """
+    attachments = Attachment.objects.all()
+    if attachment_ids is not None:
+        attachments = attachments.filter(id__in=attachment_ids)
+    Attachment.objects.refresh_attachments(
+        attachments, force=force, progress=job.set_progress
+    )
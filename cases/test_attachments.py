@@ -0,0 +1,109 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.db import IntegrityError
+from django.test import TestCase
+
+from cases import managers
+from cases.models import Attachment
+
+
+class AttachmentRefreshTest(TestCase):
+    def setUp(self):
+        file = tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False)
+        file.write("foo")
+        file.close()
+        self.addCleanup(os.remove, file.name)
+        self.attachment = Attachment.objects.create(file_path=file.name)
+
+    def test_file_has_changed(self):
+        self.assertTrue(self.attachment.refresh_is_due())
+        # Never hashed, so it has changed
+        self.assertTrue(self.attachment.file_has_changed())
+
+        Attachment.objects.refresh_attachments(Attachment.objects.all())
+        self.attachment.refresh_from_db()
+        self.assertFalse(self.attachment.refresh_is_due())
+        self.assertTrue(self.attachment.refresh_is_due(ttl=0))
+        self.assertFalse(self.attachment.file_has_changed())
+
+        # The file can't be checked, which doesn't make it missing
+        with mock.patch(
+            "cases.models.os.stat", side_effect=PermissionError("Permission denied")
+        ):
+            self.assertFalse(self.attachment.file_has_changed())
+
+        with open(self.attachment.file_path, "a") as file:
+            file.write("bar")
+        self.assertTrue(self.attachment.file_has_changed())
+
+    def test_refresh_attachments(self):
+        missing = Attachment.objects.create(file_path="/does/not/exist.txt")
+        attachments = Attachment.objects.filter(id__in=[self.attachment.id, missing.id])
+
+        def refresh(**kwargs):
+            with mock.patch(
+                "cases.managers.hash_file", wraps=managers.hash_file
+            ) as hash_file:
+                counts = Attachment.objects.refresh_attachments(
+                    attachments, workers=2, chunk_size=1, **kwargs
+                )
+            return counts, hash_file.call_count
+
+        self.assertEqual(
+            refresh(),
+            ({"unchanged": 0, "changed": 1, "missing": 1, "failed": 0}, 1),
+        )
+        self.attachment.refresh_from_db()
+        self.assertIsNotNone(self.attachment.hash_on_disk)
+
+        # Nothing changed, so nothing is re-hashed
+        self.assertEqual(
+            refresh(), ({"unchanged": 1, "changed": 0, "missing": 1, "failed": 0}, 0)
+        )
+        self.assertEqual(
+            refresh(force=True),
+            ({"unchanged": 1, "changed": 0, "missing": 1, "failed": 0}, 1),
+        )
+
+    def test_refresh_attachments_unreadable(self):
+        Attachment.objects.refresh_attachments(Attachment.objects.all())
+        self.attachment.refresh_from_db()
+        hash_on_disk = self.attachment.hash_on_disk
+
+        # The file can't be read (rather than being missing), so it is left as it was
+        with mock.patch(
+            "cases.managers.os.stat", side_effect=PermissionError("Permission denied")
+        ):
+            counts = Attachment.objects.refresh_attachments(
+                Attachment.objects.all(), force=True
+            )
+        self.assertEqual(
+            counts, {"unchanged": 0, "changed": 0, "missing": 0, "failed": 1}
+        )
+        self.attachment.refresh_from_db()
+        self.assertEqual(self.attachment.hash_on_disk, hash_on_disk)
+        self.assertIsNotNone(self.attachment.file_size)
+
+    def test_refresh_attachments_unsaved(self):
+        missing = Attachment.objects.create(file_path="/does/not/exist.txt")
+        save = Attachment.save
+
+        def save_or_fail(attachment, *args, **kwargs):
+            if attachment.id == self.attachment.id:
+                raise IntegrityError("duplicate key value")
+            return save(attachment, *args, **kwargs)
+
+        # The changed Attachment can't be saved, so it is only counted as failed
+        with mock.patch.object(
+            Attachment.objects, "bulk_update", side_effect=IntegrityError
+        ), mock.patch.object(Attachment, "save", save_or_fail):
+            counts = Attachment.objects.refresh_attachments(
+                Attachment.objects.filter(id__in=[self.attachment.id, missing.id])
+            )
+        self.assertEqual(
+            counts, {"unchanged": 0, "changed": 0, "missing": 1, "failed": 1}
+        )
+        self.attachment.refresh_from_db()
+        self.assertIsNone(self.attachment.hash_on_disk)
@@ -0,0 +1,68 @@
+from django.test import SimpleTestCase
+
+from importers import converters
+from importers.converters import (
+    coerce_coords,
+    coerce_float,
+    coerce_none,
+    converter_cache,
+    memoized,
+)
+
+
+class ConverterTest(SimpleTestCase):
+    def test_coerce_none(self):
+        self.assertIsNone(coerce_none(" n/a "))
+        self.assertIsNone(coerce_none("0", none_str_values=["0"]))
+        self.assertEqual(coerce_none("0"), "0")
+
+    def test_coerce_float(self):
+        self.assertEqual(coerce_float(" 1,900 MHz "), 1900.0)
+        self.assertEqual(coerce_float("Quad"), 4.0)
+        self.assertIsNone(coerce_float("#N/A"))
+
+    def test_coerce_coords(self):
+        self.assertAlmostEqual(coerce_coords("38 25 59.8"), 38.43328, places=5)
+        self.assertAlmostEqual(coerce_coords("382559.8"), 38.43328, places=5)
+        self.assertIsNone(coerce_coords("None provided"))
+        with self.assertRaises(ValueError):
+            coerce_coords("38° 25' 59.8\"")
+
+
+class ConverterCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.calls = []
+
+        @memoized
+        def convert(value):
+            self.calls.append(value)
+            if value == "bad":
+                raise ValueError("Bad value")
+            return value
+
+        self.convert = convert
+
+    def test_not_cached_outside_of_block(self):
+        self.convert("a")
+        self.convert("a")
+        self.assertEqual(self.calls, ["a", "a"])
+
+    def test_cached_within_block(self):
+        with converter_cache():
+            self.assertEqual(self.convert("a"), "a")
+            self.assertEqual(self.convert("a"), "a")
+            # Different types are cached separately
+            self.assertIs(self.convert(1), 1)
+            self.assertIs(self.convert(True), True)
+            # Unhashable values bypass the cache
+            self.convert(["a"])
+            self.convert(["a"])
+        self.assertEqual(self.calls, ["a", 1, True, ["a"], ["a"]])
+        self.assertIsNone(converters._converter_caches)
+
+    def test_errors_not_cached(self):
+        with converter_cache():
+            for __ in range(2):
+                with self.assertRaises(ValueError):
+                    self.convert("bad")
+        self.assertEqual(self.calls, ["bad", "bad"])
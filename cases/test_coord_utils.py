@@ -0,0 +1,13 @@
+from django.test import SimpleTestCase
+
+from utils.coord_utils import lat_to_string, long_to_string
+
+
+class CoordStringTest(SimpleTestCase):
+    def test_lat_to_string(self):
+        self.assertEqual(lat_to_string(38.43328, concise=True), "38 25 59.808")
+        self.assertEqual(lat_to_string(-38.43328), " 38° 25′ 59.808″ S")
+
+    def test_long_to_string(self):
+        self.assertEqual(long_to_string(-79.83983, concise=True), "-79 50 23.388")
+        self.assertEqual(long_to_string(-79.83983), " 79° 50′ 23.388″ W")
@@ -0,0 +1,68 @@
+from itertools import combinations
+
+from django.test import TestCase
+
+from utils.dedup import find_duplicate_groups, find_similar_pairs, similarity, trigrams
+
+
+class TrigramTest(TestCase):
+    def test_trigrams(self):
+        # Matches SELECT show_trgm('Hi, Bo!')
+        self.assertEqual(
+            trigrams("Hi, Bo!"), {"  h", " hi", "hi ", "  b", " bo", "bo "}
+        )
+
+    def test_empty(self):
+        self.assertEqual(similarity(trigrams(""), trigrams("")), 0)
+
+    def test_similarity(self):
+        # Matches SELECT similarity('word', 'two words')
+        self.assertAlmostEqual(
+            similarity(trigrams("word"), trigrams("two words")), 4 / 11
+        )
+
+
+class FindSimilarPairsTest(TestCase):
+    NAMES = [
+        "John Smith",
+        "john smith",
+        "Jon Smith",
+        "John Smyth",
+        "Jane Smith",
+        "Johnny Smith",
+        "Robert Brown",
+        "Bob Brown",
+        "Robert Browne",
+    ]
+
+    def test_same_as_all_pairs(self):
+        trigrams_by_id = {id_: trigrams(name) for id_, name in enumerate(self.NAMES)}
+        for threshold in (0.3, 0.5, 0.7, 0.9):
+            expected = {
+                (id_a, id_b)
+                for id_a, id_b in combinations(trigrams_by_id, 2)
+                if similarity(trigrams_by_id[id_a], trigrams_by_id[id_b]) > threshold
+            }
+            actual = {
+                tuple(sorted(pair))
+                for pair in find_similar_pairs(trigrams_by_id, threshold)
+            }
+            self.assertEqual(actual, expected, f"threshold={threshold}")
+
+
+class FindDuplicateGroupsTest(TestCase):
+    def test_groups(self):
+        people = [
+            (1, "John Smith", "jsmith@example.com"),
+            (2, "JOHN SMITH", ""),
+            (3, "john smith", "JSmith@Example.com"),
+            (4, "John Smith", "someone.else@elsewhere.org"),
+            (5, "Robert Brown", None),
+            (6, "Robert Brown", ""),
+            (7, "Jane Doe", ""),
+        ]
+        # 4's email doesn't match 1 or 3, but 2 has no email, so they are all
+        # connected via 2
+        self.assertEqual(
+            find_duplicate_groups(people, threshold=0.9), [[1, 2, 3, 4], [5, 6]]
+        )
@@ -0,0 +1,63 @@
+from django.test import TestCase
+
+from utils.geodesy import densify_ring, point_in_polygon, vincenty_inverse
+
+
+class VincentyInverseTest(TestCase):
+    def test_coincident_points(self):
+        self.assertEqual(vincenty_inverse(-79.84, 38.43, -79.84, 38.43), (0.0, 0.0))
+
+    def test_along_equator(self):
+        distance, azimuth = vincenty_inverse(0, 0, 1, 0)
+        self.assertAlmostEqual(distance, 111319.491, places=3)
+        self.assertAlmostEqual(azimuth, 90)
+
+    def test_azimuth_is_normalized(self):
+        __, azimuth = vincenty_inverse(0, 0, -1, 0)
+        self.assertAlmostEqual(azimuth, 270)
+
+    def test_known_distance(self):
+        # Flinders Peak to Buninyong; the canonical example from Vincenty's paper
+        distance, azimuth = vincenty_inverse(
+            144.42486788888888,
+            -37.95103341666667,
+            143.92649552777777,
+            -37.65282113888889,
+        )
+        self.assertAlmostEqual(distance, 54972.271, places=3)
+        self.assertAlmostEqual(azimuth, 306.86816, places=5)
+
+
+class PointInPolygonTest(TestCase):
+    SQUARE = ((0, 0), (10, 0), (10, 10), (0, 10), (0, 0))
+    HOLE = ((2, 2), (4, 2), (4, 4), (2, 4), (2, 2))
+
+    def test_inside(self):
+        self.assertTrue(point_in_polygon(5, 5, (self.SQUARE,)))
+
+    def test_outside(self):
+        self.assertFalse(point_in_polygon(11, 5, (self.SQUARE,)))
+
+    def test_on_edge(self):
+        self.assertTrue(point_in_polygon(10, 5, (self.SQUARE,)))
+
+    def test_in_hole(self):
+        self.assertFalse(point_in_polygon(3, 3, (self.SQUARE, self.HOLE)))
+        # The edge of a hole is still covered by the polygon
+        self.assertTrue(point_in_polygon(2, 3, (self.SQUARE, self.HOLE)))
+
+
+class DensifyRingTest(TestCase):
+    # Roughly the NRQZ
+    RING = ((-80.5, 37.5), (-78.5, 37.5), (-78.5, 39.25), (-80.5, 39.25), (-80.5, 37.5))
+
+    def test_vertices_are_kept(self):
+        densified = densify_ring(self.RING)
+        for vertex in self.RING:
+            self.assertIn(vertex, densified)
+
+    def test_edges_follow_great_circles(self):
+        # The northern edge's great circle bulges about 500 m north of 39.25°
+        self.assertFalse(point_in_polygon(-79.5, 39.253, (self.RING,)))
+        self.assertTrue(point_in_polygon(-79.5, 39.253, (densify_ring(self.RING),)))
+        self.assertFalse(point_in_polygon(-79.5, 39.26, (densify_ring(self.RING),)))
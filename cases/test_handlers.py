@@ -0,0 +1,132 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.test import TestCase
+
+from django_import_data.models import FileImportAttempt
+
+from cases.models import Attachment, Case, Facility, PreliminaryCase
+from importers import batch
+from importers.lookups import ImportLookup, forget_on_rollback, import_cache, lookup
+
+
+class ImportLookupTest(TestCase):
+    def test_prefetch(self):
+        case = Case.objects.create(case_num="1001")
+        cases = ImportLookup(Case, "case_num")
+        with self.assertNumQueries(1):
+            # Keys are converted for the field, so ints work for case_num too
+            cases.prefetch([1001, "1001", "1002", None, ""])
+        with self.assertNumQueries(0):
+            self.assertEqual(cases.get("1001"), case)
+            self.assertEqual(cases.get(1001), case)
+            self.assertIsNone(cases.get("1002"))
+        self.assertEqual((cases.hits, cases.misses, cases.queries), (3, 0, 1))
+
+    def test_get_not_prefetched(self):
+        pcase = PreliminaryCase.objects.create(case_num=101)
+        pcases = ImportLookup(PreliminaryCase, "case_num")
+        with self.assertNumQueries(1):
+            self.assertEqual(pcases.get("101"), pcase)
+            self.assertEqual(pcases.get(101), pcase)
+        self.assertEqual((pcases.hits, pcases.misses), (1, 1))
+
+    def test_remember(self):
+        cases = ImportLookup(Case, "case_num")
+        self.assertIsNone(cases.get("1001"))
+        case = Case.objects.create(case_num="1001")
+        cases.remember("1001", case)
+        with self.assertNumQueries(0):
+            self.assertEqual(cases.get("1001"), case)
+
+    def test_remember_rolled_back(self):
+        cases = ImportLookup(Case, "case_num")
+        case = Case.objects.create(case_num="1001")
+        cases.remember("1001", case)
+        try:
+            with transaction.atomic(), forget_on_rollback(cases):
+                cases.remember("1002", Case.objects.create(case_num="1002"))
+                self.assertIsNotNone(cases.get("1002"))
+                raise ValueError("Roll back the row")
+        except ValueError:
+            pass
+        with self.assertNumQueries(1):
+            self.assertIsNone(cases.get("1002"))
+            # Only what was remembered within the block is forgotten
+            self.assertEqual(cases.get("1001"), case)
+
+    def test_remember_dry_run(self):
+        with import_cache():
+            cases = lookup(Case, "case_num")
+            with transaction.atomic(), forget_on_rollback(rolled_back=True):
+                cases.remember("1001", Case.objects.create(case_num="1001"))
+                transaction.set_rollback(True)
+            self.assertIsNone(cases.get("1001"))
+
+
+class ImportCacheTest(TestCase):
+    def test_new_file_forgets_uncommitted(self):
+        with import_cache():
+            cases = lookup(Case, "case_num")
+            with transaction.atomic():
+                cases.remember("1001", Case.objects.create(case_num="1001"))
+                # The file is rolled back without raising
+                transaction.set_rollback(True)
+            # The next file starts
+            post_save.send(sender=FileImportAttempt, instance=None, created=True)
+            with self.assertNumQueries(1):
+                self.assertIsNone(cases.get("1001"))
+
+    def test_shared(self):
+        self.assertIsNot(lookup(Case, "case_num"), lookup(Case, "case_num"))
+        with import_cache() as lookups:
+            cases = lookup(Case, "case_num")
+            self.assertIs(lookup(Case, "case_num"), cases)
+            with import_cache():
+                self.assertIs(lookup(Case, "case_num"), cases)
+            self.assertIsNot(lookup(PreliminaryCase, "case_num"), cases)
+            self.assertEqual(len(lookups), 2)
+        self.assertIsNot(lookup(Case, "case_num"), cases)
+
+
+class ImportBatchTest(TestCase):
+    def setUp(self):
+        self.case = Case.objects.create(case_num="1001")
+        self.attachment = Attachment.objects.create(file_path="/foo.pdf")
+
+    def test_unbatched(self):
+        facility = Facility.objects.create(case=self.case)
+        facility.propagation_study = self.attachment
+        batch.update(facility, ["propagation_study"])
+        batch.add_m2m(facility, "attachments", [self.attachment])
+        facility.refresh_from_db()
+        self.assertEqual(facility.propagation_study, self.attachment)
+        self.assertEqual(list(facility.attachments.all()), [self.attachment])
+
+    def test_batched(self):
+        facilities = [Facility.objects.create(case=self.case) for __ in range(3)]
+        with batch.import_batch():
+            for facility in facilities:
+                facility.propagation_study = self.attachment
+                batch.update(facility, ["propagation_study"])
+                batch.add_m2m(facility, "attachments", [self.attachment])
+                # Adding the same link again is harmless, as with add()
+                batch.add_m2m(facility, "attachments", [self.attachment])
+            self.assertFalse(self.attachment.facilities.exists())
+            # The second row is rolled back after its writes were collected
+            facilities[1].delete()
+
+        self.assertEqual(
+            set(Facility.objects.filter(propagation_study=self.attachment)),
+            {facilities[0], facilities[2]},
+        )
+        self.assertEqual(
+            set(self.attachment.facilities.all()), {facilities[0], facilities[2]}
+        )
+
+    def test_discarded_on_error(self):
+        facility = Facility.objects.create(case=self.case)
+        with self.assertRaises(ValueError):
+            with batch.import_batch():
+                batch.add_m2m(facility, "attachments", [self.attachment])
+                raise ValueError("The import failed")
+        self.assertFalse(facility.attachments.exists())
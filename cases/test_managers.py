@@ -1,6 +1,14 @@
 from django.test import TestCase
 
-from cases.models import Case, CaseGroup, PreliminaryCase
+from cases.models import (
+    Case,
+    CaseGroup,
+    CaseGroupBuild,
+    CaseGroupPendingReference,
+    CaseStatusSummary,
+    Facility,
+    PreliminaryCase,
+)
 
 
 class CaseManagerTest(TestCase):
@@ -26,33 +34,33 @@ class CaseManagerTest(TestCase):
 
     def test_reference_type_1(self):
         # Case 1 directly references 2 and 3
-        case_1 = Case.objects.create(case_num=1, comments="NRQZ#2 NRQZ#3")
-        case_2 = Case.objects.create(case_num=2)
-        case_3 = Case.objects.create(case_num=3)
+        case_1 = Case.objects.create(case_num=1001, comments="NRQZ#1002 NRQZ#1003")
+        case_2 = Case.objects.create(case_num=1002)
+        case_3 = Case.objects.create(case_num=1003)
         self._common(case_1, case_2, case_3)
 
     def test_reference_type_2(self):
         # Case 1 directly references 2
-        case_1 = Case.objects.create(case_num=1, comments="NRQZ#2")
+        case_1 = Case.objects.create(case_num=1001, comments="NRQZ#1002")
         # Case 2 directly references 3
-        case_2 = Case.objects.create(case_num=2, comments="NRQZ#3")
+        case_2 = Case.objects.create(case_num=1002, comments="NRQZ#1003")
         # Case 3 doesn't reference anything, but this shouldn't matter
-        case_3 = Case.objects.create(case_num=3)
+        case_3 = Case.objects.create(case_num=1003)
         self._common(case_1, case_2, case_3)
 
     def test_non_existent_case_num_reference(self):
         # Case 1 directly references 2
-        case_1 = Case.objects.create(case_num=1, comments="NRQZ#2")
+        case_1 = Case.objects.create(case_num=1001, comments="NRQZ#1002")
         # Case 2 directly references 3
-        case_2 = Case.objects.create(case_num=2, comments="NRQZ#3")
-        # Case 3 references Case 25, which doesn't exist (and will be ignored)
-        case_3 = Case.objects.create(case_num=3, comments="NRQZ#25")
+        case_2 = Case.objects.create(case_num=1002, comments="NRQZ#1003")
+        # Case 3 references Case 1025, which doesn't exist (and will be ignored)
+        case_3 = Case.objects.create(case_num=1003, comments="NRQZ#1025")
         self._common(case_1, case_2, case_3)
 
     def test_multiple_case_groups(self):
-        case_1 = Case.objects.create(case_num=1, comments="NRQZ#2")
-        case_2 = Case.objects.create(case_num=2)
-        case_3 = Case.objects.create(case_num=3, comments="NRQZ#25")
+        case_1 = Case.objects.create(case_num=1001, comments="NRQZ#1002")
+        case_2 = Case.objects.create(case_num=1002)
+        case_3 = Case.objects.create(case_num=1003, comments="NRQZ#1025")
 
         self.assertEqual(CaseGroup.objects.count(), 0)
 
@@ -77,9 +85,9 @@ class CaseManagerTest(TestCase):
         )
 
     def test_no_references(self):
-        case_1 = Case.objects.create(case_num=1)
-        case_2 = Case.objects.create(case_num=2)
-        case_3 = Case.objects.create(case_num=3)
+        case_1 = Case.objects.create(case_num=1001)
+        case_2 = Case.objects.create(case_num=1002)
+        case_3 = Case.objects.create(case_num=1003)
 
         self.assertEqual(CaseGroup.objects.count(), 0)
 
@@ -90,14 +98,16 @@ class CaseManagerTest(TestCase):
         self.assertEqual(CaseGroup.objects.all()[2].cases.first(), case_3)
 
     def test_pm(self):
-        c7 = Case.objects.create(case_num=7)
+        c7 = Case.objects.create(case_num=1007)
         # PC1 is related to C7 via its comments
-        pc1 = PreliminaryCase.objects.create(case_num=1, comments="NRQZ#7")
+        pc1 = PreliminaryCase.objects.create(case_num=101, comments="NRQZ#1007")
         # PC2 and PC3 are related together via their comments, and should end up in
         # the same PCG
-        pc2 = PreliminaryCase.objects.create(case_num=2, comments="NRQZ#P3")
+        pc2 = PreliminaryCase.objects.create(case_num=102, comments="NRQZ#P103")
         # Note that PC3 is related to C7 via its comments
-        pc3 = PreliminaryCase.objects.create(case_num=3, comments="NRQZ#P2 NRQZ#7")
+        pc3 = PreliminaryCase.objects.create(
+            case_num=103, comments="NRQZ#P102 NRQZ#1007"
+        )
 
         # Now we loop through all of our PCs and perform "post import actions" on them
         # Basically this is calling handle_pcase_group and derive_cases_from_comments
@@ -123,9 +133,9 @@ class CaseManagerTest(TestCase):
         )
 
     def test_case_stuff(self):
-        c7 = Case.objects.create(case_num=7, comments="NRQZ#P1")
+        c7 = Case.objects.create(case_num=1007, comments="NRQZ#P101")
         # PC1 is related to C7 via its comments
-        pc1 = PreliminaryCase.objects.create(case_num=1)
+        pc1 = PreliminaryCase.objects.create(case_num=101)
 
         # Now we loop through all of our PCs and perform "post import actions" on them
         # Basically this is calling handle_pcase_group and derive_cases_from_comments
@@ -139,3 +149,208 @@ class CaseManagerTest(TestCase):
             list(pc1.case_groups.first().pcases.order_by("case_num")), [pc1]
         )
         self.assertEqual(list(c7.case_groups.all()), list(pc1.case_groups.all()))
+
+
+class CaseGroupBuildTest(TestCase):
+    def _case_nums_by_group(self):
+        return sorted(
+            (
+                sorted(case_group.cases.values_list("case_num", flat=True)),
+                sorted(case_group.pcases.values_list("case_num", flat=True)),
+            )
+            for case_group in CaseGroup.objects.all()
+        )
+
+    def test_full(self):
+        Case.objects.create(case_num=1001, comments="NRQZ#1002")
+        Case.objects.create(case_num=1002, comments="NRQZ#1003")
+        Case.objects.create(case_num=1003)
+        Case.objects.create(case_num=1004, comments="NRQZ#9999")
+        PreliminaryCase.objects.create(case_num=105, comments="NRQZ#1001 NRQZ#P106")
+        PreliminaryCase.objects.create(case_num=106)
+
+        build = CaseGroup.objects.build_case_groups_incrementally()
+        self.assertTrue(build.full)
+        self.assertEqual(
+            self._case_nums_by_group(),
+            [(["1001", "1002", "1003"], [105, 106]), (["1004"], [])],
+        )
+
+    def test_incremental(self):
+        Case.objects.create(case_num=1001, comments="NRQZ#1002")
+        Case.objects.create(case_num=1002)
+        case_3 = Case.objects.create(case_num=1003)
+        CaseGroup.objects.build_case_groups_incrementally()
+        self.assertEqual(
+            self._case_nums_by_group(), [(["1001", "1002"], []), (["1003"], [])]
+        )
+        case_group = Case.objects.get(case_num=1001).case_groups.get()
+        case_group.name = "Keep me"
+        case_group.save()
+
+        # Only Case 1003 has changed, and it now references Case 1002, so its
+        # CaseGroup is merged into the older one
+        case_3.comments = "NRQZ#1002"
+        case_3.save()
+        build = CaseGroup.objects.build_case_groups_incrementally()
+        self.assertFalse(build.full)
+        self.assertEqual(build.num_case_groups_created, 0)
+        self.assertEqual(build.num_case_groups_merged, 1)
+        self.assertEqual(self._case_nums_by_group(), [(["1001", "1002", "1003"], [])])
+        self.assertEqual(CaseGroup.objects.get().name, "Keep me")
+
+        # Nothing has changed since, so nothing needs to be done
+        build = CaseGroup.objects.build_case_groups_incrementally()
+        self.assertEqual(build.num_case_groups_created, 0)
+        self.assertEqual(build.num_case_groups_merged, 0)
+        self.assertEqual(CaseGroupBuild.objects.count(), 3)
+
+    def test_incremental_forward_reference(self):
+        Case.objects.create(case_num=1001, comments="P300; NRQZ#3000")
+        CaseGroup.objects.build_case_groups_incrementally()
+        self.assertEqual(CaseGroupPendingReference.objects.count(), 2)
+
+        # Case 1001 hasn't changed since, but the Case it references now exists
+        Case.objects.create(case_num=3000)
+        CaseGroup.objects.build_case_groups_incrementally()
+        self.assertEqual(self._case_nums_by_group(), [(["1001", "3000"], [])])
+        self.assertEqual(
+            list(CaseGroupPendingReference.objects.values_list("kind", "case_num")),
+            [("pcase", "300")],
+        )
+
+        PreliminaryCase.objects.create(case_num=300)
+        CaseGroup.objects.build_case_groups_incrementally()
+        self.assertEqual(self._case_nums_by_group(), [(["1001", "3000"], [300])])
+        self.assertFalse(CaseGroupPendingReference.objects.exists())
+
+    def test_incremental_queryset_update(self):
+        Case.objects.create(case_num=1001)
+        Case.objects.create(case_num=1002)
+        CaseGroup.objects.build_case_groups_incrementally()
+
+        # update() doesn't set modified_on, but the database does
+        Case.objects.filter(case_num=1001).update(comments="NRQZ#1002")
+        CaseGroup.objects.build_case_groups_incrementally()
+        self.assertEqual(self._case_nums_by_group(), [(["1001", "1002"], [])])
+
+    def test_rebuild_removes_stale_memberships(self):
+        case_1 = Case.objects.create(case_num=1001, comments="NRQZ#1002")
+        Case.objects.create(case_num=1002)
+        CaseGroup.objects.build_case_groups_incrementally()
+        case_group = CaseGroup.objects.get()
+
+        # The reference is removed, so Case 1002 no longer belongs with Case 1001.
+        # Incremental builds never split CaseGroups, but a rebuild does
+        case_1.comments = ""
+        case_1.save()
+        CaseGroup.objects.build_case_groups_incrementally()
+        self.assertEqual(self._case_nums_by_group(), [(["1001", "1002"], [])])
+        build = CaseGroup.objects.rebuild_case_groups()
+        self.assertEqual(build.num_case_groups_created, 1)
+        self.assertEqual(self._case_nums_by_group(), [(["1001"], []), (["1002"], [])])
+        # The existing CaseGroup is kept for the first Case
+        self.assertEqual(case_1.case_groups.get(), case_group)
+
+    def test_same_as_build_all_case_groups(self):
+        Case.objects.create(case_num=1007, comments="NRQZ#P101")
+        PreliminaryCase.objects.create(case_num=101)
+        PreliminaryCase.objects.create(case_num=102, comments="NRQZ#P103")
+        PreliminaryCase.objects.create(case_num=103, comments="NRQZ#P102 NRQZ#1007")
+        PreliminaryCase.objects.create(case_num=104)
+
+        CaseGroup.objects.build_all_case_groups()
+        expected = self._case_nums_by_group()
+        CaseGroup.objects.all().delete()
+        CaseGroup.objects.build_case_groups_incrementally()
+        self.assertEqual(self._case_nums_by_group(), expected)
+
+
+class CaseRollupTest(TestCase):
+    def _rollup(self, case):
+        return (
+            Case.objects.annotate_rollup()
+            .values(*Case.objects.ROLLUP_FIELDS)
+            .get(id=case.id)
+        )
+
+    def test_no_facilities(self):
+        case = Case.objects.create(case_num=1)
+        rollup = self._rollup(case)
+        self.assertEqual(rollup["num_facilities"], 0)
+        self.assertIsNone(rollup["meets_erpd_limit"])
+        self.assertIsNone(rollup["sgrs_approval"])
+        self.assertIsNone(case.get_si_done())
+
+    def test_pending_denied_approved(self):
+        case = Case.objects.create(case_num=1)
+        Facility.objects.create(case=case, meets_erpd_limit=True, sgrs_approval=True)
+        Facility.objects.create(case=case, meets_erpd_limit=False, sgrs_approval=None)
+        rollup = self._rollup(case)
+        self.assertEqual(rollup["num_facilities"], 2)
+        self.assertIs(rollup["meets_erpd_limit"], False)
+        self.assertIsNone(rollup["sgrs_approval"])
+        self.assertEqual(rollup["si_pending"], 2)
+
+        Facility.objects.filter(case=case).update(
+            meets_erpd_limit=True, sgrs_approval=True
+        )
+        rollup = self._rollup(case)
+        self.assertIs(rollup["meets_erpd_limit"], True)
+        self.assertIs(rollup["sgrs_approval"], True)
+
+    def test_rollup_uses_annotations(self):
+        case = Case.objects.create(case_num=1)
+        Facility.objects.create(case=case, meets_erpd_limit=True)
+        case = Case.objects.annotate_rollup().get(id=case.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(case.num_facilities_evaluated, 1)
+            self.assertIs(case.get_meets_erpd_limit(), True)
+
+
+class CaseStatusSummaryTest(TestCase):
+    def test_kept_consistent_by_triggers(self):
+        case_1 = Case.objects.create(case_num=1)
+        case_2 = Case.objects.create(case_num=2)
+        # Summaries are created along with their Cases
+        self.assertEqual(case_1.status_summary.num_facilities, 0)
+
+        facility = Facility.objects.create(case=case_1, meets_erpd_limit=True)
+        Facility.objects.create(case=case_1, meets_erpd_limit=None)
+        self.assertEqual(CaseStatusSummary.objects.find_inconsistent(), [])
+        summary = CaseStatusSummary.objects.get(case=case_1)
+        self.assertEqual(summary.num_facilities, 2)
+        self.assertIsNone(summary.meets_erpd_limit)
+
+        # Bulk updates. Summaries are only refreshed at commit (which never happens
+        # within a TestCase), unless flushed
+        Facility.objects.filter(case=case_1).update(meets_erpd_limit=True)
+        summary.refresh_from_db()
+        self.assertIsNone(summary.meets_erpd_limit)
+        CaseStatusSummary.objects.flush_pending()
+        summary.refresh_from_db()
+        self.assertIs(summary.meets_erpd_limit, True)
+
+        # Moving a Facility between Cases
+        facility.case = case_2
+        facility.save()
+        # Deletion
+        Facility.objects.filter(case=case_1).delete()
+        self.assertEqual(CaseStatusSummary.objects.find_inconsistent(), [])
+        self.assertEqual(
+            dict(
+                CaseStatusSummary.objects.values_list(
+                    "case__case_num", "num_facilities"
+                )
+            ),
+            {"1": 0, "2": 1},
+        )
+
+    def test_refresh(self):
+        case = Case.objects.create(case_num=1)
+        Facility.objects.create(case=case, sgrs_approval=True)
+        CaseStatusSummary.objects.flush_pending()
+        CaseStatusSummary.objects.update(num_facilities=0)
+        self.assertEqual(CaseStatusSummary.objects.find_inconsistent(), [case.id])
+        CaseStatusSummary.objects.refresh([case.id])
+        self.assertEqual(CaseStatusSummary.objects.find_inconsistent(), [])
@@ -0,0 +1,69 @@
+import os
+from tempfile import TemporaryDirectory
+
+from django.test import SimpleTestCase
+
+from importers.nrqz_analyzer.parser import NamParser, read_nrqz_id
+
+V2_LINES = [
+    "nrqzApp v2\r\n",
+    "nrqzID:190101A\r\n",
+    "lat:38 25 59.8\r\n",
+    "lon:79 50 23.1\r\n",
+    "01 Jan 2019 note:first\r\n",
+    "type:omni\r\n",
+    "freq:1900\r\n",
+    "PanRng:1\r\n",
+    "\r\n",
+    "type:yagi\r\n",
+    "freq:700\r\n",
+    "PanRng:2\r\n",
+    "not a key value pair\r\n",
+]
+
+
+class NamParserTest(SimpleTestCase):
+    def test_iter_records(self):
+        parser = NamParser(V2_LINES)
+        records = list(parser.iter_records())
+        self.assertEqual(parser.version, "nrqzApp v2")
+        location = {"nrqzID": "190101A", "lat": "38 25 59.8", "lon": "79 50 23.1"}
+        self.assertEqual(
+            records[:2],
+            [
+                (
+                    "facility",
+                    {**location, "type": "omni", "freq": "1900", "PanRng": "1"},
+                ),
+                (
+                    "facility",
+                    {**location, "type": "yagi", "freq": "700", "PanRng": "2"},
+                ),
+            ],
+        )
+        kind, main_dict = records[2]
+        self.assertEqual(kind, "main")
+        self.assertEqual(
+            main_dict["comments"],
+            "01 Jan 2019 note:first\r\nnot a key value pair\r\n",
+        )
+        self.assertEqual(
+            parser.errors, {"non_key_value_rows": ["not a key value pair"]}
+        )
+        self.assertIn("nrqzApp v2", parser.keys)
+        self.assertIn("PanRng", parser.keys)
+
+    def test_unknown_version(self):
+        with self.assertRaises(ValueError):
+            list(NamParser(["nrqzApp v3\n"]).iter_records())
+
+    def test_read_nrqz_id(self):
+        with TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "190101A.nam")
+            with open(path, "w", newline="") as file:
+                file.writelines(V2_LINES)
+            self.assertEqual(read_nrqz_id(path), "190101A")
+
+            with open(path, "w", newline="") as file:
+                file.writelines(["nrqzApp v2\r\n", "lat:38 25 59.8\r\n"])
+            self.assertIsNone(read_nrqz_id(path))
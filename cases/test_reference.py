@@ -0,0 +1,48 @@
+from django.contrib.gis.geos import Point
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+
+from cases import reference
+from cases.models import Location
+from cases.reference import clear_reference_cache, get_gbt_location
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class ReferenceCacheTest(TransactionTestCase):
+    # Not a TestCase, since the caches are only cleared once the change commits
+    def setUp(self):
+        clear_reference_cache()
+        self.addCleanup(clear_reference_cache)
+        self.gbt = Location.objects.create(name="GBT", location=Point(-79.84, 38.43))
+
+    def test_get_gbt_location(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(get_gbt_location().coords, (-79.84, 38.43))
+            self.assertEqual(get_gbt_location().coords, (-79.84, 38.43))
+
+        # Another process (i.e. one without the per-process cache) uses the shared
+        # cache rather than querying
+        reference._cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_gbt_location().coords, (-79.84, 38.43))
+
+    def test_invalidated_on_save(self):
+        get_gbt_location()
+        self.gbt.location = Point(-79.0, 38.0)
+        self.gbt.save()
+        self.assertEqual(get_gbt_location().coords, (-79.0, 38.0))
+
+    def test_rolled_back_change_not_shared(self):
+        get_gbt_location()
+        with transaction.atomic():
+            self.gbt.location = Point(-79.0, 38.0)
+            self.gbt.save()
+            # The transaction that made the change sees it...
+            self.assertEqual(get_gbt_location().coords, (-79.0, 38.0))
+            transaction.set_rollback(True)
+
+        # ...but it never reaches the shared cache, and is forgotten on rollback
+        with self.assertNumQueries(0):
+            self.assertEqual(get_gbt_location().coords, (-79.84, 38.43))
@@ -0,0 +1,91 @@
+import csv
+import os
+from tempfile import TemporaryDirectory
+
+from django.test import SimpleTestCase
+
+from importers.excel import strip_utils
+from importers.excel.strip_excel_non_data import filter_rows, strip_excel_file
+
+RAGGED_CSV = [
+    "Case,Site,Freq,Lat,Long\r\n",
+    "1001,1,1900,38 25 59.8,79 50 23.1\r\n",
+    "Note: site 2 was withdrawn\r\n",
+    "1001,3,700,38 25 59.8\r\n",
+    "\r\n",
+]
+
+TITLED_CSV = [
+    "Application data\r\n",
+    *RAGGED_CSV,
+]
+
+
+class FilterRowsTest(SimpleTestCase):
+    def test_ragged_rows(self):
+        rows = [
+            ["Case", "Site", "Freq", "Lat", "Long"],
+            ["1001", "1", "1900", "38 25 59.8", "79 50 23.1"],
+            # Only 2/5 cells are populated, once padded
+            ["1001", "2"],
+            ["1001", "3", "700", "38 25 59.8"],
+            [],
+        ]
+        stats = {}
+        self.assertEqual(
+            list(filter_rows(rows, threshold=0.5, stats=stats)),
+            [
+                ["Case", "Site", "Freq", "Lat", "Long", "Original Row"],
+                ["1001", "1", "1900", "38 25 59.8", "79 50 23.1", 2],
+                ["1001", "3", "700", "38 25 59.8", None, 4],
+            ],
+        )
+        self.assertEqual(stats, {"num_rows": 5, "num_rows_deleted": 2})
+
+    def strip_csv(self, lines):
+        with TemporaryDirectory() as input_dir, TemporaryDirectory() as output_dir:
+            input_path = os.path.join(input_dir, "ragged.csv")
+            with open(input_path, "w", newline="") as file:
+                file.writelines(lines)
+
+            output_path = strip_excel_file(input_path, output_dir, threshold=0.5)
+            with open(output_path, newline="") as file:
+                return list(csv.reader(file))
+
+    def test_strip_ragged_csv(self):
+        rows = self.strip_csv(RAGGED_CSV)
+        self.assertEqual(
+            rows,
+            [
+                ["Case", "Site", "Freq", "Lat", "Long", "Original Row"],
+                ["1001", "1", "1900", "38 25 59.8", "79 50 23.1", "2"],
+                ["1001", "3", "700", "38 25 59.8", "", "4"],
+            ],
+        )
+        # Every output row has the same width
+        self.assertEqual({len(row) for row in rows}, {6})
+
+    def test_strip_csv_with_title(self):
+        # The title line is padded to the full width of the file, and so isn't
+        # taken to be the header
+        self.assertEqual(
+            self.strip_csv(TITLED_CSV),
+            [
+                ["Case", "Site", "Freq", "Lat", "Long", "Original Row"],
+                ["1001", "1", "1900", "38 25 59.8", "79 50 23.1", "3"],
+                ["1001", "3", "700", "38 25 59.8", "", "5"],
+            ],
+        )
+
+
+class SaveBookTest(SimpleTestCase):
+    def test_failure_leaves_no_output(self):
+        def rows():
+            yield ["Case", "Site"]
+            raise ValueError("Unreadable row")
+
+        with TemporaryDirectory() as output_dir:
+            output_path = os.path.join(output_dir, "output.csv")
+            with self.assertRaises(ValueError):
+                strip_utils.save_book([("Sheet", rows())], output_path)
+            self.assertEqual(os.listdir(output_dir), [])
@@ -1,3 +1,4 @@
+from abc import ABC, abstractmethod
 from datetime import date
 import tempfile
 from docx.opc.exceptions import PackageNotFoundError
@@ -9,9 +10,16 @@ from django.contrib.contenttypes.models import ContentType
 from django.db import transaction
 from django.db.models import Q, Count, Exists, OuterRef, Sum
 from django.db.utils import IntegrityError
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    HttpResponseRedirect,
+    QueryDict,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils.timezone import now
 from django.views.generic import FormView, CreateView, TemplateView
 from django.views.generic.detail import DetailView
 from django.views.generic.list import ListView
@@ -25,6 +33,7 @@ from watson import search as watson
 
 from audits.filters import FileImporterFilter, ModelImportAttemptFilter
 from audits.tables import FileImporterSummaryTable, ModelImportAttemptFailureTable
+from jobs.models import Job
 from utils.coord_utils import coords_to_string
 from utils.numrange import get_str_from_nums
 from utils.merge_people import find_similar_people, merge_people
@@ -73,12 +82,14 @@ from .tables import (
     SearchEntryTable,
     StructureTable,
 )
+from .export import StreamingTableExport
 from .kml import (
+    KML_CONTENT_TYPE,
     facility_as_kml,
-    facilities_as_kml,
     case_as_kml,
-    cases_as_kml,
     kml_to_string,
+    stream_cases_as_kml,
+    stream_facilities_as_kml,
 )
 
 
@@ -94,6 +105,7 @@ def get_fields_missing_from_info_tables(context, all_model_fields):
 
 
 class FilterTableView(ExportMixin, SingleTableMixin, FilterView):
+    export_class = StreamingTableExport
     table_class = None
     filterset_class = None
     object_list = None
@@ -109,17 +121,65 @@ class FilterTableView(ExportMixin, SingleTableMixin, FilterView):
                 reverse(f"{self.table_class.Meta.model.__name__.lower()}_index")
             )
 
-        if "xls" in request.GET.get("_export", ""):
+        export_value = request.GET.get("_export", "")
+        if "xls" in export_value or "csv" in export_value:
             self.export_requested = True
-            # Change the value to xls so that django-tables2 understands the
-            # export request
+            # Change the value to a bare format so that django-tables2 understands
+            # the export request
             request.GET = request.GET.copy()
-            request.GET["_export"] = "xls"
+            request.GET["_export"] = "csv" if "csv" in export_value else "xlsx"
         else:
             self.export_requested = False
 
         return super().get(request, *args, **kwargs)
 
+    @classmethod
+    def from_query(cls, query, user):
+        """Reconstruct this view, as it would be for a GET with the given query string
+
+        This is for Jobs, which need to rebuild the filtered queryset and table
+        outside of the original request
+        """
+        request = HttpRequest()
+        request.method = "GET"
+        request.GET = QueryDict(query)
+        request.user = user
+        view = cls()
+        view.setup(request)
+        view.export_requested = "_export" in request.GET
+        view.object_list = view.get_filterset(view.get_filterset_class()).qs
+        return view
+
+    def enqueue_job(self, name, description, **kwargs):
+        """Enqueue a Job to do the given task for the current query, and redirect to it"""
+        job = Job.objects.enqueue(
+            name,
+            created_by=self.request.user,
+            description=description,
+            view=f"{type(self).__module__}.{type(self).__name__}",
+            query=self.request.GET.urlencode(),
+            **kwargs,
+        )
+        messages.info(
+            self.request,
+            f"{description} has been queued. It will be available for download "
+            "from this page once it is done",
+        )
+        return HttpResponseRedirect(job.get_absolute_url())
+
+    def create_export(self, export_format):
+        # Large exports take longer than a web worker is allowed to, so do them
+        # via a Job instead
+        num_rows = self.object_list.count()
+        if num_rows > settings.JOBS_EXPORT_THRESHOLD:
+            verbose_name_plural = self.table_class.Meta.model._meta.verbose_name_plural
+            return self.enqueue_job(
+                "cases.export_table",
+                f"Export of {num_rows} {verbose_name_plural} as .{export_format}",
+                export_format=export_format,
+            )
+        return super().create_export(export_format)
+
     def get_queryset(self):
         return self.table_class.Meta.model.objects.all()
 
@@ -170,6 +230,37 @@ class FilterTableView(ExportMixin, SingleTableMixin, FilterView):
         return super().render_to_response(context, **response_kwargs)
 
 
+class KmlExportMixin(ABC):
+    """Adds a KML export of the Facilities matching the filter (via `?kml`)
+
+    Large exports are done via a Job (see cases.tasks.export_kml)
+    """
+
+    kml_filename = None
+
+    @abstractmethod
+    def get_kml_facilities(self):
+        """Return the Facilities to export, in the order they should be exported"""
+
+    @abstractmethod
+    def stream_kml(self, facilities):
+        """Yield the KML document containing the given Facilities, in chunks"""
+
+    def kml_response(self):
+        facilities = self.get_kml_facilities()
+        num_facilities = facilities.count()
+        if num_facilities > settings.JOBS_EXPORT_THRESHOLD:
+            return self.enqueue_job(
+                "cases.export_kml", f"Export of {num_facilities} Facilities as KML"
+            )
+
+        response = StreamingHttpResponse(
+            self.stream_kml(facilities), content_type=KML_CONTENT_TYPE
+        )
+        response["Content-Disposition"] = f'application; filename="{self.kml_filename}"'
+        return response
+
+
 class CaseGroupDetailView(MultiTableMixin, DetailView):
     model = CaseGroup
     tables = [CaseTable, PreliminaryCaseTable]
@@ -221,15 +312,16 @@ class PreliminaryCaseListView(FilterTableView):
     template_name = "cases/prelim_case_list.html"
 
 
-class CaseListView(FilterTableView):
+class CaseListView(KmlExportMixin, FilterTableView):
     table_class = CaseTable
     export_table_class = CaseExportTable
     filterset_class = CaseFilter
     template_name = "cases/case_list.html"
+    kml_filename = "nrqz_apps.kml"
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        queryset = Case.objects.annotate_stuff(queryset)
+        queryset = Case.objects.annotate_status_summary(queryset)
         return queryset
 
     def get(self, request, *args, **kwargs):
@@ -238,19 +330,27 @@ class CaseListView(FilterTableView):
             return HttpResponseRedirect(reverse("case_detail", args=[case_id]))
 
         elif "kml" in request.GET:
-            # TODO: Must be a cleaner way to do this
-            qs = self.get_filterset(self.filterset_class).qs
-            response = HttpResponse(
-                kml_to_string(
-                    cases_as_kml(qs.filter(facilities__location__isnull=False).all())
-                ),
-                content_type="application/vnd.google-earth.kml+xml.",
-            )
-            response["Content-Disposition"] = 'application; filename="nrqz_apps.kml"'
-            return response
+            return self.kml_response()
         else:
             return super(CaseListView, self).get(request, *args, **kwargs)
 
+    def get_kml_facilities(self):
+        # TODO: Must be a cleaner way to do this
+        qs = self.get_filterset(self.filterset_class).qs
+        return Facility.objects.filter(
+            case__in=qs.values("id"), location__isnull=False
+        ).order_by("case__case_num", "id")
+
+    def stream_kml(self, facilities):
+        # Stream the Facilities of all matching Cases via a single query,
+        # grouped into a Folder per Case
+        facility_rows = (
+            facilities.annotate_kml()
+            .values_list("case__case_num", "nrqz_id", "kml")
+            .iterator()
+        )
+        return stream_cases_as_kml(facility_rows)
+
 
 class PreliminaryFacilityListView(FilterTableView):
     table_class = PreliminaryFacilityTable
@@ -258,44 +358,29 @@ class PreliminaryFacilityListView(FilterTableView):
     export_table_class = PreliminaryFacilityExportTable
     template_name = "cases/prelim_facility_list.html"
 
-    def get_queryset(self):
-        return (
-            PreliminaryFacility.objects.annotate_in_nrqz()
-            .annotate_azimuth_to_gbt()
-            .annotate_distance_to_gbt()
-        )
 
-
-class FacilityListView(FilterTableView):
+class FacilityListView(KmlExportMixin, FilterTableView):
     table_class = FacilityTable
     filterset_class = FacilityFilter
     export_table_class = FacilityExportTable
     template_name = "cases/facility_list.html"
-
-    def get_queryset(self):
-        return (
-            Facility.objects.annotate_in_nrqz()
-            .annotate_azimuth_to_gbt()
-            .annotate_distance_to_gbt()
-        )
+    kml_filename = "nrqz_facilities.kml"
 
     def get(self, request, *args, **kwargs):
         if "kml" in request.GET:
-            # TODO: Must be a cleaner way to do this
-            qs = self.get_filterset(self.filterset_class).qs
-            response = HttpResponse(
-                kml_to_string(
-                    facilities_as_kml(qs.filter(location__isnull=False).all())
-                ),
-                content_type="application/vnd.google-earth.kml+xml.",
-            )
-            response[
-                "Content-Disposition"
-            ] = 'application; filename="nrqz_facilities.kml"'
-            return response
+            return self.kml_response()
         else:
             return super(FacilityListView, self).get(request, *args, **kwargs)
 
+    def get_kml_facilities(self):
+        # TODO: Must be a cleaner way to do this
+        qs = self.get_filterset(self.filterset_class).qs
+        return qs.filter(location__isnull=False)
+
+    def stream_kml(self, facilities):
+        facility_rows = facilities.annotate_kml().values_list("nrqz_id", "kml")
+        return stream_facilities_as_kml(facility_rows.iterator())
+
 
 class LetterView(FormView):
     form_class = LetterTemplateForm
@@ -336,7 +421,7 @@ class LetterView(FormView):
         )
 
         letter_context = {
-            "case": derived_cases.first(),
+            "case": Case.objects.annotate_rollup(derived_cases).first(),
             "facilities": derived_facilities,
             "nrao_unapproved_facilities": derived_facilities.filter(
                 meets_erpd_limit=False
@@ -428,7 +513,7 @@ class PreliminaryCaseDetailView(MultiTableMixin, DetailView):
         ).qs
         case_filter_qs = CaseFilter(
             self.request.GET,
-            queryset=self.object.related_cases,
+            queryset=Case.objects.annotate_status_summary(self.object.related_cases),
             form_helper_kwargs={"form_class": "collapse"},
         ).qs
         return [
@@ -461,10 +546,14 @@ class CaseDetailView(MultiTableMixin, DetailView):
     ]
     table_pagination = {"per_page": 10}
 
+    def get_queryset(self):
+        # Fetch the Facility rollup along with the Case itself
+        return Case.objects.annotate_rollup()
+
     def get_tables_data(self):
         facility_filter_qs = FacilityFilter(
             self.request.GET,
-            queryset=self.object.facilities.all().annotate_azimuth_to_gbt(),
+            queryset=self.object.facilities.all(),
             form_helper_kwargs={"form_class": "collapse"},
         ).qs
 
@@ -476,7 +565,7 @@ class CaseDetailView(MultiTableMixin, DetailView):
 
         case_filter_qs = CaseFilter(
             self.request.GET,
-            queryset=self.object.related_cases,
+            queryset=Case.objects.annotate_status_summary(self.object.related_cases),
             form_helper_kwargs={"form_class": "collapse"},
         ).qs
 
@@ -605,7 +694,7 @@ class BaseFacilityDetailView(DetailView):
             "survey_2c",
             (
                 "Inside NRQZ?",
-                self.object.get_in_nrqz(),
+                self.object.in_nrqz,
                 "Indicates whether the facility is inside the boundaries of the NRQZ",
             ),
         ]
@@ -629,8 +718,8 @@ class BaseFacilityDetailView(DetailView):
             "height_of_first_obstacle",
             (
                 "Azimuth Bearing (derived)",
-                f"{self.object.get_azimuth_to_gbt():.3f}°"
-                if self.object.location
+                f"{self.object.azimuth_to_gbt:.3f}°"
+                if self.object.azimuth_to_gbt is not None
                 else None,
                 "Azimuth bearing to GBT in degrees",
             ),
@@ -661,8 +750,8 @@ class PreliminaryFacilityDetailView(BaseFacilityDetailView):
             "antenna_model_number",
             (
                 "Azimuth Bearing (derived)",
-                f"{self.object.get_azimuth_to_gbt():.3f}°"
-                if self.object.location
+                f"{self.object.azimuth_to_gbt:.3f}°"
+                if self.object.azimuth_to_gbt is not None
                 else None,
                 "Azimuth bearing to GBT in degrees",
             ),
@@ -753,13 +842,14 @@ class AttachmentListView(FilterTableView):
 
     def post(self, request, *args, **kwargs):
         if request.POST.get("refresh_from_filesystem", None):
-            report = self.table_class.Meta.model.objects.all().refresh_from_filesystem()
-            report_counts = {key: len(values) for key, values in report.items()}
-            messages.success(
-                request,
-                f"Successfully refreshed all attachments from filesystem: {report_counts}",
+            # Far too slow to do within a request; see cases.tasks.refresh_attachments
+            job = Job.objects.enqueue(
+                "cases.refresh_attachments",
+                created_by=request.user,
+                description="Refresh all Attachments from filesystem",
             )
-            return HttpResponseRedirect(reverse("attachment_index"))
+            messages.info(request, f"{job} has been queued")
+            return HttpResponseRedirect(job.get_absolute_url())
 
         return super().post(request, *args, **kwargs)
 
@@ -799,14 +889,20 @@ class AttachmentDetailView(MultiTableMixin, DetailView):
 
     def get_object(self, *args, **kwargs):
         instance = super().get_object(*args, **kwargs)
-        # Refresh the file info from disk
-        status = instance.refresh_from_filesystem()
-        if status == "changed":
-            messages.warning(
-                self.request,
-                "Attachment contents have changed since last checked! Stored "
-                "hash has been updated",
-            )
+        # Check the file for changes (via stat) if it's due. If it has changed, it's
+        # re-hashed in the background rather than making this request wait
+        if instance.refresh_is_due():
+            if instance.file_has_changed():
+                Attachment.objects.enqueue_refresh(
+                    [instance], created_by=self.request.user
+                )
+                messages.warning(
+                    self.request,
+                    "Attachment contents have changed since last checked! Stored "
+                    "hash is being updated",
+                )
+            else:
+                Attachment.objects.filter(id=instance.id).update(stat_checked_on=now())
         return instance
 
 
@@ -1086,12 +1182,17 @@ class AttachmentDashboard(SingleTableMixin, TemplateView):
         num_attachments_to_affect = attachments_to_affect.count()
         if num_attachments_to_affect:
             if request.POST.get("submit_refresh", None):
-                report = attachments_to_affect.refresh_from_filesystem()
-                report_counts = {key: len(values) for key, values in report.items()}
-                messages.success(
-                    request,
-                    f"Successfully refreshed {num_attachments_to_affect} attachments from filesystem: {report_counts}",
+                job = Job.objects.enqueue(
+                    "cases.refresh_attachments",
+                    created_by=request.user,
+                    description=f"Refresh {num_attachments_to_affect} Attachments "
+                    "from filesystem",
+                    attachment_ids=list(
+                        attachments_to_affect.values_list("id", flat=True)
+                    ),
                 )
+                messages.info(request, f"{job} has been queued")
+                return HttpResponseRedirect(job.get_absolute_url())
             elif request.POST.get("submit_deactivate", None):
                 # Get count here, since QS will be empty soon
                 # Convert to string here, since this QS will be empty soon. We rely
@@ -1158,21 +1259,22 @@ class LetterHtmlView(TemplateView):
             cases.values_list("case_num", flat=True).order_by("case_num")
         )
         context["generation_date"] = date.today().strftime("%B %d, %Y")
+        # Roll up the approvals of each site in a single grouped query. Each site's
+        # approval covers every Facility of its case number, site, and location
         cases_rows = list(
-            derived_facilities.values(
-                "case__case_num",
-                "site_name",
-                "location_description",
-            ).distinct()
+            Facility.objects.filter(case__case_num__in=cases.values("case_num"))
+            .values("case__case_num", "site_name", "location_description")
+            .annotate(
+                num_facilities=Count("id"),
+                num_nrao_approved=Count("id", filter=Q(meets_erpd_limit=True)),
+                num_sgrs_approved=Count("id", filter=Q(sgrs_approval=True)),
+            )
+            .order_by("case__case_num", "site_name")
         )
         for row in cases_rows:
-            _facilities = Facility.objects.filter(**row)
-            row["is_approved_by_nrao"] = (
-                _facilities.filter(meets_erpd_limit=True).count() == _facilities.count()
-            )
-            row["is_approved_by_sgrs"] = (
-                _facilities.filter(sgrs_approval=True).count() == _facilities.count()
-            )
+            num_facilities = row.pop("num_facilities")
+            row["is_approved_by_nrao"] = row.pop("num_nrao_approved") == num_facilities
+            row["is_approved_by_sgrs"] = row.pop("num_sgrs_approved") == num_facilities
         context["cases_table"] = LetterCaseTable(data=cases_rows)
         context["facilities_table"] = LetterFacilityTable(data=derived_facilities)
         return context
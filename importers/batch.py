@@ -0,0 +1,116 @@
+"""Import-lifetime batches of writes that don't need to happen row by row
+
+Every row of an Excel file links its Facility to its Attachments, and (usually)
+sets the Facility's propagation study. Done as each row is handled, that is an M2M
+add() and an UPDATE per row. Within an import_batch() block (which the import
+commands that set BATCH_WRITES enter; see cases/management/commands/_base_import.py)
+these are instead collected by add_m2m() and update(), and written when the block
+exits: an UPDATE per batch of instances (via bulk_update()) and a single INSERT of
+the M2M links of the whole import (via bulk_create()).
+
+The instances are still created row by row, via FormMap.save_with_audit(), since
+that is what records each row's ModelImportAttempt (which every imported model
+refers to). Rows can be rolled back after their writes are collected (e.g. a
+failed record's savepoint), so the writes of any instances that no longer exist
+by the time the block exits are dropped.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+
+# The ImportBatch of the active import_batch() block, if any
+_batch = None
+
+
+class ImportBatch:
+    """Writes collected during an import, to be done in bulk by flush()"""
+
+    def __init__(self):
+        # Maps (model, field_names) to {pk: instance}, for bulk_update()
+        self._updates = defaultdict(dict)
+        # Maps (model, M2M field name) to {(source pk, target pk)}, for bulk_create()
+        self._links = defaultdict(set)
+
+    def update(self, instance, field_names):
+        self._updates[(type(instance), tuple(field_names))][instance.pk] = instance
+
+    def add_m2m(self, instance, field_name, targets):
+        self._links[(type(instance), field_name)].update(
+            (instance.pk, target.pk) for target in targets
+        )
+
+    def flush(self):
+        for (model, field_names), instances in self._updates.items():
+            existing = _get_existing_pks(model, instances)
+            model.objects.bulk_update(
+                [instance for pk, instance in instances.items() if pk in existing],
+                field_names,
+            )
+
+        for (model, field_name), links in self._links.items():
+            field = model._meta.get_field(field_name)
+            through = field.remote_field.through
+            source_field_name = field.m2m_field_name()
+            target_field_name = field.m2m_reverse_field_name()
+            existing_sources = _get_existing_pks(model, {pk for pk, __ in links})
+            existing_targets = _get_existing_pks(
+                field.remote_field.model, {pk for __, pk in links}
+            )
+            # Like add(), links that already exist are left as they are
+            through.objects.bulk_create(
+                [
+                    through(
+                        **{
+                            f"{source_field_name}_id": source,
+                            f"{target_field_name}_id": target,
+                        }
+                    )
+                    for source, target in links
+                    if source in existing_sources and target in existing_targets
+                ],
+                ignore_conflicts=True,
+            )
+
+        self._updates.clear()
+        self._links.clear()
+
+
+def _get_existing_pks(model, pks):
+    return set(model.objects.filter(pk__in=list(pks)).values_list("pk", flat=True))
+
+
+@contextmanager
+def import_batch():
+    """Collect the writes given to update() and add_m2m() within the block
+
+    They are flushed when the block exits, or discarded if it raises. Nested blocks
+    share the outermost block's batch
+    """
+    global _batch
+    if _batch is not None:
+        yield _batch
+        return
+
+    _batch = ImportBatch()
+    try:
+        yield _batch
+        _batch.flush()
+    finally:
+        _batch = None
+
+
+def update(instance, field_names):
+    """Save the given fields of `instance`, once the import_batch() (if any) exits"""
+    if _batch is None:
+        instance.save(update_fields=field_names)
+    else:
+        _batch.update(instance, field_names)
+
+
+def add_m2m(instance, field_name, targets):
+    """Add `targets` to the M2M field of `instance`, once the import_batch() (if
+    any) exits"""
+    if _batch is None:
+        getattr(instance, field_name).add(*targets)
+    else:
+        _batch.add_m2m(instance, field_name, targets)
@@ -3,9 +3,19 @@
 These are responsible for taking a field value from an external
 source and converting/validating it in some way in order to
 make it compatible with a database field
+
+Converters are called on every cell of every row, so the values that they
+compare against are precomputed, and their regexes precompiled. Converters that
+do real work (e.g. regexes, float parsing) on a single raw value, and return an
+immutable result, are also @memoized: within a converter_cache() block (which
+each import command enters; see cases/management/commands/_base_import.py),
+repeated raw values (e.g. the same coordinates across every sector of a site)
+are only converted once.
 """
 
+from contextlib import contextmanager
 from datetime import datetime, date
+from functools import lru_cache, wraps
 import re
 
 import pytz
@@ -16,6 +26,7 @@ from django.contrib.gis.geos import Point
 from utils.coord_utils import dms_to_dd
 from utils.constants import NAD27_SRID, NAD83_SRID
 from .constants import MIN_VALID_CASE_NUMBER, MAX_VALID_CASE_NUMBER
+from .lookups import lookup
 
 ARRAY_DELIMITER_REGEX = re.compile("[,/]")
 
@@ -33,6 +44,79 @@ COORD_PATTERN = re.compile(COORD_PATTERN_STR)
 CASE_REGEX_STR = r"^P?(?P<case_num>(?P<date>\d+)[a-zA-Z]{,2}).*"
 CASE_REGEX = re.compile(CASE_REGEX_STR)
 MDY_REGEX = re.compile(r"(?P<month>\d{1,2})[/\\](?P<day>\d{1,2})[/\\](?P<year>\d{1,4})")
+NON_DECIMAL_REGEX = re.compile(r"[^0-9\.]")
+NON_DIGIT_REGEX = re.compile(r"[^0-9]")
+
+NONE_STR_VALUES = ("", "None", "#N/A", "Not provided", "N/A", "NA")
+ACCESS_NONE_STR_VALUES = ("0", "")
+TRUE_STR_VALUES = frozenset(["yes", "1", "true", "t"])
+FALSE_STR_VALUES = frozenset(["no", "n0", "0", "false", "f"])
+BOOL_NONE_STR_VALUES = frozenset(["", "na", "n/a", "none"])
+STR_NONE_STR_VALUES = frozenset(["", "na", "n/a", "#n/a", "'#n/a'"])
+FLOAT_NONE_STR_VALUES = frozenset(["", "na", "n/a", "no", "#n/a"])
+FLOAT_WORDS = {"quad": 4, "hex": 6, "deca": 10}
+COORD_NONE_STR_VALUES = frozenset(["", "none", "#n/a", "none provided"])
+
+# The maximum number of distinct raw values remembered per converter by
+# converter_cache()
+CONVERTER_CACHE_SIZE = 4096
+
+# Maps each @memoized converter to its LRU cache, while converter_cache() is active
+_converter_caches = None
+_converter_cache_size = CONVERTER_CACHE_SIZE
+
+
+@contextmanager
+def converter_cache(maxsize=CONVERTER_CACHE_SIZE):
+    """Memoize every @memoized converter for the duration of the block
+
+    Each gets its own LRU cache of up to `maxsize` values, which is discarded when
+    the block exits (so that nothing is remembered from one import to the next).
+    Nested blocks share the outermost block's caches
+    """
+    global _converter_caches, _converter_cache_size
+    if _converter_caches is not None:
+        yield
+        return
+
+    _converter_caches = {}
+    _converter_cache_size = maxsize
+    try:
+        yield
+    finally:
+        _converter_caches = None
+
+
+def memoized(converter):
+    """Decorate a converter of a single value so that it is memoized within
+    converter_cache()
+
+    Only use this on converters whose result depends only on the value, and is
+    immutable (since it is shared between every conversion of the same value).
+    Values of different types are cached separately (so e.g. 1 and True don't
+    collide). Errors aren't cached, and unhashable values bypass the cache.
+
+    This adds a little overhead to every call, so it is only worthwhile for
+    converters that do more than a set lookup or two
+    """
+
+    @wraps(converter)
+    def wrapper(value):
+        if _converter_caches is None:
+            return converter(value)
+        try:
+            hash(value)
+        except TypeError:
+            return converter(value)
+        try:
+            cached_converter = _converter_caches[converter]
+        except KeyError:
+            cached_converter = _converter_caches[converter] = lru_cache(
+                maxsize=_converter_cache_size, typed=True
+            )(converter)
+        return cached_converter(value)
+
+    return wrapper
 
 
 def convert_nrqz_id_to_case_num(nrqz_id):
@@ -61,6 +145,7 @@ def convert_nrqz_id_to_case_num(nrqz_id):
     return {"case_num": case_num, "date_received": date_received}
 
 
+@memoized
 def coerce_feet_to_meters(value):
     feet = coerce_positive_float(value)
     if feet is None:
@@ -99,17 +184,20 @@ def coerce_scientific_notation(value):
         ipdb.set_trace()
 
 
-def coerce_none(
-    value, none_str_values=("", "None", "#N/A", "Not provided", "N/A", "NA")
-):
+@lru_cache(maxsize=None)
+def _lowercase_set(values):
+    return frozenset(value.lower() for value in values)
+
+
+def coerce_none(value, none_str_values=NONE_STR_VALUES):
     clean = str(value).strip().lower()
-    if clean in [v.lower() for v in none_str_values]:
+    if clean in _lowercase_set(tuple(none_str_values)):
         return None
     return value
 
 
 def coerce_access_none(value):
-    return coerce_none(value, none_str_values=["0", ""])
+    return coerce_none(value, none_str_values=ACCESS_NONE_STR_VALUES)
 
 
 def coerce_coord_from_number(value):
@@ -165,6 +253,7 @@ def coerce_coord_from_number(value):
     return dms_to_dd(decimal, minutes, seconds)
 
 
+@memoized
 def convert_mdy_datetime(value):
     # Strip all whitespace
     clean_value = "".join(str(value).split())
@@ -177,6 +266,7 @@ def convert_mdy_datetime(value):
     return date(int(m["year"]), int(m["month"]), int(m["day"]))
 
 
+@memoized
 def convert_access_datetime(value):
     if value == "":
         return None
@@ -185,6 +275,7 @@ def convert_access_datetime(value):
     return datetime(int(year), int(month), int(day), tzinfo=pytz.utc)
 
 
+@memoized
 def coerce_positive_int(value):
     num = coerce_float(value)
     if num is None:
@@ -195,6 +286,7 @@ def coerce_positive_int(value):
     return int(num)
 
 
+@memoized
 def coerce_positive_float(value):
     num = coerce_float(value)
     if num is None:
@@ -204,6 +296,7 @@ def coerce_positive_float(value):
     return num
 
 
+@memoized
 def convert_case_num(value):
     case_num = coerce_positive_int(value)
     if case_num is None:
@@ -228,11 +321,11 @@ def coerce_bool(value):
     """Coerce a string to a bool, or to None"""
 
     clean_value = str(value).strip().lower()
-    if clean_value in ["yes", "1", "true", "t"]:
+    if clean_value in TRUE_STR_VALUES:
         return True
-    elif clean_value in ["no", "n0", "0", "false", "f"]:
+    elif clean_value in FALSE_STR_VALUES:
         return False
-    elif clean_value in ["", "na", "n/a", "none"]:
+    elif clean_value in BOOL_NONE_STR_VALUES:
         return None
     else:
         raise ValueError("Could not determine truthiness of value {!r}".format(value))
@@ -240,27 +333,24 @@ def coerce_bool(value):
 
 def coerce_str(value):
     clean_value = str(value).strip().lower()
-    if clean_value in ["", "na", "n/a", "#n/a", "'#n/a'"]:
+    if clean_value in STR_NONE_STR_VALUES:
         return None
     else:
         return value
 
 
+@memoized
 def coerce_float(value):
     """Coerce a string to a number, or to None"""
 
     clean_value = str(value).strip().lower()
-    if clean_value in ["", "na", "n/a", "no", "#n/a"]:
+    if clean_value in FLOAT_NONE_STR_VALUES:
         return None
 
-    if clean_value == "quad":
-        clean_value = 4
-    elif clean_value == "hex":
-        clean_value = 6
-    elif clean_value == "deca":
-        clean_value = 10
-    else:
-        clean_value = re.sub(r"[^0-9\.]", "", clean_value)
+    if clean_value in FLOAT_WORDS:
+        return float(FLOAT_WORDS[clean_value])
+
+    clean_value = NON_DECIMAL_REGEX.sub("", clean_value)
 
     # If the string is empty after stripping non-decimal characters out,
     # treat it as None
@@ -270,17 +360,18 @@ def coerce_float(value):
     return float(clean_value)
 
 
+@memoized
 def coerce_coords(value):
     """Given a coordinate in DD MM SS.sss format, return it in DD.ddd format"""
     clean_value = str(value).strip().lower()
 
-    if clean_value in ["", "none", "#n/a", "none provided"]:
+    if clean_value in COORD_NONE_STR_VALUES:
         return None
 
     try:
         dd = float(value)
     except ValueError:
-        match = re.match(COORD_PATTERN, clean_value)
+        match = COORD_PATTERN.match(clean_value)
         if not match:
             raise ValueError(f"Regex {COORD_PATTERN_STR} did not match value {value!r}")
 
@@ -393,7 +484,7 @@ def convert_access_attachment(**kwargs):
     # Pull out the actual path value from the
     clean_path = convert_access_path(path)
     # Strip all non-number characters, leaving only the number
-    letter_number = re.sub("[^0-9]", "", letter_name)
+    letter_number = NON_DIGIT_REGEX.sub("", letter_name)
 
     return {"file_path": clean_path, "original_index": letter_number}
 
@@ -408,9 +499,12 @@ def coerce_access_location(latitude, longitude, nad27=None, nad83=None):
         srid = NAD27_SRID
     else:
         srid = NAD83_SRID
+    srs = lookup(PostGISSpatialRefSys, "srid").get(srid)
+    if srs is None:
+        raise PostGISSpatialRefSys.DoesNotExist(f"No SRS with SRID {srid}!")
     return {
         "location": coerce_location(latitude, longitude, srid=srid),
-        "original_srs": PostGISSpatialRefSys.objects.get(srid=srid).pk,
+        "original_srs": srs.pk,
     }
 
 
@@ -41,20 +41,42 @@ IGNORED_HEADERS = [
     "Lon1 (-dd.dd)W",
 ]
 
+# The headers that the Case and Attachment form maps read from. These are also
+# read directly (i.e. without rendering the form maps) to prefetch the Cases and
+# Attachments of a whole file
+NRQZ_ID_HEADERS = [
+    "NRQZ ID (to be assigned by NRAO)",
+    "NRQZ ID",
+    "NRQZ ID     (Assigned by NRAO. Do not put any of your data in this column.)",
+    "NRQZ ID (to be assigned byRAO)",
+]
+SGRS_APPROVAL_HEADERS = ["SGRS Approval", "SG Approval", "SGRS approval"]
+SI_ENGINEERING_HEADERS = [
+    "SI Worksheet",
+    "SI Engineering",
+    "FEW",
+    "FEW Engineering Worksheet",
+    "FEW - Final Engineering Worksheet",
+    "GBO SI Worksheet",
+    "NRAO SI Worksheet",
+    "SI Inspection Worksheet",
+]
+LOC_HEADERS = ["LOC", "NRAO LOC"]
+TAP_FILE_HEADERS = ["TAP file", "TAP File", "Propagation Study"]
+ATTACHMENT_HEADERS = [
+    *LOC_HEADERS,
+    *SGRS_APPROVAL_HEADERS,
+    *SI_ENGINEERING_HEADERS,
+    *TAP_FILE_HEADERS,
+]
+
 
 class CaseImportFormMap(FormMap):
     field_maps = [
         OneToManyFieldMap(
             to_fields=("case_num", "date_received"),
             converter=convert_nrqz_id_to_case_num,
-            from_field={
-                "nrqz_id": [
-                    "NRQZ ID (to be assigned by NRAO)",
-                    "NRQZ ID",
-                    "NRQZ ID     (Assigned by NRAO. Do not put any of your data in this column.)",
-                    "NRQZ ID (to be assigned byRAO)",
-                ]
-            },
+            from_field={"nrqz_id": NRQZ_ID_HEADERS},
         )
     ]
     form_class = CaseImportForm
@@ -444,7 +466,7 @@ class SgrsApprovalAttachmentImportFormMap(FormMap):
         OneToOneFieldMap(
             to_field="file_path",
             converter=convert_excel_path,
-            from_field={"path": ["SGRS Approval", "SG Approval", "SGRS approval"]},
+            from_field={"path": SGRS_APPROVAL_HEADERS},
         )
     ]
     form_class = AttachmentImportForm
@@ -459,18 +481,7 @@ class SiEngineeringAttachmentImportFormMap(FormMap):
         OneToOneFieldMap(
             to_field="file_path",
             converter=convert_excel_path,
-            from_field={
-                "path": [
-                    "SI Worksheet",
-                    "SI Engineering",
-                    "FEW",
-                    "FEW Engineering Worksheet",
-                    "FEW - Final Engineering Worksheet",
-                    "GBO SI Worksheet",
-                    "NRAO SI Worksheet",
-                    "SI Inspection Worksheet",
-                ]
-            },
+            from_field={"path": SI_ENGINEERING_HEADERS},
         )
     ]
     form_class = AttachmentImportForm
@@ -485,7 +496,7 @@ class LocAttachmentImportFormMap(FormMap):
         OneToOneFieldMap(
             to_field="file_path",
             converter=convert_excel_path,
-            from_field={"path": ["LOC", "NRAO LOC"]},
+            from_field={"path": LOC_HEADERS},
         )
     ]
     form_class = AttachmentImportForm
@@ -501,7 +512,7 @@ class TapFileAttachmentImportFormMap(FormMap):
         OneToOneFieldMap(
             to_field="file_path",
             converter=convert_excel_path,
-            from_field={"path": ["TAP file", "TAP File", "Propagation Study"]},
+            from_field={"path": TAP_FILE_HEADERS},
         )
     ]
     form_class = AttachmentImportForm
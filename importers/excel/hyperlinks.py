@@ -0,0 +1,104 @@
+"""Read the hyperlinks of an Excel sheet directly from the .xlsx package
+
+openpyxl only exposes hyperlinks when a workbook is fully loaded (i.e. not in
+read-only mode), which builds every cell of every sheet in memory. Hyperlinks are
+stored separately from cell values, though: each is a <hyperlink> element (after
+the sheet's data) whose target is stored in the sheet's relationships part. So,
+they can be read by streaming through just those parts of the package
+"""
+
+import posixpath
+from urllib.parse import unquote
+from xml.etree.ElementTree import iterparse
+import zipfile
+
+from openpyxl.utils.cell import get_column_letter, range_boundaries
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PACKAGE_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+HYPERLINK_REL_TYPE = f"{REL_NS}/hyperlink"
+
+
+def _read_rels(archive, rels_path):
+    """Return a dict mapping relationship ID to (type, target) for the given part"""
+    try:
+        file = archive.open(rels_path)
+    except KeyError:
+        return {}
+    with file:
+        return {
+            rel.get("Id"): (rel.get("Type"), rel.get("Target"))
+            for __, rel in iterparse(file)
+            if rel.tag == f"{{{PACKAGE_REL_NS}}}Relationship"
+        }
+
+
+def _rels_path(part_path):
+    directory, name = posixpath.split(part_path)
+    return posixpath.join(directory, "_rels", f"{name}.rels")
+
+
+def _get_sheet_path(archive, sheet_name):
+    with archive.open("xl/workbook.xml") as file:
+        sheet_rel_id = None
+        for __, element in iterparse(file):
+            if (
+                element.tag == f"{{{MAIN_NS}}}sheet"
+                and element.get("name") == sheet_name
+            ):
+                sheet_rel_id = element.get(f"{{{REL_NS}}}id")
+                break
+    if sheet_rel_id is None:
+        raise KeyError(f"Worksheet {sheet_name} does not exist.")
+
+    __, target = _read_rels(archive, "xl/_rels/workbook.xml.rels")[sheet_rel_id]
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join("xl", target))
+
+
+def read_hyperlinks(path, sheet_name):
+    """Return a dict mapping cell coordinate (e.g. "B2") to hyperlink target
+
+    Targets are unquoted. Hyperlinks to locations within the workbook (which have
+    no target) are ignored. A hyperlink on a range of cells applies to every cell
+    in the range
+    """
+    with zipfile.ZipFile(path) as archive:
+        sheet_path = _get_sheet_path(archive, sheet_name)
+        targets = {
+            rel_id: target
+            for rel_id, (rel_type, target) in _read_rels(
+                archive, _rels_path(sheet_path)
+            ).items()
+            if rel_type == HYPERLINK_REL_TYPE
+        }
+        # Every hyperlink with a target has a relationship, so if there are none
+        # there's no need to scan through the sheet
+        if not targets:
+            return {}
+
+        hyperlinks = {}
+        with archive.open(sheet_path) as file:
+            for __, element in iterparse(file):
+                if element.tag == f"{{{MAIN_NS}}}hyperlink":
+                    target = targets.get(element.get(f"{{{REL_NS}}}id"))
+                    if target:
+                        for coordinate in _expand_ref(element.get("ref")):
+                            hyperlinks[coordinate] = unquote(target)
+                elif element.tag == f"{{{MAIN_NS}}}row":
+                    # Don't keep the cells in memory; they've already been read
+                    element.clear()
+        return hyperlinks
+
+
+def _expand_ref(ref):
+    if ":" not in ref:
+        return [ref]
+    min_col, min_row, max_col, max_row = range_boundaries(ref)
+    return [
+        f"{get_column_letter(col)}{row}"
+        for row in range(min_row, max_row + 1)
+        for col in range(min_col, max_col + 1)
+    ]
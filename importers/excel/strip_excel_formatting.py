@@ -4,27 +4,43 @@ This is done by simply opening the file in pyexcel and re-saving it. This has
 the effect of stripping all formatting, formulas, etc., and leaving only raw data.
 
 This is typically useful if your original Excel files are huge due to
-formatting quirks
+formatting quirks. Only the values are copied, a row at a time, so (for .xlsx
+and .xlsm files) the book is never held in memory; see strip_utils
 """
 
 import argparse
 import os
-import re
 
-import pyexcel
 from tqdm import tqdm
 
-DEFAULT_PATTERN = r".*\.xls.?$"
-
+try:
+    from . import strip_utils
+except ImportError:
+    # Run as a script
+    import strip_utils
 
-def strip_excel_directory(input_path, output_path, pattern=DEFAULT_PATTERN):
-    files = [
-        os.path.join(input_path, file)
-        for file in os.listdir(input_path)
-        if re.search(pattern, file)
-    ]
-    for input_file_path in tqdm(sorted(files), unit="files"):
-        strip_excel_file(input_file_path, output_path)
+DEFAULT_PATTERN = r".*\.xls.?$"
+DEFAULT_JOBS = 1
+
+
+def strip_excel_directory(
+    input_path,
+    output_path,
+    pattern=DEFAULT_PATTERN,
+    overwrite=False,
+    jobs=DEFAULT_JOBS,
+    max_memory=None,
+):
+    files = strip_utils.find_files(input_path, pattern)
+    errors = strip_utils.process_files(
+        strip_excel_file,
+        files,
+        jobs=jobs,
+        max_memory=max_memory,
+        output_path=output_path,
+        overwrite=overwrite,
+    )
+    print(f"Errors: {errors}")
 
 
 def strip_excel_file(input_path, output_path, overwrite=False):
@@ -32,12 +48,11 @@ def strip_excel_file(input_path, output_path, overwrite=False):
 
     output_filename = f"data_only_{os.path.basename(input_path)}".replace(" ", "_")
     full_output_path = os.path.join(output_path, output_filename)
-    if os.path.isfile(full_output_path) and not overwrite:
-        tqdm.write(f"{full_output_path} already exists; skipping")
+    if strip_utils.output_is_up_to_date(input_path, full_output_path, overwrite):
         return False
 
-    book = pyexcel.get_book(file_name=input_path)
-    book.save_as(full_output_path)
+    strip_utils.save_book(strip_utils.iter_book(input_path), full_output_path)
+    strip_utils.record_input_hash(input_path, full_output_path)
     tqdm.write(f"Wrote {full_output_path}")
     return True
 
@@ -64,6 +79,19 @@ def parse_args():
         action="store_true",
         help=("Force overwriting of output files"),
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help="The number of files to process concurrently (each in its own process). "
+        "Used only when a directory is given in path",
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=float,
+        help="The maximum memory (in MB) that each process may use (with --jobs)",
+    )
 
     return parser.parse_args()
 
@@ -71,9 +99,16 @@ def parse_args():
 def main():
     args = parse_args()
     if os.path.isdir(args.input_path):
-        strip_excel_directory(args.input_path, args.output_path, pattern=args.pattern)
+        strip_excel_directory(
+            args.input_path,
+            args.output_path,
+            pattern=args.pattern,
+            overwrite=args.force,
+            jobs=args.jobs,
+            max_memory=args.max_memory,
+        )
     elif os.path.isfile(args.input_path):
-        strip_excel_file(args.input_path, args.output_path)
+        strip_excel_file(args.input_path, args.output_path, overwrite=args.force)
     else:
         raise ValueError(f"Given path {args.input_path!r} is not a directory or file!")
 
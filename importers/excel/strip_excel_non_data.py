@@ -9,25 +9,26 @@ of the row, and T is the threshold (0 - 1) -- then the row is discarded.
 
 The intent here is to leave only header and data rows, removing random
 comments, etc.
-"""
 
+Rows are filtered as they are read, so (for CSV and .xlsx/.xlsm files) the
+sheet is never held in memory; see strip_utils
+"""
 
 import argparse
 import os
-import re
 
-import pyexcel
 from tqdm import tqdm
 
+try:
+    from . import strip_utils
+except ImportError:
+    # Run as a script
+    import strip_utils
+
 DEFAULT_PATTERN = r".*\.(xls.?|csv)$"
 DEFAULT_THRESHOLD = 0.7
 DEFAULT_OVERWRITE = False
-
-MBFACTOR = float(1 << 20)
-
-
-def get_total_bytes(files):
-    return sum(os.path.getsize(file) for file in files)
+DEFAULT_JOBS = 1
 
 
 def strip_excel_directory(
@@ -36,25 +37,19 @@ def strip_excel_directory(
     threshold=DEFAULT_THRESHOLD,
     pattern=DEFAULT_PATTERN,
     overwrite=DEFAULT_OVERWRITE,
+    jobs=DEFAULT_JOBS,
+    max_memory=None,
 ):
-    files = [
-        os.path.join(input_path, f)
-        for f in os.listdir(input_path)
-        if re.search(pattern, f)
-    ]
-    total_megabytes = get_total_bytes(files) / MBFACTOR
-    progress = tqdm(total=total_megabytes, unit="MB")
-    errors = []
-    for input_file_path in files:
-        tqdm.write(f"Processing {input_file_path}")
-        try:
-            strip_excel_file(
-                input_file_path, output_path, threshold, overwrite=overwrite
-            )
-        except ValueError as error:
-            errors.append(error)
-        file_megabytes = os.path.getsize(input_file_path) / MBFACTOR
-        progress.update(file_megabytes)
+    files = strip_utils.find_files(input_path, pattern)
+    errors = strip_utils.process_files(
+        strip_excel_file,
+        files,
+        jobs=jobs,
+        max_memory=max_memory,
+        output_path=output_path,
+        threshold=threshold,
+        overwrite=overwrite,
+    )
     print(f"Errors: {errors}")
 
 
@@ -74,73 +69,52 @@ def row_is_invalid(row, threshold=DEFAULT_THRESHOLD):
     return False
 
 
+def row_values_are_invalid(values, threshold=DEFAULT_THRESHOLD):
+    """Like row_is_invalid, but for a row of values (empty cells are None or "")"""
+    if not values:
+        return True
+    invalid_cells = sum(1 for value in values if value is None or value == "")
+    return bool(invalid_cells) and invalid_cells / len(values) > threshold
+
+
 def identify_invalid_rows(rows, threshold=DEFAULT_THRESHOLD):
     invalid_row_indices = []
     for ri, row in enumerate(rows):
-        if row_is_invalid(row):
+        if row_values_are_invalid(row, threshold):
             invalid_row_indices.append(ri)
 
     return invalid_row_indices
 
 
-def strip_excel_sheet(sheet, threshold=DEFAULT_THRESHOLD):
-    """Strip non-data rows from a Sheet -- done in-place!"""
-
-    # Annotate each row with its original index (1-indexed). This
-    # is so that we can reference them by this later
-    tqdm.write(f"Processing {sheet.name}")
-
-    if not sheet:
-        tqdm.write(f"Empty sheet; skipping")
-        return
-
-    # For some reason we add a column this way... strange API, but it works.
-    # We create a Sheet with a single Column. Sheet expects a 2d list,
-    # so we create one here. The range starts at two because the original
-    # row numbers are 1-indexed, and the first row (row 1) doesn't get numbered
-    # because it contains the header ("Original Row")
-    # This will be used later to reference the original row from which the data
-    # was imported
-    sheet.column += pyexcel.Sheet(
-        [["Original Row"], *[[num] for num in range(2, len(sheet) + 1)]]
-    )
-
-    orig_num_rows = len(sheet.array)
-    # Get the indexes of all invalid rows...
-    invalid_row_indices = identify_invalid_rows(sheet.array, threshold)
-    for index in sorted(invalid_row_indices, reverse=True):
-        # tqdm.write(f"Deleted invalid row {index}")
-        # ...then delete them
-        # TODO: See http://docs.pyexcel.org/en/latest/sheet.html#how-to-filter-out-empty-rows-in-my-sheet
-        # for a potentially cleaner way to do this
-        del sheet.row[index]
-
-    num_rows_deleted = orig_num_rows - len(sheet)
-
-    tqdm.write(
-        f"Deleted {num_rows_deleted}/{orig_num_rows} rows "
-        f"({num_rows_deleted / orig_num_rows * 100:.2f}%)"
-    )
-
-
-def strip_excel_book(book, threshold=DEFAULT_THRESHOLD):
-    """Strip non-data rows from a Book -- done in-place!"""
-
-    for sheet in book:
-        strip_excel_sheet(sheet, threshold=threshold)
-
-
-def open_excel_book(input_path):
-    try:
-        book = pyexcel.get_book(file_name=input_path)
-    except ValueError as error:
-        raise ValueError(f"Error reading {input_path}") from error
-
-    return book
-
-
-def save_excel_book(book, output_path):
-    return book.save_as(output_path)
+def filter_rows(rows, threshold=DEFAULT_THRESHOLD, stats=None):
+    """Yield only the valid rows of `rows`, as they are read
+
+    An "Original Row" column is added, which holds the (1-indexed) row number
+    that each row was read from, so that the data can be traced back to it later.
+    The first valid row is taken to be the header. If given, `stats` is updated
+    with the number of rows read and deleted.
+
+    Rows must be padded to the full width of the sheet (see strip_utils.iter_book),
+    so that trailing empty cells count towards the threshold. Otherwise, e.g. a
+    leading one-cell title line would be taken to be the header. Rows after the
+    header are also padded to its width, so that the row numbers all line up under
+    "Original Row"
+    """
+    if stats is None:
+        stats = {}
+    stats.update(num_rows=0, num_rows_deleted=0)
+    header_width = None
+    for row_num, row in enumerate(rows, 1):
+        stats["num_rows"] += 1
+        if header_width is not None:
+            row = [*row, *([None] * (header_width - len(row)))]
+        if row_values_are_invalid(row, threshold):
+            stats["num_rows_deleted"] += 1
+        elif header_width is None:
+            header_width = len(row)
+            yield [*row, "Original Row"]
+        else:
+            yield [*row, row_num]
 
 
 def strip_excel_file(
@@ -148,20 +122,26 @@ def strip_excel_file(
 ):
     """Save a new Excel file containing only headers and data rows"""
 
+    tqdm.write(f"Processing {input_path}")
     output_filename = f"{os.path.basename(input_path)}"
     full_output_path = os.path.join(output_path, output_filename)
 
-    if os.path.isfile(full_output_path) and not overwrite:
-        tqdm.write(f"{full_output_path} already exists; skipping")
+    if strip_utils.output_is_up_to_date(input_path, full_output_path, overwrite):
         return None
 
-    tqdm.write("Opening workbook")
-    book = open_excel_book(input_path)
-    tqdm.write("...done")
-
-    strip_excel_book(book, threshold=threshold)
-
-    save_excel_book(book, full_output_path)
+    def strip_sheets():
+        for name, rows in strip_utils.iter_book(input_path, pad_rows=True):
+            stats = {}
+            yield name, filter_rows(rows, threshold=threshold, stats=stats)
+            # By now the sheet has been written, and so fully read
+            if stats["num_rows"]:
+                tqdm.write(
+                    f"{name}: Deleted {stats['num_rows_deleted']}/{stats['num_rows']} "
+                    f"rows ({stats['num_rows_deleted'] / stats['num_rows'] * 100:.2f}%)"
+                )
+
+    strip_utils.save_book(strip_sheets(), full_output_path)
+    strip_utils.record_input_hash(input_path, full_output_path)
     tqdm.write(f"Wrote {full_output_path}")
     return full_output_path
 
@@ -175,6 +155,8 @@ def main():
             threshold=args.threshold,
             pattern=args.pattern,
             overwrite=args.force,
+            jobs=args.jobs,
+            max_memory=args.max_memory,
         )
     elif os.path.isfile(args.input_path):
         strip_excel_file(
@@ -216,6 +198,19 @@ def parse_args():
         action="store_true",
         help=("Force overwriting of output files"),
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help="The number of files to process concurrently (each in its own process). "
+        "Used only when a directory is given in path",
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=float,
+        help="The maximum memory (in MB) that each process may use (with --jobs)",
+    )
 
     parsed_args = parser.parse_args()
     if not 0 <= parsed_args.threshold <= 1:
@@ -0,0 +1,231 @@
+"""Helpers shared by the scripts that strip Excel/CSV files
+
+- Books are streamed a row at a time where the format allows it: .xlsx/.xlsm
+  files via openpyxl's read-only/write-only modes, and CSV files via csv. Legacy
+  (.xls) files can't be streamed, and so are still loaded via pyexcel
+- Each output file is accompanied by a `<output>.sha256` file holding the hash
+  of the input that it was generated from, so that unchanged inputs can be
+  skipped (regardless of modification time)
+- Directories can be processed in a pool of processes, each of which handles a
+  single file before being replaced (so memory can't accumulate across files),
+  and which can optionally be limited to a given amount of memory
+"""
+
+from contextlib import contextmanager
+import csv
+from functools import partial
+import hashlib
+from multiprocessing import Pool
+import os
+import re
+import time
+
+import openpyxl
+import pyexcel
+from tqdm import tqdm
+
+MBFACTOR = float(1 << 20)
+HASH_CHUNK_SIZE = 1 << 20
+STREAMABLE_EXCEL_EXTENSIONS = (".xlsx", ".xlsm")
+
+
+def find_files(input_path, pattern):
+    return sorted(
+        os.path.join(input_path, file)
+        for file in os.listdir(input_path)
+        if re.search(pattern, file)
+    )
+
+
+def hash_file(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _get_hash_path(output_path):
+    return f"{output_path}.sha256"
+
+
+def output_is_up_to_date(input_path, output_path, overwrite=False):
+    """Determine whether `output_path` needs to be (re)generated from `input_path`
+
+    An existing output is kept if it was generated from an input with the same
+    content hash. Outputs with no recorded hash predate this check, and so are
+    kept as they always have been (unless `overwrite`)
+    """
+    if overwrite or not os.path.isfile(output_path):
+        return False
+
+    try:
+        with open(_get_hash_path(output_path)) as file:
+            output_hash = file.read().strip()
+    except FileNotFoundError:
+        tqdm.write(f"{output_path} already exists; skipping")
+        return True
+
+    if output_hash == hash_file(input_path):
+        tqdm.write(f"{output_path} is up to date with {input_path}; skipping")
+        return True
+    return False
+
+
+def record_input_hash(input_path, output_path):
+    with open(_get_hash_path(output_path), "w") as file:
+        file.write(hash_file(input_path))
+
+
+def _pad_rows(rows, width):
+    for row in rows:
+        yield [*row, *([None] * (width - len(row)))]
+
+
+def iter_book(input_path, pad_rows=False):
+    """Yield (sheet name, rows) for each sheet of the given file
+
+    Each `rows` is an iterator of lists of cell values, and must be consumed
+    before the next sheet is requested. Note that CSV rows can be ragged (of
+    differing lengths), unless `pad_rows` is given: then they are padded (with
+    None) to the width of the widest row in the file, which takes an extra pass
+    over it
+    """
+    extension = os.path.splitext(input_path)[1].lower()
+    if extension == ".csv":
+        with open(input_path, newline="") as file:
+            rows = csv.reader(file)
+            if pad_rows:
+                width = max((len(row) for row in rows), default=0)
+                file.seek(0)
+                rows = _pad_rows(csv.reader(file), width)
+            yield os.path.splitext(os.path.basename(input_path))[0], rows
+    elif extension in STREAMABLE_EXCEL_EXTENSIONS:
+        try:
+            book = openpyxl.load_workbook(input_path, read_only=True, data_only=True)
+        except openpyxl.utils.exceptions.InvalidFileException as error:
+            raise ValueError(f"Error reading {input_path}") from error
+        try:
+            for sheet in book.worksheets:
+                yield sheet.title, (
+                    [cell.value for cell in row] for row in sheet.iter_rows()
+                )
+        finally:
+            # Read-only workbooks keep the file open until closed
+            book.close()
+    else:
+        try:
+            book = pyexcel.get_book(file_name=input_path)
+        except ValueError as error:
+            raise ValueError(f"Error reading {input_path}") from error
+        for sheet in book:
+            yield sheet.name, iter(sheet.array)
+
+
+def save_book(sheets, output_path):
+    """Save each (sheet name, rows) of `sheets` to `output_path`
+
+    `rows` are consumed as they are written, so (for CSV and .xlsx/.xlsm) the book
+    never needs to be held in memory. The book is written to a temporary file
+    alongside `output_path`, which then replaces it, so that a failure part way
+    through never leaves a partial output behind
+    """
+    root, extension = os.path.splitext(output_path)
+    # The temporary file keeps the extension, since that determines the format
+    temp_path = os.path.join(
+        os.path.dirname(output_path), f".{os.path.basename(root)}.partial{extension}"
+    )
+    try:
+        _write_book(sheets, temp_path, extension.lower())
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _write_book(sheets, output_path, extension):
+    if extension == ".csv":
+        with open(output_path, "w", newline="") as file:
+            writer = csv.writer(file)
+            for __, rows in sheets:
+                writer.writerows(rows)
+    elif extension in STREAMABLE_EXCEL_EXTENSIONS:
+        book = openpyxl.Workbook(write_only=True)
+        for name, rows in sheets:
+            sheet = book.create_sheet(title=name)
+            for row in rows:
+                sheet.append(row)
+        book.save(output_path)
+    else:
+        pyexcel.save_book_as(
+            bookdict={name: list(rows) for name, rows in sheets},
+            dest_file_name=output_path,
+        )
+
+
+def _limit_memory(max_megabytes):
+    # Imported here since resource is Unix-only
+    import resource
+
+    max_bytes = int(max_megabytes * MBFACTOR)
+    resource.setrlimit(resource.RLIMIT_AS, (max_bytes, max_bytes))
+
+
+def _process_file(func, kwargs, input_path):
+    # Errors are returned (as strings, since they might not be picklable) rather
+    # than raised, so that one bad file doesn't stop the rest
+    try:
+        func(input_path, **kwargs)
+    except (ValueError, MemoryError) as error:
+        return input_path, f"{error.__class__.__name__}: {error}"
+    return input_path, None
+
+
+@contextmanager
+def _imap(func, files, jobs, max_memory):
+    if jobs == 1:
+        if max_memory:
+            tqdm.write("--max-memory is only used with --jobs > 1; ignoring")
+        yield map(func, files)
+        return
+
+    # maxtasksperchild=1: each file gets a fresh process, so that the memory used
+    # by one (potentially huge) book is returned before the next is loaded
+    with Pool(
+        processes=jobs,
+        maxtasksperchild=1,
+        initializer=_limit_memory if max_memory else None,
+        initargs=(max_memory,) if max_memory else (),
+    ) as pool:
+        yield pool.imap_unordered(func, files)
+
+
+def process_files(func, files, jobs=1, max_memory=None, **kwargs):
+    """Call func(file, **kwargs) for each of the given files
+
+    If `jobs` is more than 1, files are processed concurrently in that many
+    processes, each of which is limited to `max_memory` MB (if given). Progress
+    (and then overall throughput) is reported in MB of input. Returns a list of
+    (file, error) for each file that failed
+    """
+    sizes = {file: os.path.getsize(file) for file in files}
+    total_megabytes = sum(sizes.values()) / MBFACTOR
+    progress = tqdm(total=total_megabytes, unit="MB")
+    errors = []
+    start = time.perf_counter()
+    with _imap(
+        partial(_process_file, func, kwargs), files, jobs, max_memory
+    ) as results:
+        for input_path, error in results:
+            if error:
+                tqdm.write(f"Error processing {input_path}: {error}")
+                errors.append((input_path, error))
+            progress.update(sizes[input_path] / MBFACTOR)
+    progress.close()
+    elapsed = time.perf_counter() - start
+    throughput = total_megabytes / elapsed if elapsed else 0
+    print(
+        f"Processed {len(files)} files ({total_megabytes:.2f} MB) in "
+        f"{elapsed:.2f}s ({throughput:.2f} MB/s) with {jobs} jobs"
+    )
+    return errors
@@ -1,11 +1,19 @@
 """High-level helper functions that handle common model import tasks"""
 
 from cases.models import Attachment
+from .batch import add_m2m
+from .lookups import lookup
 
 
 def handle_case(
-    row_data, form_map, data=None, applicant=None, contact=None, imported_by=None
+    row_data,
+    form_map,
+    data=None,
+    applicant=None,
+    contact=None,
+    imported_by=None,
 ):
+    """Get or create the Case (or PCase) of the given row"""
     if data is not None:
         row = data
     else:
@@ -20,42 +28,56 @@ def handle_case(
     if not case_form:
         return None, False
     case_num = case_form["case_num"].value()
-    if model.objects.filter(case_num=case_num).exists():
-        case = model.objects.get(case_num=case_num)
+    cases = lookup(model, "case_num")
+    case = cases.get(case_num)
+    if case:
         case_created = False
     else:
         case, __ = form_map.save_with_audit(
             form=case_form, row_data=row_data, imported_by=imported_by
         )
+        cases.remember(case_num, case)
         case_created = True
 
     return case, case_created
 
 
 def get_or_create_attachment(row_data, form_map, imported_by):
+    """Get or create the Attachment of the given row"""
     attachment = None
     attachment_created = False
     attachment_form, conversion_errors = form_map.render(row_data.data)
     if attachment_form:
         path = attachment_form["file_path"].value()
         if path:
-            if Attachment.objects.filter(file_path=path).exists():
-                attachment = Attachment.objects.get(file_path=path)
-            else:
+            attachments = lookup(Attachment, "file_path")
+            attachment = attachments.get(path)
+            if not attachment:
                 attachment, __ = form_map.save_with_audit(
                     form=attachment_form, row_data=row_data, imported_by=imported_by
                 )
+                attachments.remember(path, attachment)
                 attachment_created = True
 
     return attachment, attachment_created
 
 
-def handle_attachments(row_data, model, form_maps, imported_by):
+def handle_attachments(row_data, model, form_maps, imported_by, extra_attachments=()):
+    """Get or create the Attachments of the given row, and add them to `model`
+
+    `extra_attachments` (e.g. a propagation study) are added along with them, so
+    that all of the row's attachments are linked to `model` at once
+    """
     attachments_info = []
     for form_map in form_maps:
         attachments_info.append(
             get_or_create_attachment(row_data, form_map, imported_by)
         )
 
-    model.attachments.add(*[info[0] for info in attachments_info if info[0]])
+    to_add = [
+        *(info[0] for info in attachments_info if info[0]),
+        *(attachment for attachment in extra_attachments if attachment),
+    ]
+    if to_add:
+        add_m2m(model, "attachments", to_add)
     return attachments_info
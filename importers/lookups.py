@@ -0,0 +1,203 @@
+"""Import-lifetime caches of existing model instances
+
+The same values are looked up again and again during an import: every facility
+row of a Case repeats its case_num, the same file_path appears across rows, and
+every Access location row looks up its SRS. Within an import_cache() block
+(which each import command enters; see cases/management/commands/_base_import.py)
+lookup() returns the same ImportLookup for each model and field, so each value
+is only queried for once per import.
+"""
+
+from contextlib import contextmanager
+from itertools import count
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from django_import_data.models import FileImportAttempt
+
+# Maps each (model, field_name) to its ImportLookup, while import_cache() is active
+_lookups = None
+# Numbers every remember() call, so that forget_on_rollback() can tell which
+# instances were remembered within its block
+_remember_counter = count()
+
+
+class ImportLookup:
+    """Existing instances of a model, by a unique field, for the duration of an import
+
+    prefetch() looks up every given key in a single `IN` query, so that get() only
+    needs to query for keys that it hasn't already seen. Instances created during
+    the import are given to remember(), and are forgotten again if the block that
+    they were created in is rolled back (see forget_on_rollback())
+    """
+
+    def __init__(self, model, field_name):
+        self.model = model
+        self.field_name = field_name
+        self.field = model._meta.get_field(field_name)
+        # Maps key to instance, or to None if it is known not to exist
+        self._instances = {}
+        # Maps key to (instance, remember() number) for instances that were
+        # created in a transaction that hasn't been committed yet
+        self._pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.queries = 0
+
+    def __str__(self):
+        return f"{self.model.__name__}.{self.field_name}"
+
+    def _to_key(self, value):
+        # e.g. case_num is a CharField on Case, but an IntegerField on PCase
+        try:
+            return self.field.to_python(value)
+        except ValidationError:
+            # Leave it to the query to complain about, as it would have anyway
+            return value
+
+    def prefetch(self, values):
+        keys = {self._to_key(value) for value in values if value not in (None, "")}
+        keys -= self._instances.keys() | self._pending.keys()
+        if not keys:
+            return
+        found = {
+            getattr(instance, self.field_name): instance
+            for instance in self.model.objects.filter(
+                **{f"{self.field_name}__in": keys}
+            )
+        }
+        self.queries += 1
+        for key in keys:
+            self._instances[key] = found.get(key)
+
+    def get(self, value):
+        """Return the instance with the given key, or None if there isn't one"""
+        key = self._to_key(value)
+        if key in self._pending:
+            self.hits += 1
+            return self._pending[key][0]
+        if key in self._instances:
+            self.hits += 1
+            return self._instances[key]
+
+        self.misses += 1
+        self.queries += 1
+        try:
+            instance = self.model.objects.get(**{self.field_name: key})
+        except self.model.DoesNotExist:
+            instance = None
+        self._instances[key] = instance
+        return instance
+
+    def remember(self, value, instance):
+        """Remember that `instance` was just created with the given key
+
+        Until its transaction is committed, it is forgotten again by any enclosing
+        forget_on_rollback() block that is rolled back
+        """
+        key = self._to_key(value)
+        self._instances.pop(key, None)
+        number = next(_remember_counter)
+
+        def confirm():
+            # Unless it has been forgotten (or replaced) since
+            if self._pending.get(key, (None, None))[1] == number:
+                del self._pending[key]
+                self._instances[key] = instance
+
+        self._pending[key] = (instance, number)
+        # If there is no transaction, this confirms immediately
+        transaction.on_commit(confirm)
+
+    def forget_since(self, number):
+        """Forget the uncommitted instances remembered since remember() call `number`"""
+        for key in [
+            key for key, (__, number_) in self._pending.items() if number_ >= number
+        ]:
+            del self._pending[key]
+
+    def forget_uncommitted(self):
+        """Forget every uncommitted instance
+
+        Any that weren't rolled back are simply queried for again
+        """
+        self._pending.clear()
+
+    def stats(self):
+        return f"{self}: {self.hits} hits, {self.misses} misses, {self.queries} queries"
+
+
+@contextmanager
+def import_cache():
+    """Share an ImportLookup per model and field (via lookup()) within the block
+
+    Everything is discarded when the block exits, so nothing is remembered from
+    one import to the next. Yields the dict of lookups, for reporting. Nested
+    blocks share the outermost block's lookups
+
+    Whenever a new file starts being imported (i.e. a FileImportAttempt is
+    created), the uncommitted instances are forgotten. BaseImportCommand may have
+    rolled back the previous file without raising, which forget_on_rollback()
+    can't see
+    """
+    global _lookups
+    if _lookups is not None:
+        yield _lookups
+        return
+
+    _lookups = {}
+    post_save.connect(
+        _forget_uncommitted_on_new_file,
+        sender=FileImportAttempt,
+        dispatch_uid=__name__,
+    )
+    try:
+        yield _lookups
+    finally:
+        post_save.disconnect(sender=FileImportAttempt, dispatch_uid=__name__)
+        _lookups = None
+
+
+def _forget_uncommitted_on_new_file(sender, created=False, **kwargs):
+    if created and _lookups:
+        for lookup_ in _lookups.values():
+            lookup_.forget_uncommitted()
+
+
+@contextmanager
+def forget_on_rollback(*lookups, rolled_back=False):
+    """Forget the instances remembered within the block if it is rolled back
+
+    That is, if it raises (e.g. a record whose savepoint is rolled back), or if
+    `rolled_back` is given (e.g. a dry run). This applies to the given ImportLookups
+    and to every one shared by import_cache(). Can also be used as a decorator
+    """
+    number = next(_remember_counter)
+    try:
+        yield
+    except Exception:
+        _forget_since(number, lookups)
+        raise
+    if rolled_back:
+        _forget_since(number, lookups)
+
+
+def _forget_since(number, lookups):
+    for lookup_ in {*lookups, *(_lookups or {}).values()}:
+        lookup_.forget_since(number)
+
+
+def lookup(model, field_name):
+    """Return the ImportLookup of `model` by `field_name`
+
+    Outside of import_cache() this is a new (unshared) ImportLookup every time
+    """
+    if _lookups is None:
+        return ImportLookup(model, field_name)
+    try:
+        return _lookups[(model, field_name)]
+    except KeyError:
+        lookup_ = _lookups[(model, field_name)] = ImportLookup(model, field_name)
+        return lookup_
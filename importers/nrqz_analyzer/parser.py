@@ -0,0 +1,139 @@
+"""Single-pass parser for NRQZ Analyzer (NAM) files
+
+A NAM file is a version line (e.g. "nrqzApp v1"), followed by `key:value` lines.
+Most keys describe the application as a whole (the "main" dict), but each run of
+lines from a `type` key to the version's terminator key describes a Facility
+"""
+
+import re
+
+COMMENT_REGEX = re.compile(r"\d{2}\s*[a-zA-Z]{3,6}\s*\d{2,4}")
+
+# Maps each known version line to the key that terminates a Facility
+FACILITY_DICT_TERMINATORS = {"nrqzApp v1": "ga2gbt", "nrqzApp v2": "PanRng"}
+# The main dict keys that are copied into every Facility dict, so that each
+# Facility knows its nrqzID (and so its case number) and location
+INHERITED_KEYS = ("nrqzID", "lat", "lon")
+
+
+class NamParser:
+    """Parse the lines of a NAM file, one at a time
+
+    iter_records() yields ("facility", facility_dict) as each Facility is
+    completed, and finally ("main", main_dict). As a side effect, the key of
+    every line is collected into `keys`, and any lines that aren't `key:value`
+    pairs are collected into `errors`, so the lines never need to be revisited
+    """
+
+    def __init__(self, lines):
+        self.lines = iter(lines)
+        self.version = None
+        self.keys = set()
+        self.errors = {}
+
+    def _parse_line(self, line):
+        stripped = line.strip()
+        if not stripped:
+            return None, None, None
+        parts = [part for part in stripped.split(":") if part]
+        key = parts[0]
+        value = ":".join(parts[1:])
+        self.keys.add(key)
+        return stripped, key, value
+
+    def iter_records(self):
+        version_line = next(self.lines, "")
+        self.version = version_line.strip()
+        try:
+            facility_dict_terminator = FACILITY_DICT_TERMINATORS[self.version]
+        except KeyError:
+            raise ValueError(f"Unknown version: {self.version}")
+        self._parse_line(version_line)
+
+        # The "main" dict holds all of the non-facility info
+        main_dict = {}
+        facility_dict = None
+        for line in self.lines:
+            stripped, key, value = self._parse_line(line)
+            if not stripped:
+                continue
+
+            if ":" not in stripped:
+                self.errors.setdefault("non_key_value_rows", [])
+                self.errors["non_key_value_rows"].append(stripped)
+                main_dict.setdefault("comments", "")
+                main_dict["comments"] += line
+
+            # If we are "in" a Facility dict...
+            if facility_dict:
+                # ...put the current key/value pair into it
+                if key in facility_dict:
+                    # Which should never already be there
+                    raise ValueError(
+                        f"Key {key} found more than once in a single Facility dict!"
+                    )
+                if value:
+                    facility_dict[key] = value
+                # The terminator marks the end of a "facility run". So, once we
+                # reach it, the facility dict is complete, and the cycle can continue
+                if key == facility_dict_terminator:
+                    yield "facility", facility_dict
+                    facility_dict = None
+            # type marks the beginning of a "facility run"
+            elif key == "type":
+                # So, we start a new dict to hold its info, which includes the
+                # inherited keys from the main dict
+                facility_dict = {
+                    key: value
+                    for key, value in main_dict.items()
+                    if key in INHERITED_KEYS
+                }
+                if value:
+                    facility_dict["type"] = value
+            # For all other keys, simply add them to the main dict
+            elif value:
+                # Last value wins...
+                main_dict[key] = value
+                if COMMENT_REGEX.match(line):
+                    main_dict.setdefault("comments", "")
+                    main_dict["comments"] += line
+
+        yield "main", main_dict
+
+
+def parse_nam_file(path):
+    """Parse the NAM file at `path` in a single pass, streaming its lines
+
+    Returns a dict of its version, main_dict, facility_dicts, headers (the sorted
+    keys of every line), and errors
+    """
+    with open(path, newline="", encoding="latin1") as file:
+        parser = NamParser(file)
+        facility_dicts = []
+        main_dict = None
+        for kind, record in parser.iter_records():
+            if kind == "facility":
+                facility_dicts.append(record)
+            else:
+                main_dict = record
+
+    return {
+        "version": parser.version,
+        "main_dict": main_dict,
+        "facility_dicts": facility_dicts,
+        "headers": sorted(parser.keys),
+        "errors": parser.errors,
+    }
+
+
+def read_nrqz_id(path):
+    """Return the (first) nrqzID of the NAM file at `path`, or None if it has none
+
+    Only the lines up to the nrqzID (which is near the top) are read
+    """
+    with open(path, newline="", encoding="latin1") as file:
+        for line in file:
+            key, __, value = line.strip().partition(":")
+            if key == "nrqzID" and value:
+                return value
+    return None
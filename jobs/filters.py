@@ -0,0 +1,19 @@
+import django_filters
+
+from cases.filters import HelpedFilterSet
+from utils.layout import discover_fields
+
+from .form_helpers import JobFilterFormHelper
+from .models import Job
+
+
+class JobFilter(HelpedFilterSet):
+    id = django_filters.NumberFilter(label="Job ID")
+    description = django_filters.CharFilter(lookup_expr="icontains")
+    status = django_filters.ChoiceFilter(choices=Job.STATUS_CHOICES)
+    created_on = django_filters.DateFromToRangeFilter()
+
+    class Meta:
+        model = Job
+        formhelper_class = JobFilterFormHelper
+        fields = discover_fields(formhelper_class.layout)
@@ -0,0 +1,16 @@
+from crispy_forms.helper import FormHelper
+from crispy_forms.layout import Div
+
+from cases.form_helpers import CollapsibleFilterFormLayout
+
+
+class JobFilterFormHelper(FormHelper):
+    layout = CollapsibleFilterFormLayout(
+        Div(
+            Div("id", css_class="col"),
+            Div("description", css_class="col"),
+            Div("status", css_class="col"),
+            Div("created_on", css_class="col"),
+            css_class="row",
+        )
+    )
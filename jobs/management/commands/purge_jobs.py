@@ -0,0 +1,31 @@
+"""Delete old finished Jobs, along with their result files"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = "Delete finished Jobs (and their result files) older than the given age"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=7,
+            help="Delete Jobs that finished more than this many days ago",
+        )
+
+    def handle(self, *args, **options):
+        jobs = Job.objects.finished_before(
+            timezone.now() - timedelta(days=options["days"])
+        )
+        num_jobs = 0
+        for job in jobs.iterator():
+            job.delete_result()
+            num_jobs += 1
+        jobs.delete()
+        self.stdout.write(f"Deleted {num_jobs} Jobs")
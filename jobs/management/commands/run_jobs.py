@@ -0,0 +1,78 @@
+"""Run pending Jobs as they are enqueued"""
+
+import logging
+import os
+import signal
+import socket
+import time
+import traceback
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs.models import Job
+from jobs.registry import get_task
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Poll for pending Jobs and run them, one at a time. Run as many of these "
+        "as Jobs should be able to run concurrently"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run all currently pending Jobs, then exit (instead of polling)",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help="The number of seconds to wait between checks for pending Jobs",
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        hostname = socket.gethostname()
+        worker = f"{hostname}:{os.getpid()}"
+        num_abandoned = Job.objects.fail_abandoned(hostname)
+        if num_abandoned:
+            logger.warning(f"Failed {num_abandoned} Jobs abandoned by dead workers")
+
+        self.stdout.write(f"Worker {worker} waiting for Jobs")
+        while not self.stopping:
+            close_old_connections()
+            job = Job.objects.claim_next(worker)
+            if job:
+                self.run_job(job)
+            elif options["once"]:
+                break
+            else:
+                time.sleep(options["poll_interval"])
+
+    def stop(self, signum, frame):
+        # Finish the current Job (if any) before exiting
+        self.stdout.write("Stopping once the current Job (if any) is finished")
+        self.stopping = True
+
+    def run_job(self, job):
+        self.stdout.write(f"Running {job}")
+        try:
+            task = get_task(job.name)
+            task(job, **job.kwargs)
+        except Exception:
+            error = traceback.format_exc()
+            logger.error(f"{job} failed:\n{error}")
+            job.delete_result()
+            job.finish(error=error)
+        else:
+            job.finish()
+        self.stdout.write(f"{job} {job.status}")
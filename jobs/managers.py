@@ -0,0 +1,81 @@
+import os
+
+from django.db import transaction
+from django.db.models import Manager
+from django.utils import timezone
+
+from .registry import is_registered
+
+
+def _pid_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, but belongs to someone else
+        return True
+    return True
+
+
+class JobManager(Manager):
+    def enqueue(self, name, created_by=None, description="", **kwargs):
+        """Create a pending Job that will run the named task with the given kwargs
+
+        The kwargs must be JSON-serializable. Note that the Job is only visible to
+        the workers once the current transaction (i.e. the request) commits
+        """
+        if not is_registered(name):
+            raise ValueError(f"No task named {name!r} has been registered")
+        if created_by is not None and not created_by.is_authenticated:
+            created_by = None
+        return self.create(
+            name=name, kwargs=kwargs, created_by=created_by, description=description
+        )
+
+    def claim_next(self, worker):
+        """Mark the oldest pending Job as running on the given worker, and return it
+
+        Returns None if there are no pending Jobs. Jobs locked by other workers
+        (that are in the process of claiming them) are skipped rather than waited
+        on, so any number of workers can poll concurrently
+        """
+        with transaction.atomic():
+            job = (
+                self.select_for_update(skip_locked=True)
+                .filter(status=self.model.STATUS_PENDING)
+                .order_by("created_on", "id")
+                .first()
+            )
+            if job is None:
+                return None
+            job.status = self.model.STATUS_RUNNING
+            job.worker = worker
+            job.started_on = timezone.now()
+            job.save(update_fields=["status", "worker", "started_on"])
+        return job
+
+    def fail_abandoned(self, hostname):
+        """Fail any Jobs "running" on a worker (on this host) that no longer exists
+
+        These are left behind if a worker is killed (or the host crashes) while
+        running a Job. Returns the number of Jobs failed
+        """
+        abandoned = [
+            job_id
+            for job_id, worker in self.filter(
+                status=self.model.STATUS_RUNNING, worker__startswith=f"{hostname}:"
+            ).values_list("id", "worker")
+            if not _pid_exists(int(worker.rsplit(":", 1)[1]))
+        ]
+        return self.filter(id__in=abandoned).update(
+            status=self.model.STATUS_FAILED,
+            error="The worker running this job exited before it finished",
+            finished_on=timezone.now(),
+        )
+
+    def finished_before(self, when):
+        return self.filter(
+            status__in=[self.model.STATUS_SUCCEEDED, self.model.STATUS_FAILED],
+            finished_on__lt=when,
+        )
@@ -0,0 +1,112 @@
+# Generated by Django 2.2.24 on 2026-10-17 14:20
+
+from django.conf import settings
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [migrations.swappable_dependency(settings.AUTH_USER_MODEL)]
+
+    operations = [
+        migrations.CreateModel(
+            name="Job",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        help_text="The name of the task to run", max_length=256
+                    ),
+                ),
+                (
+                    "kwargs",
+                    django.contrib.postgres.fields.jsonb.JSONField(
+                        blank=True, default=dict, help_text="Arguments for the task"
+                    ),
+                ),
+                ("description", models.CharField(blank=True, max_length=512)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("succeeded", "Succeeded"),
+                            ("failed", "Failed"),
+                        ],
+                        db_index=True,
+                        default="pending",
+                        max_length=16,
+                    ),
+                ),
+                ("progress_done", models.PositiveIntegerField(default=0)),
+                ("progress_total", models.PositiveIntegerField(blank=True, null=True)),
+                ("progress_message", models.CharField(blank=True, max_length=512)),
+                (
+                    "result_url",
+                    models.CharField(
+                        blank=True,
+                        help_text="Where to view the result of the job",
+                        max_length=512,
+                    ),
+                ),
+                (
+                    "result_path",
+                    models.CharField(
+                        blank=True,
+                        help_text="The file produced by the job",
+                        max_length=1024,
+                    ),
+                ),
+                ("result_filename", models.CharField(blank=True, max_length=256)),
+                ("result_content_type", models.CharField(blank=True, max_length=256)),
+                ("error", models.TextField(blank=True)),
+                (
+                    "worker",
+                    models.CharField(
+                        blank=True,
+                        help_text="The host:pid of the worker running it",
+                        max_length=256,
+                    ),
+                ),
+                (
+                    "created_on",
+                    models.DateTimeField(auto_now_add=True, db_index=True),
+                ),
+                ("started_on", models.DateTimeField(blank=True, null=True)),
+                ("finished_on", models.DateTimeField(blank=True, null=True)),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="jobs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={"ordering": ["-created_on"]},
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                condition=models.Q(status="pending"),
+                fields=["created_on"],
+                name="jobs_job_pending_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,149 @@
+"""Job models"""
+
+import os
+
+from django.conf import settings
+from django.contrib.postgres.fields import JSONField
+from django.db.models import (
+    CharField,
+    DateTimeField,
+    ForeignKey,
+    Index,
+    Model,
+    PositiveIntegerField,
+    Q,
+    SET_NULL,
+    TextField,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from .managers import JobManager
+
+
+class Job(Model):
+    """A long-running task (e.g. a large export or import), run by a worker process
+
+    Jobs are created by the web application (see JobManager.enqueue), and then
+    claimed and run by the `run_jobs` management command, so that the work
+    doesn't tie up (or time out) a web worker
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    )
+
+    name = CharField(max_length=256, help_text="The name of the task to run")
+    kwargs = JSONField(default=dict, blank=True, help_text="Arguments for the task")
+    description = CharField(max_length=512, blank=True)
+    status = CharField(
+        max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True
+    )
+    progress_done = PositiveIntegerField(default=0)
+    progress_total = PositiveIntegerField(null=True, blank=True)
+    progress_message = CharField(max_length=512, blank=True)
+    result_url = CharField(
+        max_length=512, blank=True, help_text="Where to view the result of the job"
+    )
+    result_path = CharField(
+        max_length=1024, blank=True, help_text="The file produced by the job"
+    )
+    result_filename = CharField(max_length=256, blank=True)
+    result_content_type = CharField(max_length=256, blank=True)
+    error = TextField(blank=True)
+    worker = CharField(
+        max_length=256, blank=True, help_text="The host:pid of the worker running it"
+    )
+    created_by = ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=SET_NULL,
+        related_name="jobs",
+    )
+    created_on = DateTimeField(auto_now_add=True, db_index=True)
+    started_on = DateTimeField(null=True, blank=True)
+    finished_on = DateTimeField(null=True, blank=True)
+
+    objects = JobManager()
+
+    class Meta:
+        ordering = ["-created_on"]
+        indexes = [
+            # The workers poll for these constantly, so make that cheap regardless
+            # of how many finished Jobs there are
+            Index(
+                fields=["created_on"],
+                name="jobs_job_pending_idx",
+                condition=Q(status="pending"),
+            )
+        ]
+
+    def __str__(self):
+        return f"Job {self.id}: {self.description or self.name}"
+
+    def get_absolute_url(self):
+        return reverse("job_detail", args=[str(self.id)])
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)
+
+    @property
+    def progress_percent(self):
+        if not self.progress_total:
+            return None
+        return min(100, int(self.progress_done / self.progress_total * 100))
+
+    @property
+    def has_download(self):
+        return (
+            self.status == self.STATUS_SUCCEEDED
+            and self.result_path
+            and os.path.exists(self.result_path)
+        )
+
+    def set_progress(self, done, total=None, message=None):
+        """Record the progress of the Job
+
+        This is saved immediately (via an UPDATE), so that it is visible on the
+        Job's page while the task is still running. This only works if the task
+        isn't inside a single transaction, so tasks should use one transaction per
+        unit of work (e.g. per file) and report progress between them
+        """
+        self.progress_done = done
+        if total is not None:
+            self.progress_total = total
+        if message is not None:
+            self.progress_message = message[:512]
+        type(self).objects.filter(id=self.id).update(
+            progress_done=self.progress_done,
+            progress_total=self.progress_total,
+            progress_message=self.progress_message,
+        )
+
+    def get_result_path(self, filename):
+        """Return a path (in JOBS_RESULTS_DIR) to write a result file to"""
+        os.makedirs(settings.JOBS_RESULTS_DIR, exist_ok=True)
+        self.result_path = os.path.join(
+            settings.JOBS_RESULTS_DIR, f"{self.id}_{filename}"
+        )
+        self.result_filename = filename
+        return self.result_path
+
+    def finish(self, error=None):
+        self.status = self.STATUS_FAILED if error else self.STATUS_SUCCEEDED
+        self.error = error or ""
+        self.finished_on = timezone.now()
+        self.save()
+
+    def delete_result(self):
+        if self.result_path and os.path.exists(self.result_path):
+            os.remove(self.result_path)
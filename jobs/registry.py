@@ -0,0 +1,38 @@
+"""Registry of the tasks that can be run as Jobs
+
+Each app defines its tasks in its tasks.py module (which are discovered when the
+jobs app is ready):
+
+    @register("cases.export_table")
+    def export_table(job, view, query, export_format):
+        ...
+
+A task is called with the Job that it is being run for, followed by the Job's
+kwargs. It can report its progress via Job.set_progress, and its result by
+setting the result_* fields of the Job (which are saved once it returns)
+"""
+
+_TASKS = {}
+
+
+def register(name):
+    """Register the decorated function as the task with the given name"""
+
+    def decorator(func):
+        if name in _TASKS:
+            raise ValueError(f"A task named {name!r} has already been registered")
+        _TASKS[name] = func
+        return func
+
+    return decorator
+
+
+def get_task(name):
+    try:
+        return _TASKS[name]
+    except KeyError as error:
+        raise ValueError(f"No task named {name!r} has been registered") from error
+
+
+def is_registered(name):
+    return name in _TASKS
@@ -0,0 +1,26 @@
+"""Jobs Table definitions"""
+
+import django_tables2 as tables
+
+from .filters import JobFilter
+from .models import Job
+
+
+class JobTable(tables.Table):
+    id = tables.Column(linkify=True, verbose_name="Job")
+    progress = tables.Column(empty_values=(), orderable=False)
+
+    class Meta:
+        model = Job
+        fields = (
+            *JobFilter.Meta.fields,
+            "progress",
+            "created_by",
+            "started_on",
+            "finished_on",
+        )
+
+    def render_progress(self, record):
+        if record.progress_total:
+            return f"{record.progress_done}/{record.progress_total}"
+        return record.progress_done or "—"
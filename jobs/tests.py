@@ -0,0 +1,48 @@
+from django.test import TestCase
+
+from jobs.management.commands.run_jobs import Command as RunJobsCommand
+from jobs.models import Job
+from jobs.registry import register
+
+
+@register("jobs.test_add")
+def add(job, a, b):
+    job.result_url = f"/{a + b}/"
+
+
+@register("jobs.test_fail")
+def fail(job):
+    raise ValueError("Failed on purpose")
+
+
+class JobManagerTest(TestCase):
+    def test_enqueue_unregistered(self):
+        with self.assertRaises(ValueError):
+            Job.objects.enqueue("jobs.does_not_exist")
+
+    def test_claim_next(self):
+        first = Job.objects.enqueue("jobs.test_add", a=1, b=2)
+        second = Job.objects.enqueue("jobs.test_add", a=3, b=4)
+
+        claimed = Job.objects.claim_next("host:1")
+        self.assertEqual(claimed, first)
+        self.assertEqual(claimed.status, Job.STATUS_RUNNING)
+        self.assertEqual(Job.objects.claim_next("host:1"), second)
+        self.assertIsNone(Job.objects.claim_next("host:1"))
+
+
+class RunJobsTest(TestCase):
+    def test_run_job(self):
+        succeeded = Job.objects.enqueue("jobs.test_add", a=1, b=2)
+        failed = Job.objects.enqueue("jobs.test_fail")
+
+        command = RunJobsCommand()
+        command.run_job(Job.objects.claim_next("host:1"))
+        command.run_job(Job.objects.claim_next("host:1"))
+
+        succeeded.refresh_from_db()
+        self.assertEqual(succeeded.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(succeeded.result_url, "/3/")
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, Job.STATUS_FAILED)
+        self.assertIn("Failed on purpose", failed.error)
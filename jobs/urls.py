@@ -0,0 +1,11 @@
+"""URL configurations for jobs app"""
+
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path("", views.JobListView.as_view(), name="job_index"),
+    path("<int:pk>/", views.JobDetailView.as_view(), name="job_detail"),
+    path("<int:pk>/download/", views.job_download, name="job_download"),
+]
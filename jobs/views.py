@@ -0,0 +1,47 @@
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.views.generic.detail import DetailView
+
+from cases.views import FilterTableView
+from .filters import JobFilter
+from .models import Job
+from .tables import JobTable
+
+
+class JobListView(FilterTableView):
+    table_class = JobTable
+    filterset_class = JobFilter
+    template_name = "audits/generic_table.html"
+
+    def get_queryset(self):
+        return super().get_queryset().select_related("created_by")
+
+
+class JobDetailView(DetailView):
+    model = Job
+    template_name = "jobs/job_detail.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["info"] = [
+            "name",
+            "status",
+            "created_by",
+            "created_on",
+            "started_on",
+            "finished_on",
+            "worker",
+        ]
+        return context
+
+
+def job_download(request, pk):
+    job = get_object_or_404(Job, id=pk)
+    if not job.has_download:
+        raise Http404(f"{job} has no result to download")
+    return FileResponse(
+        open(job.result_path, "rb"),
+        as_attachment=True,
+        filename=job.result_filename,
+        content_type=job.result_content_type or None,
+    )
@@ -1,8 +1,10 @@
 """Base Django settings for nrqz_admin project."""
 
 import os
+import sys
 from getpass import getuser
 from pathlib import Path
+import tempfile
 
 import environ
 import sentry_sdk
@@ -15,6 +17,8 @@ env = environ.Env(
     NRQZ_LETTER_TEMPLATE_DIR=(str, ""),
     STATIC_ROOT=(str, ""),
     ALLOWED_HOSTS=(list, []),
+    JOBS_RESULTS_DIR=(str, ""),
+    CACHE_URL=(str, ""),
 )
 environ.Env.read_env()
 
@@ -29,6 +33,11 @@ DATABASES = {
     "default": env.db()
 }
 STATIC_ROOT = env("STATIC_ROOT")
+# Where the files produced by Jobs (e.g. large exports) are written. By default,
+# somewhere outside of the source tree
+JOBS_RESULTS_DIR = env("JOBS_RESULTS_DIR") or os.path.join(
+    tempfile.gettempdir(), f"nrqz_admin_{_user}", "job_results"
+)
 
 # Application definition
 
@@ -61,6 +70,7 @@ INSTALLED_APPS = [
     "django_user_agents",
     "cases",
     "audits",
+    "jobs",
 ]
 
 MIDDLEWARE = [
@@ -160,6 +170,7 @@ LOGGING = {
     "loggers": {
         "cases": {"handlers": ["console"], "level": "DEBUG", "propagate": True},
         "tools": {"handlers": ["console"], "level": "DEBUG", "propagate": True},
+        "jobs": {"handlers": ["console"], "level": "DEBUG", "propagate": True},
         # "django_super_deduper": {"handlers": ["console"], "level": "DEBUG"},
     },
 }
@@ -216,6 +227,31 @@ ADMINS = (("Thomas Chamberlin", "tchamber@nrao.edu"),)
 # tell it not to do it itself
 TEMPUS_DOMINUS_INCLUDE_ASSETS = False
 
+# Jobs (see the jobs app). Exports of more rows than this are done via a Job,
+# rather than within the request, since they can take longer than gunicorn allows
+JOBS_EXPORT_THRESHOLD = 5000
+# Likewise for acknowledging File Importers in bulk
+JOBS_ACKNOWLEDGE_THRESHOLD = 200
+# How often (in seconds) idle run_jobs workers check for new Jobs
+JOBS_POLL_INTERVAL = 2
+
+# How often (in seconds) `scan_import_files --interval` rescans the files in the
+# importer spec, by default (see audits.models.FileScanIndex)
+FILE_SCAN_INTERVAL = 300
+# How often (in seconds) `watch_import_sources` does a full rescan, to catch anything
+# that inotify missed
+FILE_WATCH_RESCAN_INTERVAL = 3600
+# How long (in seconds) after an Attachment's file has been checked for changes
+# before it is checked again, when it is viewed (see Attachment.refresh_is_due)
+ATTACHMENT_REFRESH_TTL = 3600
+# The number of threads that check Attachments' files concurrently, and how many
+# Attachments are saved at a time (see AttachmentManager.refresh_attachments)
+ATTACHMENT_REFRESH_WORKERS = 8
+ATTACHMENT_REFRESH_CHUNK_SIZE = 500
+# How long (in seconds) after a FileImporter's file was last scanned before viewing
+# it rescans it (see FileScanIndexManager.refresh_file_importer)
+FILE_REFRESH_TTL = 60
+
 # Match only docx files -- NOT the ~$tempfiles that Word creates
 NRQZ_LETTER_TEMPLATE_REGEX = r"^[^~].*\.docx$"
 
@@ -227,14 +263,29 @@ PATH_REMAPPINGS_BY_CLIENT_HOST = {
     "Windows": ("/home/code/nrqz/", "\\\\\\\\gbfiler/nrqz/")
 }
 
-# TODO: Enable memcached? Working, just need to see if it makes a difference
-# CACHES = {
-#     "default": {
-#         "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
-#         "LOCATION": "127.0.0.1:11211",
-#     }
-# }
-# USER_AGENTS_CACHE = "default"
+# The cache shared by every process (web workers, run_jobs, import commands); see
+# e.g. cases.reference. CACHE_URL can be any django-environ cache URL, e.g.
+# memcache://127.0.0.1:11211 or rediscache://127.0.0.1:6379/1 (which need their
+# client libraries installed), or locmemcache:// for a per-process cache. By
+# default, a file-based cache (which needs no extra services) is used, kept
+# alongside JOBS_RESULTS_DIR (i.e. outside of the repo)
+CACHES = {
+    "default": (
+        env.cache_url("CACHE_URL")
+        if env("CACHE_URL")
+        else {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.path.join(
+                tempfile.gettempdir(), f"nrqz_admin_{_user}", "cache"
+            ),
+        }
+    )
+}
+# Don't let the test runner share the cache with the dev server (e.g. so that the
+# reference rows cached by one aren't seen by the other)
+if sys.argv[1:2] == ["test"]:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+USER_AGENTS_CACHE = "default"
 
 sentry_sdk.init(
     environment=env("SENTRY_ENV"),
@@ -9,6 +9,7 @@ urlpatterns = [
     path("", RedirectView.as_view(url="/cases")),
     path("", include("cases.urls")),
     path("audits/", include("audits.urls")),
+    path("jobs/", include("jobs.urls")),
     path("accounts/", include("django.contrib.auth.urls")),
     path("explorer/", include("explorer.urls")),
     path("admin/", admin.site.urls),
@@ -0,0 +1,236 @@
+"""Benchmark the importer converters over a corpus of real-world cell values
+
+For each converter, a stream of values is drawn (with replacement, so values
+repeat, as they do across the rows of a real file) from a corpus of the kinds of
+raw values found in the Access, Excel, and NAM application/technical data. The
+stream is converted:
+
+- plain: outside of converter_cache(), so every value is converted from scratch
+- cached: inside converter_cache(), as the import commands do, so each distinct
+  value is only converted once
+
+Values that a converter rejects (with ValueError) are included on purpose, since
+those are common in the real data too. Converters of several fields (those used
+by ManyToOneFieldMaps and OneToManyFieldMaps) are given dicts of kwargs, as the
+field maps pass them.
+
+Usage: DJANGO_SETTINGS_MODULE=nrqz_admin.settings python -m tools.benchmark_converters
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+import django
+
+django.setup()
+from importers import converters
+from importers.converters import converter_cache
+
+DEFAULT_SIZE = 100000
+DEFAULT_REPEAT = 5
+
+NONE_VALUES = ["", " ", "None", "none", "#N/A", "N/A", "n/a", "NA", "Not provided"]
+COORDS = [
+    "38 25 59.8",
+    "38 25 59.80",
+    "38-25-59.8",
+    " 38 25 59 ",
+    "382559.8",
+    "382559",
+    "3825",
+    "79 50 23.1",
+    "-79 50 23.1",
+    "795023.1",
+    38.43328,
+    "None provided",
+    "38° 25' 59.8\"",
+]
+FLOATS = [
+    "1900",
+    "1900.5",
+    " 1,900 ",
+    "1900 MHz",
+    "1900MHz",
+    "60.5 dBm",
+    "15 ft",
+    "2.5",
+    "0",
+    "-3",
+    1900,
+    1900.5,
+    "quad",
+    "Hex",
+    "deca",
+    "no",
+]
+BOOLS = ["Yes", "yes", "Y", "No", "no", "N", "1", "0", "True", "FALSE", "t", "f", ""]
+DATES = ["1/2/2019", "01/02/2019", "12/31/99", "3\\4\\2015", " 6 / 7 / 2016 ", "TBD"]
+ACCESS_DATES = ["1/2/2019 0:00:00", "12/31/1999 0:00:00", ""]
+CASE_NUMS = ["5678", "5678.0", 5678, "12", "999999", "P1234", "N/A"]
+NUMBER_COORDS = [
+    "382559.8",
+    "0382559.8",
+    "-795023.1",
+    "795023",
+    "38255",
+    "3825",
+    "38",
+    "",
+    "None",
+    "123",
+]
+SCIENTIFIC_NOTATION = [
+    "0.0001",
+    1e-06,
+    "1e-6",
+    "1.5E-06",
+    " 2.5 x 10^-3 ",
+    "3x10-4",
+    "",
+    "N/A",
+    "unknown",
+]
+LOCATIONS = [
+    {"latitude": "38 25 59.8", "longitude": "79 50 23.1"},
+    {"latitude": "38-25-59.8", "longitude": "-79 50 23.1"},
+    {"latitude": "382559.8", "longitude": "795023.1"},
+    {"latitude": 38.43328, "longitude": -79.83975},
+    {"latitude": "None provided", "longitude": "None provided"},
+    {"latitude": "", "longitude": "79 50 23.1"},
+    # Outside of the acceptable bounds
+    {"latitude": "48 25 59.8", "longitude": "79 50 23.1"},
+]
+ACCESS_LOCATIONS = [
+    {**location, "nad27": nad27, "nad83": nad83}
+    for location in LOCATIONS
+    for nad27, nad83 in [(True, False), (False, True), (None, None), (True, True)]
+]
+FREQS = [
+    {"freq_low": "1900", "freq_high": "1910"},
+    {"freq_low": "1900 MHz", "freq_high": "1900.5 MHz"},
+    {"freq_low": None, "freq_high": "2.5"},
+    {"freq_low": "1900", "freq_high": None},
+    {"freq_low": "1900", "freq_high": "N/A"},
+    {"freq_low": "1910", "freq_high": "1900"},
+]
+ACCESS_PATHS = [
+    "letter.pdf#\\\\server\\nrqz\\letters\\5678.pdf#",
+    "#c:\\nrqz\\letters\\190101A.pdf#",
+    "c:\\nrqz\\letters\\5678.pdf",
+    "",
+    None,
+]
+EMISSIONS = [
+    {"EMISSION": "5M00G7W", "EMISSION1": "", "EMISSION2": ""},
+    {"EMISSION": "5m00g7w, 10M0W7D", "EMISSION1": "F3E/F2D", "EMISSION2": ""},
+    {"EMISSION": " ", "EMISSION1": "", "EMISSION2": ""},
+]
+NRQZ_IDS = [
+    {"case_num": "5678", "site_num": "1"},
+    {"case_num": "5678", "site_num": None},
+    {"case_num": "190101A", "site_num": 12},
+    {"case_num": "P190101AB", "site_num": "3"},
+    {"case_num": "N/A", "site_num": "1"},
+]
+
+CORPUS = {
+    "coerce_none": [*NONE_VALUES, *FLOATS, *BOOLS],
+    "coerce_access_none": [*NONE_VALUES, *FLOATS],
+    "coerce_bool": BOOLS,
+    "coerce_str": [*NONE_VALUES, "'#N/A'", "Verizon Wireless", "  AT&T  "],
+    "coerce_float": [*NONE_VALUES, *FLOATS],
+    "coerce_positive_float": [*NONE_VALUES, *FLOATS],
+    "coerce_positive_int": [*NONE_VALUES, *FLOATS],
+    "coerce_feet_to_meters": [*NONE_VALUES, *FLOATS],
+    "coerce_coords": [*NONE_VALUES, *COORDS],
+    "coerce_lat": COORDS,
+    "coerce_long": COORDS,
+    "convert_mdy_datetime": DATES,
+    "convert_access_datetime": ACCESS_DATES,
+    "convert_case_num": CASE_NUMS,
+    "convert_nrqz_id_to_case_num": ["5678", "5678-1", "190101A", "P190101AB-12"],
+    "coerce_coord_from_number": NUMBER_COORDS,
+    "coerce_scientific_notation": SCIENTIFIC_NOTATION,
+    "coerce_location": LOCATIONS,
+    "coerce_access_location": ACCESS_LOCATIONS,
+    "convert_freq_high": FREQS,
+    "convert_access_path": ACCESS_PATHS,
+    "convert_access_attachment": [
+        {f"LETTER{n}_Link": path} for n in (1, 12) for path in ACCESS_PATHS
+    ],
+    "convert_array": EMISSIONS,
+    "convert_case_num_and_site_num_to_nrqz_id": NRQZ_IDS,
+}
+
+
+def convert_all(converter, values):
+    for value in values:
+        try:
+            if isinstance(value, dict):
+                converter(**value)
+            else:
+                converter(value)
+        except ValueError:
+            pass
+
+
+def benchmark(func, repeat):
+    timings = []
+    for __ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def benchmark_cached(converter, values):
+    # A fresh cache per run, as per import
+    with converter_cache():
+        convert_all(converter, values)
+
+
+def main():
+    args = parse_args()
+    random.seed(args.seed)
+    width = max(len(name) for name in CORPUS)
+    print(f"{'Converter':>{width}} {'Method':>7} {'Time per value (µs)':>20}")
+    for name, corpus in CORPUS.items():
+        converter = getattr(converters, name)
+        values = random.choices(corpus, k=args.size)
+        methods = {
+            "plain": lambda: convert_all(converter, values),
+            "cached": lambda: benchmark_cached(converter, values),
+        }
+        for method, func in methods.items():
+            elapsed = benchmark(func, args.repeat)
+            print(f"{name:>{width}} {method:>7} {elapsed / args.size * 1e6:>20.2f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "-n",
+        "--size",
+        type=int,
+        default=DEFAULT_SIZE,
+        help="The number of values to convert with each converter",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help="The number of times to time each method (the median is reported)",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="The seed used to draw values"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
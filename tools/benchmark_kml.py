@@ -0,0 +1,155 @@
+"""Benchmark the different ways of exporting Cases as KML
+
+Compares, for each number of Facilities:
+
+- tree: The original approach; cases_as_kml builds a pykml element per Facility
+  (querying each Case's Facilities separately), then kml_to_string serializes it
+- stream: stream_cases_as_kml over a single values_list() query, formatting each
+  Point in Python
+- askml: stream_cases_as_kml over a single values_list() query, using the KML
+  generated by PostGIS (via AsKML)
+
+Synthetic Cases and Facilities are created inside a transaction that is always
+rolled back, so this is safe to run against a development database (but it
+should NOT be run against production).
+
+Usage: DJANGO_SETTINGS_MODULE=nrqz_admin.settings python -m tools.benchmark_kml
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+import django
+
+django.setup()
+from django.contrib.gis.geos import Point
+from django.db import transaction
+
+from cases.kml import cases_as_kml, kml_to_string, stream_cases_as_kml
+from cases.models import Case, Facility
+from utils.constants import WGS84_SRID
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+FACILITIES_PER_CASE = 100
+# Prefix for the synthetic case_nums, to keep them separate from any real ones
+CASE_NUM_PREFIX = "KMLBENCH"
+
+
+class Rollback(Exception):
+    pass
+
+
+def create_facilities(num_facilities):
+    num_cases = max(1, num_facilities // FACILITIES_PER_CASE)
+    case_nums = [f"{CASE_NUM_PREFIX}{i:06d}" for i in range(num_cases)]
+    # bulk_create() doesn't call save(), so slug must be set explicitly
+    cases = Case.objects.bulk_create(
+        [Case(case_num=case_num, slug=case_num) for case_num in case_nums]
+    )
+    Facility.objects.bulk_create(
+        [
+            Facility(
+                case=cases[i % num_cases],
+                nrqz_id=f"{CASE_NUM_PREFIX}-{i}",
+                location=Point(
+                    random.uniform(-80.5, -78.5),
+                    random.uniform(37.5, 39.25),
+                    srid=WGS84_SRID,
+                ),
+            )
+            for i in range(num_facilities)
+        ],
+        batch_size=5000,
+    )
+
+
+def get_facilities():
+    return Facility.objects.filter(
+        case__case_num__startswith=CASE_NUM_PREFIX, location__isnull=False
+    ).order_by("case__case_num", "id")
+
+
+def export_tree():
+    cases = Case.objects.filter(case_num__startswith=CASE_NUM_PREFIX)
+    return len(kml_to_string(cases_as_kml(cases)))
+
+
+def export_stream():
+    rows = (
+        get_facilities()
+        .values_list("case__case_num", "nrqz_id", "location")
+        .iterator()
+    )
+    return sum(len(chunk) for chunk in stream_cases_as_kml(rows))
+
+
+def export_askml():
+    rows = (
+        get_facilities()
+        .annotate_kml()
+        .values_list("case__case_num", "nrqz_id", "kml")
+        .iterator()
+    )
+    return sum(len(chunk) for chunk in stream_cases_as_kml(rows))
+
+
+EXPORTERS = {"tree": export_tree, "stream": export_stream, "askml": export_askml}
+
+
+def benchmark(exporter):
+    tracemalloc.start()
+    start = time.perf_counter()
+    num_chars = exporter()
+    elapsed = time.perf_counter() - start
+    __, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak_memory, num_chars
+
+
+def main():
+    args = parse_args()
+    print(
+        f"{'# Facilities':>12} {'Method':>8} {'Time (s)':>10} "
+        f"{'Peak Mem (MiB)':>15} {'Length':>12}"
+    )
+    for size in args.sizes:
+        try:
+            with transaction.atomic():
+                create_facilities(size)
+                for method in args.methods:
+                    elapsed, peak_memory, num_chars = benchmark(EXPORTERS[method])
+                    print(
+                        f"{size:>12} {method:>8} {elapsed:>10.3f} "
+                        f"{peak_memory / 2**20:>15.1f} {num_chars:>12}"
+                    )
+                raise Rollback()
+        except Rollback:
+            pass
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "sizes",
+        nargs="*",
+        type=int,
+        default=DEFAULT_SIZES,
+        help="The numbers of Facilities to benchmark with",
+    )
+    parser.add_argument(
+        "-m",
+        "--methods",
+        nargs="+",
+        choices=EXPORTERS.keys(),
+        default=list(EXPORTERS.keys()),
+        help="The export methods to benchmark",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
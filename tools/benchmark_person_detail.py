@@ -0,0 +1,143 @@
+"""Benchmark the Person detail page (and its similar people lookup) vs. table size
+
+Compares, for each number of People:
+
+- scan: The original similar people query, which filters on TrigramSimilarity
+  annotations, and so must compute the similarity of every row
+- indexed: find_similar_people, which first narrows down the candidates via the
+  trigram (`%`) operator, using the GIN trigram indexes on name and email
+- page: A full GET of the Person detail page (which uses find_similar_people)
+
+Synthetic People are created inside a transaction that is always rolled back, so
+this is safe to run against a development database (but it should NOT be run
+against production).
+
+Usage: DJANGO_SETTINGS_MODULE=nrqz_admin.settings python -m tools.benchmark_person_detail
+"""
+
+import argparse
+import random
+import statistics
+import string
+import time
+
+import django
+
+django.setup()
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+
+from cases.models import Person
+from utils.merge_people import THRESHOLD_DEFAULT, find_similar_people
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_REPEAT = 5
+# Prefix for the synthetic names, to keep them separate from any real ones
+NAME_PREFIX = "PDBENCH"
+
+
+class Rollback(Exception):
+    pass
+
+
+def random_word(length):
+    return "".join(random.choices(string.ascii_lowercase, k=length)).title()
+
+
+def create_people(num_people):
+    Person.objects.bulk_create(
+        [
+            Person(
+                name=f"{NAME_PREFIX} {random_word(6)} {random_word(8)}",
+                email=random.choice(["", f"{random_word(8).lower()}@example.com"]),
+            )
+            for __ in range(num_people)
+        ],
+        batch_size=5000,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE cases_person")
+
+
+def find_similar_people_scan(person, threshold=THRESHOLD_DEFAULT):
+    return (
+        Person.objects.annotate(
+            name_similarity=TrigramSimilarity("name", person.name),
+            email_similarity=TrigramSimilarity("email", person.email),
+        )
+        .filter(
+            Q(name_similarity__gt=threshold)
+            & (Q(email_similarity__gt=threshold) | Q(email=""))
+        )
+        .exclude(id=person.id)
+    )
+
+
+def get_client():
+    setup_test_environment()
+    user = get_user_model().objects.create_user(f"{NAME_PREFIX.lower()}_user")
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def benchmark(func, repeat):
+    timings = []
+    for __ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    args = parse_args()
+    print(f"{'# People':>10} {'Method':>8} {'Median Time (ms)':>17}")
+    for size in args.sizes:
+        try:
+            with transaction.atomic():
+                create_people(size)
+                client = get_client()
+                person = Person.objects.filter(name__startswith=NAME_PREFIX).first()
+                url = reverse("person_detail", args=[person.id])
+                methods = {
+                    "scan": lambda: list(find_similar_people_scan(person)),
+                    "indexed": lambda: list(find_similar_people(person)),
+                    "page": lambda: client.get(url),
+                }
+                for method, func in methods.items():
+                    elapsed = benchmark(func, args.repeat)
+                    print(f"{size:>10} {method:>8} {elapsed * 1000:>17.1f}")
+                raise Rollback()
+        except Rollback:
+            pass
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "sizes",
+        nargs="*",
+        type=int,
+        default=DEFAULT_SIZES,
+        help="The numbers of People to benchmark with",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help="The number of times to time each method (the median is reported)",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
@@ -15,8 +15,9 @@ def dms_to_dd(degrees, minutes, seconds):
 # https://en.wikipedia.org/wiki/Decimal_degrees#Example
 def dd_to_dms(decimal):
     d = math.trunc(decimal)
-    m = math.trunc((math.fabs(decimal) * 60) % 60)
-    s = (math.fabs(decimal) * 60 * 60) % 60
+    arcminutes = math.fabs(decimal) * 60
+    m = math.trunc(arcminutes % 60)
+    s = (arcminutes * 60) % 60
 
     return (d, m, s)
 
@@ -25,42 +26,32 @@ CONCISE_COORD_FORMAT = "{:d} {:02d} {:2.3f}"
 VERBOSE_COORD_FORMAT = "{:3d}° {:02d}′ {:2.3f}″ {}"
 
 
-def lat_to_string(latitude, concise=False):
-    if isinstance(latitude, float):
-        latitude = dd_to_dms(latitude)
-    if len(latitude) != 3:
-        raise ValueError("latitude must be a 3-tuple")
-
-    if latitude[0] < 0:
-        latitude = (abs(i) for i in latitude)
-        lat_hemi = "S"
+def _coord_to_string(coord, concise, hemispheres, name):
+    if isinstance(coord, float):
+        coord = dd_to_dms(coord)
+    if len(coord) != 3:
+        raise ValueError(f"{name} must be a 3-tuple")
+
+    degrees, minutes, seconds = coord
+    if degrees < 0:
+        degrees, minutes, seconds = -degrees, abs(minutes), abs(seconds)
+        hemisphere = hemispheres[1]
         sign = "-"
     else:
-        lat_hemi = "N"
+        hemisphere = hemispheres[0]
         sign = ""
 
     if concise:
-        return f"{sign}{CONCISE_COORD_FORMAT.format(*latitude)}"
-    return f"{VERBOSE_COORD_FORMAT.format(*latitude, lat_hemi)}"
+        return sign + CONCISE_COORD_FORMAT.format(degrees, minutes, seconds)
+    return VERBOSE_COORD_FORMAT.format(degrees, minutes, seconds, hemisphere)
 
 
-def long_to_string(longitude, concise=False):
-    if isinstance(longitude, float):
-        longitude = dd_to_dms(longitude)
-    if len(longitude) != 3:
-        raise ValueError("longitude must be a 3-tuple")
-
-    if longitude[0] < 0:
-        longitude = (abs(i) for i in longitude)
-        long_hemi = "W"
-        sign = "-"
-    else:
-        long_hemi = "E"
-        sign = ""
+def lat_to_string(latitude, concise=False):
+    return _coord_to_string(latitude, concise, "NS", "latitude")
 
-    if concise:
-        return f"{sign}{CONCISE_COORD_FORMAT.format(*longitude)}"
-    return f"{VERBOSE_COORD_FORMAT.format(*longitude, long_hemi)}"
+
+def long_to_string(longitude, concise=False):
+    return _coord_to_string(longitude, concise, "EW", "longitude")
 
 
 def coords_to_string(latitude, longitude, concise=False):
@@ -0,0 +1,110 @@
+"""In-memory detection of duplicate People
+
+This is equivalent to comparing every pair of people using pg_trgm's
+similarity() (as utils.merge_people.find_similar_people does in the database),
+but without actually comparing every pair. Instead, candidate pairs are found via
+an inverted index of each name's trigrams, using prefix filtering: if the
+trigrams of each name are sorted (rarest first), then two names can only be at
+least `threshold` similar if they share a trigram within the first
+`len(trigrams) - ceil(threshold * len(trigrams)) + 1` trigrams of each. Only
+those candidates are then actually scored.
+"""
+
+from collections import Counter, defaultdict
+import math
+import re
+
+from utils.union_find import UnionFind
+
+# pg_trgm only considers alphanumeric characters; anything else separates words
+WORD_REGEX = re.compile(r"[^\W_]+")
+
+
+def trigrams(value):
+    """Return the set of trigrams of the given string, as pg_trgm's show_trgm() does
+
+    Each word is lowercased and padded with two spaces before and one after
+    """
+    if not value:
+        return frozenset()
+    return frozenset(
+        padded[i : i + 3]
+        for word in WORD_REGEX.findall(value.lower())
+        for padded in (f"  {word} ",)
+        for i in range(len(padded) - 2)
+    )
+
+
+def similarity(trigrams_a, trigrams_b):
+    """Return the similarity of the two sets of trigrams, as pg_trgm's similarity()"""
+    if not trigrams_a or not trigrams_b:
+        return 0.0
+    num_shared = len(trigrams_a & trigrams_b)
+    return num_shared / (len(trigrams_a) + len(trigrams_b) - num_shared)
+
+
+def normalize_email(email):
+    return (email or "").strip().lower()
+
+
+def _prefix_length(size, threshold):
+    # Tolerate floating point error in threshold * size (e.g. 0.9 * 10)
+    return size - math.ceil(threshold * size - 1e-9) + 1
+
+
+def find_similar_pairs(trigrams_by_id, threshold):
+    """Yield each pair of IDs whose trigrams are more than `threshold` similar"""
+    frequencies = Counter(
+        trigram for trigrams in trigrams_by_id.values() for trigram in trigrams
+    )
+    index = defaultdict(list)
+    # Visiting smaller sets first means each set only needs to be compared to sets
+    # that are no larger than it is
+    for id_, trigrams_ in sorted(trigrams_by_id.items(), key=lambda item: len(item[1])):
+        if not trigrams_:
+            continue
+        prefix = sorted(trigrams_, key=lambda trigram: (frequencies[trigram], trigram))
+        candidates = set()
+        for trigram in prefix[: _prefix_length(len(prefix), threshold)]:
+            candidates.update(index[trigram])
+            index[trigram].append(id_)
+
+        for other_id in candidates:
+            if similarity(trigrams_, trigrams_by_id[other_id]) > threshold:
+                yield other_id, id_
+
+
+def _emails_match(email_a, email_b, threshold):
+    # A missing email never prevents a match; these are the _easiest_ to merge!
+    if not email_a or not email_b or email_a == email_b:
+        return True
+    return similarity(trigrams(email_a), trigrams(email_b)) > threshold
+
+
+def find_duplicate_groups(people, threshold):
+    """Group together people whose names and emails are similar
+
+    Arguments:
+        people: an iterable of (id, name, email) tuples
+        threshold: two people are similar if the similarity of their names is
+            greater than this, and their emails are either similar in the same way
+            or at least one of them is missing
+
+    Returns a list of groups (lists of IDs, sorted) of people that are similar,
+    where similarity is transitive (i.e. the connected components of the graph
+    of similar pairs). Groups of a single person are omitted
+    """
+    emails = {}
+    trigrams_by_id = {}
+    for id_, name, email in people:
+        emails[id_] = normalize_email(email)
+        trigrams_by_id[id_] = trigrams(name)
+
+    # Merge similar pairs into connected components; only people with at least
+    # one similar pair are added, so groups of a single person never appear
+    union_find = UnionFind()
+    for id_a, id_b in find_similar_pairs(trigrams_by_id, threshold):
+        if _emails_match(emails[id_a], emails[id_b], threshold):
+            union_find.union(id_a, id_b)
+
+    return sorted(sorted(group) for group in union_find.groups().values())
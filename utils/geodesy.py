@@ -0,0 +1,199 @@
+"""In-process geodesic calculations on the WGS84 ellipsoid
+
+These are used to avoid round-tripping to PostGIS for simple point-to-point
+calculations. Results agree with PostGIS's (spheroidal) geography functions
+to well under a millimeter for the distances we deal with
+"""
+
+import math
+
+# WGS84 ellipsoid parameters
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+
+VINCENTY_MAX_ITERATIONS = 200
+VINCENTY_TOLERANCE = 1e-12
+# The longest (in degrees of arc; about 1 km) that densify_ring leaves an edge
+DENSIFY_MAX_DEGREES = 0.01
+
+
+def vincenty_inverse(lon1, lat1, lon2, lat2):
+    """Solve the inverse geodesic problem between two points, via Vincenty's formulae
+
+    All inputs are in decimal degrees. Returns a tuple of
+    (distance in meters, initial azimuth from point 1 to point 2 in degrees [0, 360)).
+    The azimuth of coincident points is defined as 0
+
+    https://en.wikipedia.org/wiki/Vincenty%27s_formulae#Inverse_problem
+    """
+    if (lon1, lat1) == (lon2, lat2):
+        return (0.0, 0.0)
+
+    a, b, f = WGS84_A, WGS84_B, WGS84_F
+    L = math.radians(lon2 - lon1)
+    U1 = math.atan((1 - f) * math.tan(math.radians(lat1)))
+    U2 = math.atan((1 - f) * math.tan(math.radians(lat2)))
+    sin_U1, cos_U1 = math.sin(U1), math.cos(U1)
+    sin_U2, cos_U2 = math.sin(U2), math.cos(U2)
+
+    lambda_ = L
+    for __ in range(VINCENTY_MAX_ITERATIONS):
+        sin_lambda, cos_lambda = math.sin(lambda_), math.cos(lambda_)
+        sin_sigma = math.hypot(
+            cos_U2 * sin_lambda, cos_U1 * sin_U2 - sin_U1 * cos_U2 * cos_lambda
+        )
+        if sin_sigma == 0:
+            return (0.0, 0.0)
+        cos_sigma = sin_U1 * sin_U2 + cos_U1 * cos_U2 * cos_lambda
+        sigma = math.atan2(sin_sigma, cos_sigma)
+        sin_alpha = cos_U1 * cos_U2 * sin_lambda / sin_sigma
+        cos_sq_alpha = 1 - sin_alpha**2
+        # cos_sq_alpha is 0 only for points on the equator
+        cos_2sigma_m = (
+            cos_sigma - 2 * sin_U1 * sin_U2 / cos_sq_alpha if cos_sq_alpha else 0.0
+        )
+        C = f / 16 * cos_sq_alpha * (4 + f * (4 - 3 * cos_sq_alpha))
+        lambda_prev = lambda_
+        lambda_ = L + (1 - C) * f * sin_alpha * (
+            sigma
+            + C
+            * sin_sigma
+            * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m**2))
+        )
+        if abs(lambda_ - lambda_prev) < VINCENTY_TOLERANCE:
+            break
+    else:
+        raise ValueError(
+            f"Vincenty's formulae failed to converge between ({lon1}, {lat1}) "
+            f"and ({lon2}, {lat2}); are they nearly antipodal?"
+        )
+
+    u_sq = cos_sq_alpha * (a**2 - b**2) / b**2
+    A = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+    B = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+    delta_sigma = (
+        B
+        * sin_sigma
+        * (
+            cos_2sigma_m
+            + B
+            / 4
+            * (
+                cos_sigma * (-1 + 2 * cos_2sigma_m**2)
+                - B
+                / 6
+                * cos_2sigma_m
+                * (-3 + 4 * sin_sigma**2)
+                * (-3 + 4 * cos_2sigma_m**2)
+            )
+        )
+    )
+    distance = b * A * (sigma - delta_sigma)
+    azimuth = math.atan2(
+        cos_U2 * math.sin(lambda_),
+        cos_U1 * sin_U2 - sin_U1 * cos_U2 * math.cos(lambda_),
+    )
+    return (distance, math.degrees(azimuth) % 360)
+
+
+def _to_unit_vector(lon, lat):
+    lon, lat = math.radians(lon), math.radians(lat)
+    return (
+        math.cos(lat) * math.cos(lon),
+        math.cos(lat) * math.sin(lon),
+        math.sin(lat),
+    )
+
+
+def _from_unit_vector(x, y, z):
+    return (
+        math.degrees(math.atan2(y, x)),
+        math.degrees(math.atan2(z, math.hypot(x, y))),
+    )
+
+
+def densify_ring(ring, max_degrees=DENSIFY_MAX_DEGREES):
+    """Return the given ring of (lon, lat) vertices, with its edges following great
+    circles
+
+    Vertices are interpolated along the great circle of each edge, so that no edge
+    is longer than `max_degrees` of arc. Treating the result as planar (e.g. in
+    point_in_ring) then agrees with PostGIS geography (e.g. ST_Intersects), whose
+    edges are great circles. This matters along the edges of constant latitude,
+    which bulge poleward by hundreds of meters over the width of the NRQZ
+    """
+    densified = []
+    num_vertices = len(ring)
+    for i in range(num_vertices):
+        start = ring[i]
+        end = ring[(i + 1) % num_vertices]
+        densified.append(start)
+        a = _to_unit_vector(*start)
+        b = _to_unit_vector(*end)
+        dot = max(-1.0, min(1.0, sum(a_i * b_i for a_i, b_i in zip(a, b))))
+        omega = math.acos(dot)
+        num_segments = math.ceil(math.degrees(omega) / max_degrees)
+        # Closing edges of closed rings are zero-length, and so are skipped
+        for step in range(1, num_segments):
+            t = step / num_segments
+            weight_a = math.sin((1 - t) * omega) / math.sin(omega)
+            weight_b = math.sin(t * omega) / math.sin(omega)
+            densified.append(
+                _from_unit_vector(
+                    *(weight_a * a_i + weight_b * b_i for a_i, b_i in zip(a, b))
+                )
+            )
+    return densified
+
+
+def point_on_ring(x, y, ring):
+    """Determine whether (x, y) lies exactly on an edge of the given ring"""
+    num_vertices = len(ring)
+    for i in range(num_vertices):
+        x1, y1 = ring[i]
+        x2, y2 = ring[(i + 1) % num_vertices]
+        if (
+            (x2 - x1) * (y - y1) == (y2 - y1) * (x - x1)
+            and min(x1, x2) <= x <= max(x1, x2)
+            and min(y1, y2) <= y <= max(y1, y2)
+        ):
+            return True
+    return False
+
+
+def point_in_ring(x, y, ring):
+    """Determine whether (x, y) is inside the given ring of (x, y) vertices
+
+    Uses the even-odd (ray casting) rule. Points lying exactly on an edge
+    are considered inside
+    """
+    if point_on_ring(x, y, ring):
+        return True
+
+    inside = False
+    num_vertices = len(ring)
+    for i in range(num_vertices):
+        x1, y1 = ring[i]
+        x2, y2 = ring[(i + 1) % num_vertices]
+        if (y1 > y) != (y2 > y):
+            x_intersect = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+            if x < x_intersect:
+                inside = not inside
+    return inside
+
+
+def point_in_polygon(x, y, rings):
+    """Determine whether (x, y) is covered by the given polygon
+
+    `rings` is a sequence of rings (each a sequence of (x, y) vertices); the first
+    is the exterior ring and the rest are holes. This is the same structure as
+    `Polygon.coords`
+    """
+    exterior, *holes = rings
+    if not point_in_ring(x, y, exterior):
+        return False
+    # Points on the edge of a hole are still covered by the polygon
+    return not any(
+        point_in_ring(x, y, hole) and not point_on_ring(x, y, hole) for hole in holes
+    )
@@ -0,0 +1,146 @@
+"""A minimal wrapper around Linux's inotify, for watching directory trees
+
+Only what's needed to notice that files have been created, changed, moved, or
+deleted. Note that inotify only sees changes made via the local kernel, so
+changes made to network mounts (NFS, CIFS) by other hosts are NOT seen; those
+must be polled for
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+
+# The events that indicate that a file's contents (or existence) have changed.
+# IN_MODIFY is deliberately excluded (IN_CLOSE_WRITE follows it, once the writer is
+# done), so that half-written files aren't scanned
+WATCH_MASK = (
+    IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+
+_EVENT_HEADER = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+
+class RescanNeeded(Exception):
+    """The changed files can't be determined from the events, so a full rescan is
+    needed (e.g. the kernel dropped events, or a whole directory was moved)"""
+
+
+def _get_libc():
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    # Raises AttributeError if this libc doesn't have inotify (i.e. not Linux)
+    libc.inotify_init1
+    return libc
+
+
+class Inotify:
+    """Watch directory trees, including any subdirectories created later
+
+    Raises OSError if inotify is not available
+    """
+
+    def __init__(self):
+        try:
+            self.libc = _get_libc()
+        except (AttributeError, OSError) as error:
+            raise OSError(errno.ENOSYS, "inotify is not available") from error
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # Maps each watch descriptor to the directory that it watches
+        self.paths = {}
+
+    def close(self):
+        os.close(self.fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add_watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Failed to watch {path}")
+        self.paths[wd] = path
+
+    def watch_tree(self, root):
+        """Watch the given directory, and every directory beneath it"""
+        for directory, __, __ in os.walk(root):
+            try:
+                self.add_watch(directory)
+            except FileNotFoundError:
+                # Deleted since it was walked
+                pass
+
+    def read(self, timeout=None):
+        """Return the paths that have changed, waiting up to `timeout` seconds
+
+        Returns an empty set if nothing changed within the timeout. Raises
+        RescanNeeded if the changed paths can't be determined
+        """
+        readable, __, __ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.fd, _READ_SIZE)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        rescan_needed = False
+        offset = 0
+        while offset < len(data):
+            wd, mask, __, name_length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + name_length].rstrip(b"\0")
+            offset += name_length
+
+            if mask & (IN_Q_OVERFLOW | IN_DELETE_SELF | IN_MOVE_SELF):
+                rescan_needed = True
+                continue
+            if mask & IN_IGNORED:
+                # The watched directory was deleted (or moved)
+                self.paths.pop(wd, None)
+                continue
+            directory = self.paths.get(wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, os.fsdecode(name)) if name else directory
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # New directories need watching too
+                    self.watch_tree(path)
+                # Whatever files the directory holds (or held) have changed, but
+                # only a rescan can tell which
+                rescan_needed = True
+                continue
+            changed.add(path)
+
+        if rescan_needed:
+            raise RescanNeeded()
+        return changed
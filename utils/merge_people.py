@@ -1,4 +1,4 @@
-from django.db import transaction
+from django.db import connection, transaction
 from django.db.models import Q
 from django.contrib.postgres.search import TrigramSimilarity
 
@@ -27,11 +27,32 @@ CONTACT_VALUES = ["contact"]
 APPLICANT_VALUES = ["applicant"]
 
 
+def set_similarity_threshold(threshold):
+    """Set the threshold used by the trigram `%` operator (i.e. trigram_similar)
+
+    If in a transaction (e.g. a request), this only lasts until it ends; otherwise
+    it lasts for the rest of the session
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT set_config('pg_trgm.similarity_threshold', %s, %s)",
+            [str(threshold), connection.in_atomic_block],
+        )
+
+
 def _find_similar_people(name, email="", people=None, threshold=THRESHOLD_DEFAULT):
     if people is None:
         people = Person.objects.all()
+    # First narrow down to candidates via the `%` operator, which can use the
+    # trigram indexes on name and email (unlike filtering on TrigramSimilarity).
+    # Note that this must still be in effect when the queryset is evaluated
+    set_similarity_threshold(threshold)
+    if email:
+        email_candidates = Q(email__trigram_similar=email) | Q(email="")
+    else:
+        email_candidates = Q(email="")
     return (
-        people
+        people.filter(Q(name__trigram_similar=name) & email_candidates)
         # Annotate each item with its similarity ranking with the current name
         .annotate(
             name_similarity=TrigramSimilarity("name", name),
@@ -46,6 +67,8 @@ def _find_similar_people(name, email="", people=None, threshold=THRESHOLD_DEFAUL
             # missing an email -- these are actually _easier_ to merge!
             & (Q(email_similarity__gt=threshold) | Q(email=""))
         )
+        # Most similar first
+        .order_by("-name_similarity", "-email_similarity")
     )
 
 
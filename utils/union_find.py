@@ -0,0 +1,47 @@
+"""A minimal disjoint-set (union-find), for grouping things into connected components"""
+
+from collections import defaultdict
+
+
+class UnionFind:
+    """Disjoint sets of hashable items, with path compression
+
+    Items are added implicitly by find() and union(). The representative of each
+    set is its smallest item, so items must also be mutually orderable
+    """
+
+    def __init__(self, items=()):
+        self.parents = {}
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item):
+        return item in self.parents
+
+    def __iter__(self):
+        return iter(self.parents)
+
+    def add(self, item):
+        self.parents.setdefault(item, item)
+
+    def find(self, item):
+        self.add(item)
+        root = item
+        while self.parents[root] != root:
+            root = self.parents[root]
+        # Compress the path, so later lookups are fast
+        while item != root:
+            self.parents[item], item = root, self.parents[item]
+        return root
+
+    def union(self, item_a, item_b):
+        root_a, root_b = self.find(item_a), self.find(item_b)
+        if root_a != root_b:
+            self.parents[max(root_a, root_b)] = min(root_a, root_b)
+
+    def groups(self):
+        """Return a dict mapping each set's representative to a list of its items"""
+        groups = defaultdict(list)
+        for item in self.parents:
+            groups[self.find(item)].append(item)
+        return dict(groups)